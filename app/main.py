@@ -1,16 +1,30 @@
 # app/main.py
 import os
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import Response
 from twilio.twiml.messaging_response import MessagingResponse
 from twilio.request_validator import RequestValidator
 
 from app.schemas import ChatRequest
-from app.nlp.intent import route_message
+from app.nlp.intent import route_message, SESSIONS
 from app.texts import WELCOME_MSG
-from app.config import TWILIO_VALIDATE  # bool (True/False)
+from app.config import TWILIO_VALIDATE, USE_LLM_INTENT  # bool (True/False)
+from app.nlp import llm
+from app.nlp.intent_model import get_classifier
 
-app = FastAPI(title="Kavak Agent API")
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    # Clasificador de intenciones: carga (o entrena) el encoder al arrancar, no en el primer mensaje
+    if USE_LLM_INTENT:
+        await asyncio.to_thread(get_classifier)
+    yield
+    # Cierra el pool de conexiones del cliente LLM
+    await llm.aclose()
+
+
+app = FastAPI(title="Kavak Agent API", lifespan=_lifespan)
 
 
 def _chunk_for_whatsapp(text: str, max_len: int = 1200) -> list[str]:
@@ -39,6 +53,24 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+async def metrics():
+    # Importación diferida: el retriever solo se carga si alguien consulta métricas o la KB
+    from app.nlp import retriever
+    return {
+        "embed_batcher": retriever._BATCHER.metrics(),
+        "retrieval_cache": retriever._RCACHE.stats(),
+        "retrieval": retriever.retrieval_metrics(),
+        "faq": retriever.faq_metrics(),
+        "sessions": SESSIONS.stats(),
+        "answer_cache": retriever._ACACHE.stats(),
+        "llm": llm.metrics(),
+        "singleflight": retriever._FLIGHT.metrics(),
+        "kb_fallbacks": retriever.fallback_metrics(),
+        "prompt": retriever.prompt_metrics(),
+    }
+
+
 @app.post("/chat")
 async def chat(req: ChatRequest):
     # simple API for local testing
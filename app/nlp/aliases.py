@@ -21,6 +21,14 @@ BRAND_ALIAS = {
     "hunday": "hyundai",
 }
 
+# Marcas conocidas aunque el catálogo actual no las tenga: "busco un ford" filtra por Ford
+# (0 resultados, ver tools._filtered_df_for_search) en vez de listar todo el inventario
+KNOWN_BRANDS = (
+    "nissan", "toyota", "volkswagen", "ford", "chevrolet", "kia", "honda", "bmw",
+    "mercedes benz", "mazda", "renault", "hyundai", "suzuki", "seat", "audi",
+    "peugeot", "mitsubishi", "fiat", "dodge", "volvo", "subaru", "mini",
+)
+
 # Alias / typos comunes de modelos
 MODEL_ALIAS = {
     # Nissan
@@ -46,7 +54,47 @@ VERSION_ALIAS = {
     "advance": "advance",
     "exclusive": "exclusive",
     "lt": "lt", "ls": "ls", "sr": "sr", "le": "le", "xe": "xe", "xl": "xl",
+    # Versiones frecuentes aunque el catálogo actual no las tenga
+    "active": "active", "trend": "trend", "highline": "highline", "comfortline": "comfortline",
+    "xlt": "xlt", "limited": "limited", "xle": "xle", "xse": "xse", "sport": "sport",
+    "platinum": "platinum", "sv": "sv", "sl": "sl",
+}
+
+# Carrocería: palabra del usuario (normalizada) → tipo canónico del filtro `body`
+BODY_ALIAS = {
+    "camioneta": "suv", "camionetas": "suv", "suv": "suv", "suvs": "suv", "jeep": "suv",
+    "sedan": "sedan", "sedanes": "sedan",
+    "hatchback": "hatchback", "hatchbacks": "hatchback", "hb": "hatchback",
+    "pickup": "pickup", "pickups": "pickup", "pick up": "pickup",
+    "coupe": "coupe",
+    "van": "van", "minivan": "van",
+}
+
+# Carrocería por modelo (normalizado) para catálogos sin columna de carrocería
+_BODY_MODELS = {
+    "sedan": (
+        "versa", "sentra", "altima", "corolla", "camry", "jetta", "vento", "virtus", "aveo", "cavalier",
+        "onix", "civic", "city", "accord", "mazda 3", "rio", "forte", "accent", "elantra", "ciaz",
+        "logan", "clase c", "clase e", "serie 3", "a4", "attitude", "mg5", "impreza",
+    ),
+    "hatchback": (
+        "march", "yaris", "polo", "golf", "spark", "fit", "mazda 2", "swift", "ignis", "kwid", "stepway",
+        "clase a", "serie 1", "a1", "a3", "ibiza", "leon", "208", "mirage", "mobi", "uno", "cooper",
+        "figo", "fiesta", "focus", "grand i10", "born",
+    ),
+    "suv": (
+        "kicks", "x-trail", "pathfinder", "rav4", "highlander", "tiguan", "taos", "tracker", "captiva",
+        "trax", "equinox", "cr-v", "hr-v", "br-v", "cx-3", "cx-30", "cx-5", "cx-9", "sportage", "seltos",
+        "soul", "sorento", "tucson", "creta", "santa fe", "escape", "explorer", "territory", "vitara",
+        "duster", "koleos", "gla", "glc", "x1", "x3", "x5", "q3", "q5", "arona", "ateca", "2008", "3008",
+        "outlander", "eclipse cross", "compass", "renegade", "cherokee", "wrangler", "journey",
+        "durango", "pulse", "zs", "hs", "xc40", "xc60", "xc90", "forester", "outback", "xv",
+        "countryman", "formentor",
+    ),
+    "pickup": ("frontier", "np300", "hilux", "tacoma", "ranger", "lobo", "saveiro", "oroch", "l200"),
+    "van": ("avanza", "ertiga", "partner"),
 }
+BODY_BY_MODEL = {m: body for body, models in _BODY_MODELS.items() for m in models}
 
 # Stopwords para limpieza de tokens en búsqueda por texto libre
 STOPWORDS = {
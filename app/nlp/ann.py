@@ -0,0 +1,91 @@
+# app/nlp/ann.py
+from __future__ import annotations
+import os
+import re
+import json
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+# ------------------------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------------------------
+# Cadena de faiss.index_factory: Flat (exacto), HNSW32, IVF256,SQ8, IVF256,PQ48, ...
+KB_INDEX_FACTORY = os.getenv("KB_INDEX_FACTORY", "Flat").strip() or "Flat"
+# Parámetros de búsqueda por defecto (se guardan con el índice; el env los puede pisar en runtime)
+KB_INDEX_NPROBE    = int(os.getenv("KB_INDEX_NPROBE", "8"))
+KB_INDEX_EF_SEARCH = int(os.getenv("KB_INDEX_EF_SEARCH", "64"))
+
+PARAMS_FILE = "kb_index.json"
+
+_IVF_RE = re.compile(r"^IVF(\d+)", re.I)
+_PQ_RE  = re.compile(r"PQ(\d+)(?:x(\d+))?", re.I)
+
+
+def _fit_factory(spec: str, n: int, dim: int) -> str:
+    """
+    Ajusta la fábrica al tamaño del corpus (k-means necesita al menos tantos puntos como centroides):
+      - IVF: nlist <= n / 39 (recomendación de FAISS);
+      - PQ: m debe dividir dim y se necesitan >= 2^nbits puntos; si no alcanza, se usa SQ8.
+    Corpus demasiado chico para IVF → Flat.
+    """
+    m = _IVF_RE.match(spec)
+    if m:
+        nlist = min(int(m.group(1)), n // 39)
+        if nlist < 1:
+            return "Flat"
+        spec = f"IVF{nlist}" + spec[m.end():]
+    pq = _PQ_RE.search(spec)
+    if pq:
+        sub, nbits = int(pq.group(1)), int(pq.group(2) or 8)
+        if dim % sub or n < 2 ** nbits:
+            spec = spec[:pq.start()] + "SQ8" + spec[pq.end():]
+    return spec
+
+
+def build_ann_index(vecs: np.ndarray, spec: str = KB_INDEX_FACTORY,
+                    nprobe: int = KB_INDEX_NPROBE, ef_search: int = KB_INDEX_EF_SEARCH) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Construye (y entrena si hace falta) un índice de producto interno para vectores normalizados.
+    Devuelve (index, params); params se guarda junto al índice (kb_index.json).
+    """
+    import faiss
+
+    vecs = np.ascontiguousarray(vecs, dtype="float32")
+    n, dim = vecs.shape
+    factory = _fit_factory(spec, n, dim)
+    index = faiss.index_factory(dim, factory, faiss.METRIC_INNER_PRODUCT)
+    if not index.is_trained:
+        index.train(vecs)
+    index.add(vecs)
+
+    params = {"factory": factory, "requested": spec, "dim": dim, "ntotal": int(index.ntotal),
+              "nprobe": nprobe, "efSearch": ef_search}
+    apply_search_params(index, params)
+    return index, params
+
+
+def apply_search_params(index, params: Dict[str, Any]) -> None:
+    """nprobe (IVF) y efSearch (HNSW); KB_INDEX_NPROBE / KB_INDEX_EF_SEARCH en el env mandan."""
+    import faiss
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = int(os.getenv("KB_INDEX_NPROBE") or params.get("nprobe") or KB_INDEX_NPROBE)
+    hnsw = getattr(faiss.downcast_index(index), "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = int(os.getenv("KB_INDEX_EF_SEARCH") or params.get("efSearch") or KB_INDEX_EF_SEARCH)
+
+
+def load_params(index_dir: str) -> Dict[str, Any]:
+    path = os.path.join(index_dir, PARAMS_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"factory": "Flat"}
+
+
+def index_memory_bytes(index) -> int:
+    import faiss
+    return int(faiss.serialize_index(index).nbytes)
@@ -0,0 +1,121 @@
+# app/nlp/batcher.py
+from __future__ import annotations
+import os
+import time
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Sequence
+
+import numpy as np
+
+# ------------------------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------------------------
+EMBED_BATCH_MAX       = int(os.getenv("EMBED_BATCH_MAX", "16"))
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batcher asyncio delante del encoder.
+    Junta las consultas que llegan dentro de una ventana (window_ms) o hasta max_batch,
+    las codifica en UNA llamada (en un hilo dedicado, sin bloquear el event loop)
+    y resuelve el future de cada petición con su fila.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        max_batch: int = EMBED_BATCH_MAX,
+        window_ms: float = EMBED_BATCH_WINDOW_MS,
+    ):
+        self.encode_fn = encode_fn
+        self.max_batch = max(1, int(max_batch))
+        self.window = max(0.0, float(window_ms)) / 1000.0
+        # Un solo hilo: los lotes no compiten entre sí por los cores del modelo
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed-batch")
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._pending: List[tuple] = []      # (texto, future, t_encolado)
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set = set()
+        self.reset_metrics()
+
+    # ---------------- API ----------------
+    async def embed(self, text: str) -> np.ndarray:
+        """Devuelve el vector (1-D, float32) de `text`."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Nuevo event loop (p. ej. tests): lo pendiente del loop anterior ya no es válido
+            self._loop, self._pending, self._timer = loop, [], None
+
+        fut = loop.create_future()
+        self._pending.append((text, fut, time.perf_counter()))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await fut
+
+    async def embed_many(self, texts: Sequence[str]) -> np.ndarray:
+        rows = await asyncio.gather(*(self.embed(t) for t in texts))
+        return np.vstack(rows).astype("float32")
+
+    # ---------------- Internos ----------------
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = self._loop.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[tuple]) -> None:
+        started = time.perf_counter()
+        for _, _, t_enq in batch:
+            self._delays.append((started - t_enq) * 1000.0)
+        self._batches += 1
+        self._items += len(batch)
+        self._sizes[len(batch)] = self._sizes.get(len(batch), 0) + 1
+
+        texts = [b[0] for b in batch]
+        try:
+            vecs = await self._loop.run_in_executor(self._executor, self.encode_fn, texts)
+        except Exception as e:
+            for _, fut, _ in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for i, (_, fut, _) in enumerate(batch):
+            if not fut.done():
+                fut.set_result(vecs[i])
+
+    # ---------------- Métricas ----------------
+    def reset_metrics(self) -> None:
+        self._batches = 0
+        self._items = 0
+        self._sizes: Dict[int, int] = {}
+        self._delays: deque = deque(maxlen=2048)   # ms en cola de las últimas peticiones
+
+    def metrics(self) -> Dict[str, Any]:
+        delays = sorted(self._delays)
+
+        def _pct(p: float) -> float:
+            return round(delays[min(len(delays) - 1, int(p * len(delays)))], 3) if delays else 0.0
+
+        return {
+            "batches": self._batches,
+            "items": self._items,
+            "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+            "max_batch_size": max(self._sizes) if self._sizes else 0,
+            "batch_sizes": dict(sorted(self._sizes.items())),
+            "queue_delay_ms": {
+                "avg": round(sum(delays) / len(delays), 3) if delays else 0.0,
+                "p50": _pct(0.50),
+                "p95": _pct(0.95),
+                "max": round(delays[-1], 3) if delays else 0.0,
+            },
+        }
@@ -0,0 +1,190 @@
+# app/nlp/cache.py
+from __future__ import annotations
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+import numpy as np
+
+
+class _RetrievalEntry:
+    __slots__ = ("version", "vec", "ids", "scores")
+
+    def __init__(self, version: str, vec: np.ndarray, ids: List[int], scores: List[float]):
+        self.version = version
+        self.vec = vec
+        self.ids = ids
+        self.scores = scores
+
+
+class RetrievalCache:
+    """
+    LRU acotado: consulta normalizada → (embedding, ids del top-k y sus scores).
+    Cada entrada lleva la versión del índice con que se calculó; si el índice se
+    reconstruye, la entrada cuenta como fallo y se descarta.
+    Thread-safe (kb_answer también corre en hilos).
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = max(1, int(maxsize))
+        self._data: "OrderedDict[Hashable, _RetrievalEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, version: str) -> Optional[_RetrievalEntry]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.version != version:
+                del self._data[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, version: str, vec: np.ndarray, ids: List[int],
+            scores: List[float]) -> None:
+        """`scores` son obligatorios: el umbral KB_MIN_SCORE se vuelve a aplicar en cada acierto."""
+        if len(scores) != len(ids):
+            raise ValueError(f"{len(ids)} ids con {len(scores)} scores")
+        with self._lock:
+            self._data[key] = _RetrievalEntry(version, vec, list(ids), list(scores))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class _AnswerEntry:
+    __slots__ = ("version", "chunk_ids", "answer", "created")
+
+    def __init__(self, version: str, chunk_ids: tuple, answer: Dict[str, Any], created: float):
+        self.version = version
+        self.chunk_ids = chunk_ids
+        self.answer = answer
+        self.created = created
+
+
+class SemanticAnswerCache:
+    """
+    Caché semántica de respuestas del LLM.
+    Guarda (embedding de la consulta, ids de los chunks recuperados, respuesta final) y
+    sirve la respuesta si una consulta nueva:
+      - tiene coseno >= threshold contra una consulta cacheada (búsqueda en un FAISS pequeño),
+      - recuperó exactamente los mismos chunks,
+      - y usa la misma versión de índice.
+    Expulsión por tamaño (LRU) y por TTL (segundos desde que se generó la respuesta).
+    """
+
+    def __init__(self, threshold: float = 0.95, maxsize: int = 512, ttl: float = 3600.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.threshold = float(threshold)
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = float(ttl)
+        self._clock = clock
+        self._index = None                      # faiss.IndexIDMap(IndexFlatIP), se crea con el 1er vector
+        self._entries: "OrderedDict[int, _AnswerEntry]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, vec: np.ndarray, chunk_ids: List[int], version: str) -> Optional[Dict[str, Any]]:
+        q = np.asarray(vec, dtype="float32").reshape(1, -1)
+        ids = tuple(chunk_ids)
+        with self._lock:
+            if self._index is None or not self._entries:
+                self.misses += 1
+                return None
+            now = self._clock()
+            D, I = self._index.search(q, min(8, len(self._entries)))
+            for sim, eid in zip(D[0], I[0]):
+                if eid < 0 or sim < self.threshold:
+                    break                       # resultados en orden descendente
+                entry = self._entries.get(int(eid))
+                if entry is None:
+                    continue
+                if now - entry.created > self.ttl:
+                    self._remove(int(eid))
+                    continue
+                if entry.version == version and entry.chunk_ids == ids:
+                    self._entries.move_to_end(int(eid))
+                    self.hits += 1
+                    return dict(entry.answer)
+            self.misses += 1
+            return None
+
+    def put(self, vec: np.ndarray, chunk_ids: List[int], answer: Dict[str, Any], version: str) -> None:
+        import faiss
+
+        q = np.asarray(vec, dtype="float32").reshape(1, -1)
+        with self._lock:
+            if self._index is None or self._index.d != q.shape[1]:
+                self._index = faiss.IndexIDMap(faiss.IndexFlatIP(q.shape[1]))
+                self._entries.clear()
+            now = self._clock()
+            # Limpieza: respuestas caducadas o de un índice anterior
+            stale = [eid for eid, e in self._entries.items()
+                     if e.version != version or now - e.created > self.ttl]
+            for eid in stale:
+                self._remove(eid)
+
+            eid = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(q, np.asarray([eid], dtype="int64"))
+            self._entries[eid] = _AnswerEntry(version, tuple(chunk_ids), dict(answer), now)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, eid: int) -> None:
+        self._entries.pop(eid, None)
+        self._index.remove_ids(np.asarray([eid], dtype="int64"))
+        self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._index = None
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "threshold": self.threshold,
+            "ttl_s": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,127 @@
+# app/nlp/context.py
+from __future__ import annotations
+import os
+import re
+import math
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# ------------------------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------------------------
+# Presupuesto de tokens para el contexto de la KB dentro del prompt
+KB_CONTEXT_TOKENS = int(os.getenv("KB_CONTEXT_TOKENS", "512"))
+# Solape máximo entre chunks consecutivos (build_faiss.chunk_text usa overlap=60)
+KB_CHUNK_OVERLAP  = int(os.getenv("KB_CHUNK_OVERLAP", "60"))
+
+# ------------------------------------------------------------------------------------
+# Conteo de tokens (local, sin red)
+# ------------------------------------------------------------------------------------
+_WORD_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_TOKENIZER: Dict[str, Any] = {"fn": None}
+
+
+def _heuristic_tokens(text: str) -> int:
+    # BPE típico: ~4 caracteres por token en palabras; cada signo de puntuación cuenta 1
+    return sum(max(1, math.ceil(len(w) / 4)) for w in _WORD_RE.findall(text or ""))
+
+
+def _tokenizer() -> Callable[[str], int]:
+    if _TOKENIZER["fn"] is None:
+        fn = _heuristic_tokens
+        try:
+            import tiktoken  # opcional: conteo exacto si está instalado y tiene la codificación
+            enc = tiktoken.get_encoding("o200k_base")
+            fn = lambda text: len(enc.encode(text or ""))
+        except Exception:
+            pass
+        _TOKENIZER["fn"] = fn
+    return _TOKENIZER["fn"]
+
+
+def count_tokens(text: str) -> int:
+    return _tokenizer()(text)
+
+
+def count_message_tokens(messages: Sequence[Dict[str, str]]) -> int:
+    # +4 por mensaje (rol y separadores del formato chat), +2 del cebado de la respuesta
+    return sum(count_tokens(m.get("content", "")) + 4 for m in messages) + 2
+
+
+# ------------------------------------------------------------------------------------
+# Ensamblado del contexto
+# ------------------------------------------------------------------------------------
+def _overlap_len(prev: str, cur: str, max_overlap: int) -> int:
+    """Largo del sufijo de `prev` que se repite como prefijo de `cur`."""
+    for n in range(min(max_overlap, len(prev), len(cur)), 0, -1):
+        if prev.endswith(cur[:n]):
+            return n
+    return 0
+
+
+def _contiguous(prev: Optional[Dict[str, Any]], cur: Dict[str, Any]) -> bool:
+    """Chunks consecutivos del mismo documento/página (ids seguidos)."""
+    if prev is None or prev.get("id") is None or cur.get("id") is None:
+        return False
+    return (cur["id"] == prev["id"] + 1
+            and prev.get("source") == cur.get("source")
+            and prev.get("page") == cur.get("page"))
+
+
+def assemble_context(
+    hits: List[Dict[str, Any]],
+    budget_tokens: int = KB_CONTEXT_TOKENS,
+    scores: Optional[Sequence[float]] = None,
+    max_overlap: int = KB_CHUNK_OVERLAP,
+) -> Dict[str, Any]:
+    """
+    Arma el contexto para el LLM:
+      1) ordena los chunks por score (si no hay scores, respeta el orden de FAISS, que ya es descendente);
+      2) mete chunks completos mientras quepan en `budget_tokens` (el primero siempre entra, recortado si hace falta);
+      3) chunks con ids consecutivos (mismo source/página) se unen en un solo tramo sin repetir el solape.
+    Devuelve {"text", "used", "tokens", "dropped", "overlap_chars"}; `used` son los hits incluidos.
+    """
+    order = list(range(len(hits)))
+    if scores is not None:
+        order.sort(key=lambda i: -float(scores[i]))
+
+    chosen: List[Dict[str, Any]] = []
+    tokens = 0
+    for pos in order:
+        h = hits[pos]
+        text = h.get("text", "") or ""
+        cost = count_tokens(text)
+        if tokens + cost <= budget_tokens:
+            chosen.append(h)
+            tokens += cost
+        elif not chosen:
+            # Ni el mejor chunk cabe entero: se recorta en proporción al presupuesto
+            keep = max(1, int(len(text) * budget_tokens / max(cost, 1)))
+            chosen.append(dict(h, text=text[:keep]))
+            tokens += count_tokens(text[:keep])
+
+    # Tramos de ids consecutivos, en orden de lectura; cada tramo hereda el rango de su mejor chunk
+    rank = {id(h): r for r, h in enumerate(chosen)}
+    by_id = sorted(chosen, key=lambda h: (h.get("id") is None, h.get("id", 0)))
+    spans: List[tuple] = []          # (mejor rango, texto)
+    overlap_chars = 0
+    prev = None
+    for h in by_id:
+        text = h.get("text", "") or ""
+        if _contiguous(prev, h):
+            n = _overlap_len(prev.get("text", "") or "", text, max_overlap)
+            overlap_chars += n
+            best, body = spans[-1]
+            spans[-1] = (min(best, rank[id(h)]), body + text[n:])
+        else:
+            spans.append((rank[id(h)], text))
+        prev = h
+
+    spans.sort(key=lambda s: s[0])
+    out = "\n\n".join(body for _, body in spans)
+    return {
+        "text": out,
+        "used": chosen,
+        "tokens": count_tokens(out),
+        "dropped": len(hits) - len(chosen),
+        "overlap_chars": overlap_chars,
+    }
@@ -0,0 +1,159 @@
+# app/nlp/dispatch.py
+from __future__ import annotations
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Grupos con nombre dentro de un patrón: (?P<slot>...)
+_NAMED_GROUP_RE = re.compile(r"\(\?P<(\w+)>")
+
+Handler = Callable[..., Any]
+
+
+class IntentRule:
+    """
+    Una fila de la tabla: `pattern` decide si la intención aplica; `optional` son patrones
+    que solo extraen slots (no deciden). Los slots son los grupos con nombre de ambos.
+    anchored=True → el patrón debe coincidir al inicio del texto (como re.match);
+    si no, en cualquier posición (como re.search).
+    """
+    __slots__ = ("name", "pattern", "anchored", "optional", "slots")
+
+    def __init__(self, name: str, pattern: str, anchored: bool = False, optional: Sequence[str] = ()):
+        self.name = name
+        self.pattern = pattern
+        self.anchored = anchored
+        self.optional = tuple(optional)
+        self.slots = tuple(dict.fromkeys(
+            g for p in (pattern, *self.optional) for g in _NAMED_GROUP_RE.findall(p)
+        ))
+
+
+class IntentMatch:
+    __slots__ = ("name", "slots")
+
+    def __init__(self, name: str, slots: Dict[str, Optional[str]]):
+        self.name = name
+        self.slots = slots
+
+    def get(self, slot: str, default: Any = None) -> Any:
+        v = self.slots.get(slot)
+        return default if v is None else v
+
+    def __repr__(self) -> str:
+        return f"IntentMatch({self.name!r}, {self.slots!r})"
+
+
+class IntentTable:
+    """
+    Intenciones declarativas en orden de prioridad, compiladas en UNA regex:
+
+        ^(?: (?=regla_1)(?=slots_1?)(?P<_r0>) | (?=regla_2)... )
+
+    Cada regla es una alternativa de lookaheads anclada al inicio; el motor prueba las
+    alternativas en orden, así que gana la primera regla que aplica (la misma semántica
+    que la cadena de `if X.search(...)` anterior) y sus slots salen del mismo match.
+    El grupo vacío del final marca qué regla ganó (`m.lastgroup`).
+    Los handlers se registran por intención; `default` atiende los mensajes sin regla.
+    """
+
+    def __init__(self, flags: int = re.IGNORECASE):
+        self.flags = flags
+        self._rules: Dict[str, IntentRule] = {}
+        self._handlers: Dict[str, Handler] = {}
+        self._default: Optional[Handler] = None
+        self._regex: Optional[re.Pattern] = None
+        self._groups: Dict[str, Tuple[str, Tuple[str, ...], Tuple[str, ...]]] = {}
+        self._slot_regex: Dict[str, re.Pattern] = {}
+        self._lock = threading.Lock()
+
+    # ---------------- Registro ----------------
+    def add(self, name: str, pattern: str, anchored: bool = False, optional: Sequence[str] = ()) -> IntentRule:
+        """Agrega (o reemplaza, conservando su prioridad) la regla `name` al final de la tabla."""
+        rule = IntentRule(name, pattern, anchored, optional)
+        with self._lock:
+            self._rules[name] = rule
+            self._regex = None          # se recompila en el siguiente scan
+            self._slot_regex.pop(name, None)
+        return rule
+
+    def handler(self, name: str) -> Callable[[Handler], Handler]:
+        """@INTENTS.handler("cotiza") def _cotiza(sess, msg, m): ..."""
+        def deco(fn: Handler) -> Handler:
+            self._handlers[name] = fn
+            return fn
+        return deco
+
+    def default(self, fn: Handler) -> Handler:
+        """Handler para mensajes que no activan ninguna regla (se llama con m=None)."""
+        self._default = fn
+        return fn
+
+    def names(self) -> List[str]:
+        return list(self._rules)
+
+    # ---------------- Compilación ----------------
+    def _compile(self) -> re.Pattern:
+        regex = self._regex
+        if regex is not None:
+            return regex
+        with self._lock:
+            if self._regex is None:
+                alts: List[str] = []
+                groups: Dict[str, Tuple[str, Tuple[str, ...], Tuple[str, ...]]] = {}
+                for i, rule in enumerate(self._rules.values()):
+                    # Los nombres de grupo deben ser únicos en la regex combinada: r<i>__slot
+                    def scoped(p: str, i: int = i) -> str:
+                        return _NAMED_GROUP_RE.sub(lambda g: f"(?P<r{i}__{g.group(1)}>", p)
+                    lead = "" if rule.anchored else ".*?"
+                    alt = f"(?={lead}(?:{scoped(rule.pattern)}))"
+                    alt += "".join(f"(?=(?:.*?(?:{scoped(p)}))?)" for p in rule.optional)
+                    marker = f"_r{i}"
+                    alts.append(alt + f"(?P<{marker}>)")
+                    groups[marker] = (rule.name, tuple(f"r{i}__{s}" for s in rule.slots), rule.slots)
+                self._groups = groups
+                self._regex = re.compile("^(?:" + "|".join(alts) + ")", self.flags) if alts \
+                    else re.compile(r"(?!x)x")
+            return self._regex
+
+    # ---------------- Uso ----------------
+    def scan(self, text: str) -> Optional[IntentMatch]:
+        """Intención de mayor prioridad que aplica a `text` y sus slots, en una sola pasada."""
+        m = self._compile().match(text or "")
+        if m is None:
+            return None
+        name, groups, slots = self._groups[m.lastgroup]
+        if not groups:
+            return IntentMatch(name, {})
+        values = m.group(*groups)
+        return IntentMatch(name, dict(zip(slots, values)) if len(groups) > 1 else {slots[0]: values})
+
+    def slots(self, name: str, text: str) -> IntentMatch:
+        """
+        Slots de la regla `name` en `text` aunque su patrón no aplique (None los que falten):
+        para cuando la intención la decidió otra etapa (el clasificador de intent_model).
+        """
+        rule = self._rules.get(name)
+        if rule is None or not rule.slots:
+            return IntentMatch(name, {})
+        rx = self._slot_regex.get(name)
+        if rx is None:
+            lead = "" if rule.anchored else ".*?"
+            pat = f"(?=(?:{lead}(?:{rule.pattern}))?)"
+            pat += "".join(f"(?=(?:.*?(?:{p}))?)" for p in rule.optional)
+            rx = self._slot_regex[name] = re.compile("^" + pat, self.flags)
+        m = rx.match(text or "")
+        return IntentMatch(name, {s: m.group(s) for s in rule.slots})
+
+    def dispatch(self, text: str, *args: Any) -> Any:
+        """Escanea `text` y llama handler(*args, match) de la intención ganadora (o el default)."""
+        return self.call(self.scan(text), *args)
+
+    def call(self, m: Optional[IntentMatch], *args: Any) -> Any:
+        """handler(*args, m) de una intención ya decidida; el default si m es None o no tiene handler."""
+        fn = self._handlers.get(m.name) if m is not None else None
+        if fn is None:
+            if self._default is None:
+                return None
+            return self._default(*args, m)
+        return fn(*args, m)
@@ -0,0 +1,211 @@
+# app/nlp/embeddings.py
+from __future__ import annotations
+import os
+import abc
+import json
+import threading
+from typing import List, Sequence
+
+import numpy as np
+
+# ------------------------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------------------------
+# Mismo modelo para indexar (scripts/build_faiss.py) y para consultar (retriever.py)
+EMBED_MODEL   = os.getenv("EMBED_MODEL", "all-MiniLM-L6-v2").strip()
+# torch | torch-int8 | onnx | onnx-int8
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch").strip().lower()
+ONNX_DIR      = os.getenv("EMBED_ONNX_DIR") or os.path.join(os.path.dirname(__file__), "..", "data", "onnx")
+# Hilos de ONNX Runtime (0 = decide ORT)
+ONNX_THREADS  = int(os.getenv("EMBED_ONNX_THREADS", "0"))
+
+ONNX_FP32 = "model.onnx"
+ONNX_INT8 = "model_int8.onnx"
+
+
+def model_key() -> str:
+    """Encoder configurado (backend:modelo): los scores solo se comparan con el mismo."""
+    return f"{EMBED_BACKEND}:{EMBED_MODEL}"
+
+
+# ------------------------------------------------------------------------------------
+# Interfaz
+# ------------------------------------------------------------------------------------
+class EmbeddingBackend(abc.ABC):
+    """
+    Interfaz mínima de un backend de embeddings.
+    encode() devuelve vectores float32 normalizados (L2), listos para IndexFlatIP.
+    """
+    name = "base"
+
+    @abc.abstractmethod
+    def encode(self, texts: Sequence[str]) -> np.ndarray: ...
+
+
+def _l2_normalize(vecs: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    return (vecs / np.clip(norms, 1e-12, None)).astype("float32")
+
+
+# ------------------------------------------------------------------------------------
+# PyTorch (sentence-transformers), opcionalmente cuantizado a int8
+# ------------------------------------------------------------------------------------
+class TorchBackend(EmbeddingBackend):
+    """
+    Backend de referencia: SentenceTransformer en PyTorch.
+    Con quantize=True aplica cuantización dinámica int8 a las capas Linear (solo CPU).
+    """
+    name = "torch"
+
+    def __init__(self, model_name: str = EMBED_MODEL, quantize: bool = False):
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(model_name, device="cpu")
+        if quantize:
+            import torch
+
+            self.name = "torch-int8"
+            self._model = torch.quantization.quantize_dynamic(
+                self._model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        vecs = self._model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True)
+        return vecs.astype("float32")
+
+
+# ------------------------------------------------------------------------------------
+# ONNX Runtime (fp32 o int8), sin PyTorch en tiempo de consulta
+# ------------------------------------------------------------------------------------
+class OnnxBackend(EmbeddingBackend):
+    """
+    Mismo modelo exportado a ONNX (ver scripts/export_onnx.py).
+    Replica el pipeline de sentence-transformers: tokenizer → transformer → mean pooling → L2.
+    """
+    name = "onnx"
+
+    def __init__(self, model_dir: str = ONNX_DIR, quantized: bool = False, threads: int = ONNX_THREADS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        fname = ONNX_INT8 if quantized else ONNX_FP32
+        path = os.path.join(model_dir, fname)
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"{os.path.abspath(path)} not found. Ejecuta scripts/export_onnx.py para exportar el modelo."
+            )
+        if quantized:
+            self.name = "onnx-int8"
+
+        max_length = 256
+        cfg_path = os.path.join(model_dir, "export.json")
+        if os.path.exists(cfg_path):
+            with open(cfg_path, "r", encoding="utf-8") as f:
+                max_length = int(json.load(f).get("max_seq_length") or max_length)
+
+        self._tok = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self._tok.enable_truncation(max_length=max_length)
+        pad_id = self._tok.token_to_id("[PAD]") or 0
+        self._tok.enable_padding(pad_id=pad_id, pad_token="[PAD]")
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            opts.intra_op_num_threads = threads
+        self._sess = ort.InferenceSession(path, opts, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self._sess.get_inputs()}
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        enc = self._tok.encode_batch(list(texts))
+        ids  = np.asarray([e.ids for e in enc], dtype=np.int64)
+        mask = np.asarray([e.attention_mask for e in enc], dtype=np.int64)
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self._inputs:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+        hidden = self._sess.run(None, feeds)[0]          # (batch, tokens, dim)
+
+        # Mean pooling sobre tokens reales (igual que sentence-transformers)
+        m = mask[..., None].astype(np.float32)
+        pooled = (hidden * m).sum(axis=1) / np.clip(m.sum(axis=1), 1e-9, None)
+        return _l2_normalize(pooled)
+
+
+def export_onnx(model_name: str = EMBED_MODEL, out_dir: str = ONNX_DIR, quantize: bool = True) -> str:
+    """
+    Exporta el transformer de sentence-transformers a ONNX (+ variante int8 dinámica).
+    Escribe en out_dir: model.onnx, model_int8.onnx, tokenizer.json y export.json.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    st = SentenceTransformer(model_name, device="cpu")
+    hf_model = st[0].auto_model.eval()
+    tokenizer = st.tokenizer
+    os.makedirs(out_dir, exist_ok=True)
+
+    sample = tokenizer(["hola"], return_tensors="pt")
+    input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    dyn = {n: {0: "batch", 1: "tokens"} for n in input_names}
+    dyn["last_hidden_state"] = {0: "batch", 1: "tokens"}
+
+    fp32_path = os.path.join(out_dir, ONNX_FP32)
+    args = tuple(sample[n] for n in input_names)
+    kwargs = dict(
+        input_names=input_names,
+        output_names=["last_hidden_state"],
+        dynamic_axes=dyn,
+        opset_version=14,
+    )
+    with torch.no_grad():
+        try:
+            torch.onnx.export(hf_model, args, fp32_path, dynamo=False, **kwargs)
+        except TypeError:
+            # torch < 2.5 no conoce el parámetro dynamo
+            torch.onnx.export(hf_model, args, fp32_path, **kwargs)
+
+    tokenizer.backend_tokenizer.save(os.path.join(out_dir, "tokenizer.json"))
+    with open(os.path.join(out_dir, "export.json"), "w", encoding="utf-8") as f:
+        json.dump({"model": model_name, "max_seq_length": int(st.max_seq_length or 256)}, f, indent=2)
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        quantize_dynamic(fp32_path, os.path.join(out_dir, ONNX_INT8), weight_type=QuantType.QInt8)
+    return out_dir
+
+
+# ------------------------------------------------------------------------------------
+# Selección por configuración
+# ------------------------------------------------------------------------------------
+def make_backend(kind: str = EMBED_BACKEND, **kwargs) -> EmbeddingBackend:
+    kind = (kind or "torch").strip().lower()
+    if kind == "torch":
+        return TorchBackend(**kwargs)
+    if kind in ("torch-int8", "int8"):
+        return TorchBackend(quantize=True, **kwargs)
+    if kind == "onnx":
+        return OnnxBackend(**kwargs)
+    if kind == "onnx-int8":
+        return OnnxBackend(quantized=True, **kwargs)
+    raise ValueError(f"EMBED_BACKEND desconocido: {kind!r} (usa torch, torch-int8, onnx u onnx-int8)")
+
+
+_BACKEND: EmbeddingBackend | None = None
+_LOCK = threading.Lock()
+
+
+def get_backend() -> EmbeddingBackend:
+    """
+    Backend compartido del proceso. Se crea en el primer uso (no al importar),
+    así el atajo estático y los tests no pagan la carga del modelo.
+    """
+    global _BACKEND
+    if _BACKEND is None:
+        with _LOCK:
+            if _BACKEND is None:
+                _BACKEND = make_backend(EMBED_BACKEND)
+    return _BACKEND
+
+
+def embed(texts: List[str]) -> np.ndarray:
+    return get_backend().encode(texts)
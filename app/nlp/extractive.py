@@ -0,0 +1,51 @@
+# app/nlp/extractive.py
+from __future__ import annotations
+import re
+from typing import Any, Dict, List
+
+import numpy as np
+
+# Separa por fin de oración o salto de línea; quita viñetas/encabezados de Markdown
+_SENT_SPLIT_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+_MD_PREFIX_RE  = re.compile(r"^\s*(?:[#>*\-•]+|\d+[.)])\s*")
+MIN_SENTENCE_CHARS = 20
+
+
+def split_sentences(hits: List[Dict[str, Any]]) -> List[str]:
+    """
+    Oraciones de los chunks recuperados, sin duplicados (los chunks se solapan).
+    """
+    seen = set()
+    out: List[str] = []
+    for h in hits:
+        for raw in _SENT_SPLIT_RE.split(h.get("text", "") or ""):
+            s = _MD_PREFIX_RE.sub("", raw).strip()
+            key = s.lower()
+            if len(s) >= MIN_SENTENCE_CHARS and key not in seen:
+                seen.add(key)
+                out.append(s)
+    return out
+
+
+def rank_sentences(qv: np.ndarray, sentences: List[str], sent_vecs: np.ndarray, top_n: int = 3) -> List[str]:
+    """
+    Top-n oraciones por similitud coseno con la consulta (vectores ya normalizados).
+    """
+    if not sentences:
+        return []
+    scores = sent_vecs @ np.asarray(qv, dtype="float32").reshape(-1)
+    order = np.argsort(-scores)[:top_n]
+    return [sentences[i] for i in order]
+
+
+def format_extractive(sentences: List[str]) -> str:
+    if not sentences:
+        return (
+            "No pude generar la respuesta a tiempo. "
+            "¿Quieres que te ponga en contacto con un agente de Kavak?"
+        )
+    body = "\n".join(f"• {s}" for s in sentences)
+    return (
+        "Esto es lo más relevante que encontré en nuestra base:\n\n" + body +
+        "\n\n¿Quieres que te ponga en contacto con un agente de Kavak?"
+    )
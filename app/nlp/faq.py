@@ -0,0 +1,135 @@
+# app/nlp/faq.py
+from __future__ import annotations
+import os
+import re
+import json
+import time
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.nlp.index_store import write_json_atomic
+from app.nlp.static_answers import normalize
+
+# ------------------------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------------------------
+FAQ_FILE           = "kb_faq.json"
+FAQ_QUESTIONS_FILE = os.getenv("KB_FAQ_QUESTIONS") or os.path.join(
+    os.path.dirname(__file__), "..", "data", "faq_questions.txt")
+# Similitud mínima (coseno) entre la pregunta y una canónica para servir la respuesta precalculada
+KB_FAQ_THRESHOLD = float(os.getenv("KB_FAQ_THRESHOLD", "0.92"))
+
+
+def _norm_question(text: str) -> str:
+    # Sin acentos, mayúsculas ni puntuación: "¿Cuál es la garantía?" == "cual es la garantia"
+    return " ".join(re.sub(r"[^\w\s]", " ", normalize(text)).split())
+
+
+def load_questions(path: str = FAQ_QUESTIONS_FILE) -> List[str]:
+    """Una pregunta canónica por línea (# comentarios y líneas vacías se ignoran)."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [q.strip() for q in f if q.strip() and not q.lstrip().startswith("#")]
+
+
+def precompute_faq(
+    questions: Sequence[str],
+    index_dir: str,
+    version: str,
+    answer_fn: Callable[[str], Dict[str, Any]],
+    embed_fn: Callable[[List[str]], np.ndarray],
+) -> Dict[str, Any]:
+    """
+    Corre el pipeline completo (answer_fn = kb_answer) para cada pregunta canónica y guarda
+    respuesta + ids de chunks fuente + embedding de la pregunta en kb_faq.json, atado a `version`.
+    Respuestas de respaldo (timeout, breaker, sin LLM) no se guardan.
+    """
+    questions = list(dict.fromkeys(q for q in questions if q.strip()))
+    vecs = embed_fn(questions) if questions else np.zeros((0, 0), dtype="float32")
+    entries, skipped = [], []
+    for q, v in zip(questions, vecs):
+        res = answer_fn(q)
+        ids = [s["id"] for s in res.get("sources") or [] if isinstance(s, dict) and "id" in s]
+        if res.get("fallback") or not ids:
+            skipped.append(q)
+            continue
+        entries.append({
+            "question": q,
+            "answer": res["answer"],
+            "chunk_ids": ids,
+            "vec": [round(float(x), 6) for x in v],
+        })
+    write_json_atomic(os.path.join(index_dir, FAQ_FILE), {
+        "index_version": version,
+        "built_at": time.time(),
+        "entries": entries,
+    })
+    return {"stored": len(entries), "skipped": skipped}
+
+
+class FaqTable:
+    """
+    Tabla de respuestas precalculadas. Se sirve solo si fue generada para la versión
+    de índice vigente: primero por texto normalizado exacto, luego por vecino más cercano.
+    """
+
+    def __init__(self, threshold: float = KB_FAQ_THRESHOLD):
+        self.threshold = threshold
+        self._key = None
+        self._version: Optional[str] = None
+        self._entries: List[Dict[str, Any]] = []
+        self._by_text: Dict[str, Dict[str, Any]] = {}
+        self._vecs = np.zeros((0, 0), dtype="float32")
+        self._lock = threading.Lock()
+        self.enabled = True          # precompute_faq lo apaga para correr el pipeline completo
+        self.hits = 0
+
+    def _refresh(self, index_dir: str) -> None:
+        path = os.path.join(index_dir, FAQ_FILE)
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._key, self._version, self._entries, self._by_text = None, None, [], {}
+            return
+        key = (path, st.st_mtime_ns, st.st_size)
+        if key == self._key:
+            return
+        with self._lock:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            entries = data.get("entries") or []
+            self._version = data.get("index_version")
+            self._entries = entries
+            self._by_text = {_norm_question(e["question"]): e for e in entries}
+            self._vecs = (np.asarray([e["vec"] for e in entries], dtype="float32")
+                          if entries else np.zeros((0, 0), dtype="float32"))
+            self._key = key
+
+    def _usable(self, index_dir: str, version: Optional[str]) -> bool:
+        if not self.enabled:
+            return False
+        self._refresh(index_dir)
+        return bool(version) and self._version == version and bool(self._entries)
+
+    def by_text(self, index_dir: str, version: Optional[str], query: str) -> Optional[Dict[str, Any]]:
+        if not self._usable(index_dir, version):
+            return None
+        entry = self._by_text.get(_norm_question(query))
+        if entry:
+            self.hits += 1
+        return entry
+
+    def nearest(self, index_dir: str, version: Optional[str], qv: np.ndarray) -> Optional[Dict[str, Any]]:
+        if not self._usable(index_dir, version):
+            return None
+        sims = self._vecs @ np.asarray(qv, dtype="float32").reshape(-1)
+        best = int(np.argmax(sims))
+        if sims[best] < self.threshold:
+            return None
+        self.hits += 1
+        return self._entries[best]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "index_version": self._version,
+                "threshold": self.threshold, "hits": self.hits}
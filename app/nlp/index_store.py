@@ -0,0 +1,200 @@
+# app/nlp/index_store.py
+from __future__ import annotations
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+
+from app.nlp.ann import PARAMS_FILE
+
+# ------------------------------------------------------------------------------------
+# Archivos dentro de INDEX_DIR
+# ------------------------------------------------------------------------------------
+# Cada build vive completo en builds/<versión>-xxxx/ (índice, meta, parámetros, BM25, versión)
+# y CURRENT, el único archivo que se reemplaza al publicar, dice cuál está vigente.
+INDEX_FILE   = "kb.index"
+META_FILE    = "kb_meta.json"
+VERSION_FILE = "kb_version.json"
+CURRENT_FILE = "CURRENT"
+BUILDS_DIR   = "builds"
+STORE_FILE   = "kb_embeddings.npz"   # hash de chunk → embedding (reutilizable entre builds)
+# Builds que se conservan (el vigente incluido): un worker aún puede estar leyendo el anterior
+KB_KEEP_BUILDS = int(os.getenv("KB_KEEP_BUILDS", "2"))
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def _atomic_write(path: str, write: Callable[[str], None]) -> None:
+    """Escribe en un temporal del mismo directorio y lo renombra (os.replace es atómico)."""
+    d = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=os.path.basename(path), dir=d)
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def write_json_atomic(path: str, payload: Any, indent: int | None = None) -> None:
+    def _w(tmp: str) -> None:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=indent)
+    _atomic_write(path, _w)
+
+
+# ------------------------------------------------------------------------------------
+# Store de embeddings por hash de chunk
+# ------------------------------------------------------------------------------------
+class EmbeddingStore:
+    """
+    hash(chunk) → vector. Se guarda junto al índice y se invalida completo si cambia
+    el modelo/backend de embeddings (model_key).
+    """
+
+    def __init__(self, model_key: str, vecs: Dict[str, np.ndarray] | None = None):
+        self.model_key = model_key
+        self.vecs: Dict[str, np.ndarray] = vecs or {}
+
+    @classmethod
+    def load(cls, path: str, model_key: str) -> "EmbeddingStore":
+        if not os.path.exists(path):
+            return cls(model_key)
+        with np.load(path, allow_pickle=False) as data:
+            if str(data["model_key"]) != model_key:
+                return cls(model_key)
+            hashes, vecs = data["hashes"], data["vecs"]
+            return cls(model_key, {str(h): vecs[i] for i, h in enumerate(hashes)})
+
+    def save(self, path: str, keep: Sequence[str] | None = None) -> None:
+        """Guarda solo `keep` (los hashes del build actual) para que el store no crezca sin límite."""
+        hashes = [h for h in (keep if keep is not None else self.vecs) if h in self.vecs]
+        dim = next(iter(self.vecs.values())).shape[0] if self.vecs else 0
+        vecs = np.stack([self.vecs[h] for h in hashes]).astype("float32") if hashes else np.zeros((0, dim), "float32")
+
+        def _w(tmp: str) -> None:
+            with open(tmp, "wb") as f:
+                np.savez(f, model_key=np.asarray(self.model_key), hashes=np.asarray(hashes), vecs=vecs)
+        _atomic_write(path, _w)
+
+    def embed(self, chunks: Sequence[str], encode: Callable[[List[str]], np.ndarray]) -> tuple[np.ndarray, int]:
+        """
+        Vectores de `chunks` en orden; solo se codifican los que no están en el store.
+        Devuelve (vecs, cuántos se codificaron).
+        """
+        hashes = [chunk_hash(c) for c in chunks]
+        todo: Dict[str, str] = {}
+        for h, c in zip(hashes, chunks):
+            if h not in self.vecs and h not in todo:
+                todo[h] = c
+        if todo:
+            fresh = np.asarray(encode(list(todo.values())), dtype="float32")
+            for h, v in zip(todo, fresh):
+                self.vecs[h] = v
+        return np.stack([self.vecs[h] for h in hashes]).astype("float32"), len(todo)
+
+
+# ------------------------------------------------------------------------------------
+# Publicación atómica y versión
+# ------------------------------------------------------------------------------------
+def index_version_for(model_key: str, hashes: Sequence[str]) -> str:
+    h = hashlib.sha256(model_key.encode("utf-8"))
+    for x in hashes:
+        h.update(x.encode("ascii"))
+    return h.hexdigest()[:16]
+
+
+def publish_index(index_dir: str, index, meta: List[Dict[str, Any]], stamp: Dict[str, Any],
+                  params: Dict[str, Any] | None = None, extras: Dict[str, Any] | None = None,
+                  keep: int | None = None) -> str:
+    """
+    Escribe kb.index, kb_meta.json, kb_index.json (fábrica y parámetros de búsqueda), los
+    JSON de `extras` (nombre → contenido, p. ej. kb_bm25.json) y kb_version.json en un
+    subdirectorio nuevo de builds/ y después reemplaza CURRENT (un solo os.replace): un
+    lector ve el build anterior completo o el nuevo completo, nunca una mezcla.
+    Borra los builds más viejos que `keep` (KB_KEEP_BUILDS). Devuelve el directorio del build.
+    """
+    import faiss
+
+    builds = os.path.join(index_dir, BUILDS_DIR)
+    os.makedirs(builds, exist_ok=True)
+    build = tempfile.mkdtemp(prefix=f"{stamp.get('version', 'build')}-", dir=builds)
+    try:
+        faiss.write_index(index, os.path.join(build, INDEX_FILE))
+        files = [(META_FILE, meta, 2), (PARAMS_FILE, params or {"factory": "Flat"}, 2)]
+        files += [(name, payload, None) for name, payload in (extras or {}).items()]
+        files.append((VERSION_FILE, dict(stamp, built_at=time.time()), 2))
+        for name, payload, indent in files:
+            with open(os.path.join(build, name), "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False, indent=indent)
+    except BaseException:
+        shutil.rmtree(build, ignore_errors=True)
+        raise
+
+    def _w(tmp: str) -> None:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(os.path.basename(build))
+    _atomic_write(os.path.join(index_dir, CURRENT_FILE), _w)
+    _prune_builds(builds, build, KB_KEEP_BUILDS if keep is None else keep)
+    return build
+
+
+def _prune_builds(builds: str, current: str, keep: int) -> None:
+    old = sorted((e for e in os.scandir(builds) if e.is_dir() and e.path != current),
+                 key=lambda e: e.stat().st_mtime_ns, reverse=True)
+    for e in old[max(keep - 1, 0):]:
+        shutil.rmtree(e.path, ignore_errors=True)
+
+
+_CURRENT_CACHE: Dict[str, Any] = {"key": None, "dir": None}
+
+
+def current_dir(index_dir: str) -> str:
+    """
+    Directorio del build vigente según CURRENT. Sin CURRENT (índices del layout plano
+    anterior, o `index_dir` ya es un build) es el propio `index_dir`. Cacheado por inodo+mtime.
+    """
+    path = os.path.join(index_dir, CURRENT_FILE)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return index_dir
+    key = (path, st.st_ino, st.st_mtime_ns, st.st_size)
+    if _CURRENT_CACHE["key"] != key:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                name = f.read().strip()
+        except OSError:
+            return index_dir
+        _CURRENT_CACHE.update(key=key, dir=os.path.join(index_dir, BUILDS_DIR, name) if name else index_dir)
+    return _CURRENT_CACHE["dir"]
+
+
+_VERSION_CACHE: Dict[str, Any] = {"key": None, "version": None}
+
+
+def read_version(index_dir: str) -> str | None:
+    """Versión del build vigente (None si no hay kb_version.json). Cacheada por mtime."""
+    path = os.path.join(current_dir(index_dir), VERSION_FILE)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (path, st.st_mtime_ns, st.st_size)
+    if _VERSION_CACHE["key"] != key:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                version = json.load(f).get("version")
+        except (OSError, ValueError):
+            return None
+        _VERSION_CACHE.update(key=key, version=version)
+    return _VERSION_CACHE["version"]
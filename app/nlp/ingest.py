@@ -0,0 +1,144 @@
+# app/nlp/ingest.py
+from __future__ import annotations
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+# ------------------------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------------------------
+KB_DIR         = os.getenv("KB_DIR") or os.path.join(os.path.dirname(__file__), "..", "data", "kb")
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "0"))        # 0 = os.cpu_count()
+CHUNK_SIZE     = 600
+CHUNK_OVERLAP  = 60
+
+TEXT_EXTS = (".md", ".markdown", ".txt")
+PDF_EXTS  = (".pdf",)
+
+Page = Tuple[int, str]     # (número de página, 1-based; texto)
+
+
+# ------------------------------------------------------------------------------------
+# Chunking
+# ------------------------------------------------------------------------------------
+def chunk_spans(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[Tuple[int, str]]:
+    """
+    Ventanas de `chunk_size` caracteres con `overlap` de solape.
+    Devuelve (offset en `text`, chunk); se ignoran los espacios al inicio y al final.
+    """
+    lead = len(text) - len(text.lstrip())
+    body = text.strip()
+    spans: List[Tuple[int, str]] = []
+    start, n = 0, len(body)
+    while start < n:
+        end = min(start + chunk_size, n)
+        chunk = body[start:end]
+        if chunk.strip():
+            spans.append((lead + start, chunk))
+        if end == n:
+            break
+        start = max(end - overlap, 0)
+    return spans
+
+
+# ------------------------------------------------------------------------------------
+# Extracción
+# ------------------------------------------------------------------------------------
+def discover(kb_dir: str = KB_DIR, extra: Sequence[str] = ()) -> List[str]:
+    """Archivos soportados bajo kb_dir (recursivo, orden estable) + `extra` si existen."""
+    found: List[str] = []
+    if os.path.isdir(kb_dir):
+        for root, dirs, files in os.walk(kb_dir):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(TEXT_EXTS + PDF_EXTS):
+                    found.append(os.path.join(root, name))
+    found.extend(p for p in extra if os.path.isfile(p) and p not in found)
+    return found
+
+
+def extract_pages(path: str) -> List[Page]:
+    low = path.lower()
+    if low.endswith(PDF_EXTS):
+        try:
+            from pypdf import PdfReader
+        except ImportError as e:
+            raise RuntimeError(f"Para indexar PDFs instala pypdf ({path})") from e
+        reader = PdfReader(path)
+        return [(i + 1, page.extract_text() or "") for i, page in enumerate(reader.pages)]
+    with open(path, "r", encoding="utf-8") as f:
+        return [(1, f.read())]
+
+
+def _extract_doc(args: Tuple[str, str, int, int]) -> Tuple[str, int, List[Dict[str, Any]]]:
+    """Worker del pool: extrae y trocea un documento. Devuelve (source, páginas, chunks)."""
+    path, source, chunk_size, overlap = args
+    pages = extract_pages(path)
+    chunks = [
+        {"text": chunk, "source": source, "page": page_no, "offset": offset}
+        for page_no, text in pages
+        for offset, chunk in chunk_spans(text, chunk_size, overlap)
+    ]
+    return source, len(pages), chunks
+
+
+def iter_documents(
+    paths: Sequence[str],
+    base_dir: str | None = None,
+    workers: int = INGEST_WORKERS,
+    chunk_size: int = CHUNK_SIZE,
+    overlap: int = CHUNK_OVERLAP,
+) -> Iterator[Tuple[str, int, List[Dict[str, Any]]]]:
+    """
+    Extrae los documentos en un pool de procesos y los entrega en orden a medida que
+    están listos, para que el llamador vaya codificando mientras el pool sigue extrayendo.
+    """
+    def _source(p: str) -> str:
+        rel = os.path.relpath(p, base_dir) if base_dir and os.path.isdir(base_dir) else os.path.basename(p)
+        return rel if not rel.startswith("..") else os.path.basename(p)
+
+    jobs = [(p, _source(p).replace(os.sep, "/"), chunk_size, overlap) for p in paths]
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(jobs) <= 1:
+        yield from map(_extract_doc, jobs)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        yield from pool.map(_extract_doc, jobs)
+
+
+# ------------------------------------------------------------------------------------
+# Reporte
+# ------------------------------------------------------------------------------------
+def peak_rss_mb() -> float | None:
+    """Pico de memoria residente (proceso + hijos del pool). None donde no hay `resource` (Windows)."""
+    try:
+        import resource, sys
+    except ImportError:
+        return None
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(kb / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class IngestStats:
+    __slots__ = ("documents", "pages", "chunks", "embedded", "embed_s", "t0")
+
+    def __init__(self):
+        self.documents = self.pages = self.chunks = self.embedded = 0
+        self.embed_s = 0.0          # tiempo en el encoder (incluye la carga del modelo)
+        self.t0 = time.perf_counter()
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = max(time.perf_counter() - self.t0, 1e-9)
+        return {
+            "documents": self.documents,
+            "pages": self.pages,
+            "chunks": self.chunks,
+            "embedded": self.embedded,
+            "reused": self.chunks - self.embedded,
+            "seconds": round(elapsed, 3),
+            "embed_s": round(self.embed_s, 3),
+            "pages_per_s": round(self.pages / elapsed, 1),
+            "chunks_per_s": round(self.chunks / elapsed, 1),
+            "peak_rss_mb": peak_rss_mb(),
+        }
@@ -1,42 +1,44 @@
 # app/nlp/intent.py
 from __future__ import annotations
 import re
+import asyncio
 from typing import Dict, Any, List
-from unidecode import unidecode
 from app.nlp.normalize import norm_txt, parse_numeric
-from app.nlp.tools import finance_plan, kb_tool, search_cars_count, cotiza_car, search_cars  # funciones en tools.py
-from app.router import retrieve_cars, search_cars_count  # construcción del reply (con paginación)
+from app.nlp.tools import finance_plan, akb_tool, search_cars_count, cotiza_car, search_cars  # funciones en tools.py
+from app.nlp.tools import snapshot_search, cars_by_ids, catalog_version, catalog_lexicon
+from app.router import retrieve_cars, search_cars_count, render_results, format_details  # construcción del reply (con paginación)
 from app.settings import DEFAULT_TERM, ALLOWED_TERMS, KAVAK_ANNUAL_RATE
-from app.texts import WELCOME_MSG, DETAILS_AFTER_QUOTE, PROPUESTA_VALOR_KAVAK
+from app.nlp.static_answers import match_static, trie_regex
+from app.nlp.dispatch import IntentMatch, IntentTable
+from app.nlp.intent_model import classify_intent
+from app.config import USE_LLM_INTENT
+from app.nlp.lexicon import BRAND, MODEL, VERSION, Mention
+from app.nlp.aliases import BODY_ALIAS
+from app.nlp.message import (
+    MessageLike, ParsedMessage, as_message, RANGO_PRECIOS_RE, _MIN_RE, _MAX_RE, _YEAR_RE,
+    _money_value,
+)
+from app.nlp.session import Session
+from app.nlp.session_backends import make_session_store
+from app.texts import WELCOME_MSG, DETAILS_AFTER_QUOTE
 
-# Memoria de últimos filtros y offset para paginación
-LAST_FILTERS: dict[str, Dict[str, Any]] = {}  # filtros persistentes por canal
-LAST_OFFSET:  dict[str, int] = {}             # cuántos ya mostramos
-LAST_LIMIT:   dict[str, int] = {}             # tamaño de la última página mostrada
-LAST_PAGE:    dict[str, List[Dict[str, Any]]] = {}  # última página mostrada por canal
-LAST_CTX:     dict[str, Dict[str, Any]] = {} 
-LAST_TOTAL   = {}   # chat_id -> int
+# Memoria por conversación (canal, user_id): filtros, offset/limit de paginación,
+# página visible (número → ID) y contexto de la última cotización.
+# SESSION_BACKEND=memory|sqlite|redis (los dos últimos, compartidos entre workers)
+SESSIONS = make_session_store()
 
 """ contexto de la última conversación por canal 
 Regexes para detectar preguntas y respuestas
+(los disparadores de intención viven en la tabla INTENTS, más abajo)
 """
-# Saludos / menú
-GREET_RE = re.compile(r'^\s*(hola+|buenas|hey|hi|menu|ayuda|start)\b', re.I)
-# Confirmaciones / contacto (robustos)
-YES_RE_RAW   = re.compile(r'^\s*(s[ií]|si|claro|vale|ok(ay)?|de acuerdo|correcto|adelante|por favor)\s*[!.…]*\s*$', re.I)
-NO_RE_RAW    = re.compile(r'^\s*(no|luego|despu[eé]s|gracias)\s*[!.…]*\s*$', re.I)
-# Contacto/asesor (con nombre, email y/o teléfono)
+# Contacto/asesor: el nombre se toma del texto original para conservar mayúsculas
 CONTACT_RE = re.compile(r'^\s*(contact(o|arme)|asesor|ll[aá]mame|llamada)\b(.*)$', re.I)
 EMAIL_RE   = re.compile(r'[\w\.-]+@[\w\.-]+\.\w+')
 PHONE_RE   = re.compile(r'\+?\d{7,15}')
 
+# Verbos de búsqueda; marcas/modelos/versiones salen del léxico del catálogo (catalog_lexicon)
 SEARCH_TRIGGERS = (
     "busca", "buscar", "encuentra", "quiero", "necesito", "muéstrame", "muestrame",
-    # marcas/modelos frecuentes: (amplía tu lista si quieres)
-    "nissan","toyota","chevrolet","honda","mazda","kia","volkswagen","ford","bmw",
-    "sentra","versa","corolla","civic","jetta","swift","tracker",
-    # años frecuentes
-    "2019","2020","2021","2022","2023","2024","2025"
 )
 
 def _details_after_quote(ctx: Dict[str, Any]) -> str:
@@ -54,15 +56,6 @@ def _send_lead_stub(name: str = "", email: str = "", phone: str = "", ctx: Dict[
     if ctx and ctx.get("car_id"): parts.append(f"Interés en ID #{ctx['car_id']}")
     return " | ".join(parts) or "(sin datos)"
 
-def _looks_like_search(t: str) -> bool:
-    """¿El texto contiene señales claras de búsqueda?"""
-    t = norm_txt(t)
-    return any(tok in t for tok in SEARCH_TRIGGERS) \
-           or bool(re.search(r"(19|20)\d{2}", t)) \
-           or bool(RANGO_PRECIOS_RE.search(t)) \
-           or bool(_MIN_RE.search(t)) or bool(_MAX_RE.search(t))
-
-
 """
 Diccionario de sinónimos para evitar ambigüedades en las búsquedas.
 De esta manera, si el usuario escribe "Suv" o "Suv 2020" entonces
@@ -70,7 +63,8 @@ buscará automóviles de carrocería de tipo Suv del año 2020.
 """
 SYNONYMS = {
     "carroceria": {
-        "camioneta", "suv", "sedan", "sedán", "hatchback", "hb", "pickup", "jeep", "coupe", "coupé"
+        "camioneta", "suv", "sedan", "sedán", "hatchback", "hb", "pickup", "jeep", "coupe", "coupé",
+        "camionetas", "suvs", "sedanes", "hatchbacks", "pickups"
     },
     "precio": {
         "barato", "barata", "baratos", "baratas", "economico", "económico", "economica", "económica", "accesible"
@@ -82,105 +76,132 @@ SYNONYMS = {
         "nuevo", "nueva", "nuevos", "nuevas", "ultimo", "último", "modelo", "modelos", "reciente", "último modelo", "ultimo modelo"
     },
     "km": {
-        "usado", "usada", "usados", "usadas", "pocos km", "con poco uso" "kilometraje", "km"
+        "usado", "usada", "usados", "usadas", "pocos km", "con poco uso", "kilometraje", "km"
     },
 }
+# Todas las palabras/frases de SYNONYMS (normalizadas como el mensaje: "sedán" → "sedan")
+# en UNA regex con forma de trie, a palabra completa y prefiriendo la frase más larga
+# ("ultimo modelo" antes que "modelo"); _SYNONYM_GROUP dice a qué grupo pertenece cada una.
+_SYNONYM_GROUP = {norm_txt(w): key for key, words in SYNONYMS.items() for w in words}
+_SYNONYM_RE = re.compile(r"(?<!\w)(?:" + trie_regex(sorted(_SYNONYM_GROUP)) + r")(?!\w)")
+
 
 # Esta función devuelve un diccionario con las palabras sinónimas
-# que se han encontrado en el texto.
-def normalize_intent(text: str) -> dict:
-    t = norm_txt(text)
+# que se han encontrado en el texto (grupo → primera palabra del grupo en el texto).
+def normalize_intent(text: MessageLike) -> dict:
     out = {}
-    for key, words in SYNONYMS.items():
-        for w in words:
-            # usa regex para coincidir palabra/frase completa
-            if re.search(rf"\b{re.escape(w)}\b", t):
-                out[key] = w
-                break
+    for m in _SYNONYM_RE.finditer(as_message(text).norm):
+        out.setdefault(_SYNONYM_GROUP[m.group(0)], m.group(0))
     return out
 
 
-# ---------------- Intent detection sencilla ----------------
-def _detect_intent(text: str) -> str:
-    t = norm_txt(text)
-      # 1) Saludos/menú primero
-    if GREET_RE.match(text or ""):
-        return "greet"
-    # 2) Ayuda explícita
-    if re.search(r"(ayuda|help|qué puedes|que puedes|como me ayudas)", t):
-        return "help"
-    # 3) Finanzas y KB
-    if re.search(r"(mensualidad|mensualidades|enganche|plazo|financia|financiamiento)", t):
-        return "finance"
-    if re.search(r"(garanti|devoluc|proceso|entrega|tiempo|politica)", t):
-        return "kb"
-    # 4) Solo buscamos si hay señales claras
-    if _looks_like_search(t):
-        return "search"
-    # 5) Si es corto/ambiguo → menú/ayuda
-    return "help"
-
-# ---------------- Cotización por ID + enganche ----------------
+
+# ---------------- Tabla de intenciones ----------------
 # Acepta: 50k, 50 k, 50,000, 50.000, 50 000, 50 mil, 50mil, $50 000, etc.
 NUM = r"(?:\d[\d\s.,]*)"  # Permite dígitos con separadores de miles (espacio, coma o punto)
 
-# "cotiza <id> con <enganche>"
-COTIZA_RE = re.compile(
-    rf"(?:^|\s)cotiza\s+(\d{{1,9}})\s+"  # acepta 1..9 dígitos (1=tarjeta; >=3=ID)
+# Quitar filtros: "quita precio", "quita año", "quita marca", "quita modelo", "quita km"
+QUITAR_RE = re.compile(r"\bquita(?:r)?\s+(marca|modelo|a[nñ]o|year|precio|max|min|km|kilometraje|carrocer[ií]a)\b", re.I)
+
+# Plazo / tasa de cotización
+PLAZO = r"(?:a|en)\s*(?P<term>\d{2,3})\s*(?:mes|meses)"
+TASA_RE  = re.compile(r"(?:tasa|inter[eé]s)\s*(?:de)?\s*([0-9]+(?:\.[0-9]+)?)\s*%?", re.I)
+
+# Señales de búsqueda en el catálogo (antes _looks_like_search): disparadores o año; precio aparte
+# (una carrocería también: "una suv barata" es búsqueda aunque no traiga verbo)
+_BODY_WORDS = {w for w, key in _SYNONYM_GROUP.items() if key == "carroceria"}
+_SEARCH_SIGNALS = (trie_regex(sorted({norm_txt(tok) for tok in SEARCH_TRIGGERS}))
+                   + r"|\b(?:" + trie_regex(sorted(_BODY_WORDS)) + r")\b|" + _YEAR_RE.pattern)
+_PRICE_SIGNALS  = "|".join(rx.pattern for rx in (RANGO_PRECIOS_RE, _MIN_RE, _MAX_RE))
+
+"""
+Intenciones en orden de prioridad: gana la primera que aplica. Todas se evalúan sobre
+el texto normalizado (ParsedMessage.norm) con UNA regex combinada que además extrae los
+slots (grupos con nombre). Para agregar una intención: INTENTS.add(...) + @INTENTS.handler.
+"""
+INTENTS = IntentTable()
+# Saludos / menú
+INTENTS.add("greet", r"\s*(?:hola+|buenas|hey|hi|menu|ayuda|start)\b", anchored=True)
+# Confirmaciones
+INTENTS.add("yes", r"\s*(?:si|claro|vale|ok(?:ay)?|de acuerdo|correcto|adelante|por favor)\s*[!.…]*\s*$", anchored=True)
+INTENTS.add("no", r"\s*(?:no|luego|despues|gracias)\s*[!.…]*\s*$", anchored=True)
+# Contacto/asesor (con nombre, email y/o teléfono)
+INTENTS.add("contact", r"\s*(?:contact(?:o|arme)|asesor|llamame|llamada)\b(?P<tail>.*)$", anchored=True)
+# "cotiza <id> con <enganche> [a 48 meses] [tasa 12]"
+INTENTS.add(
+    "cotiza",
+    rf"(?:^|\s)cotiza\s+(?P<car>\d{{1,9}})\s+"  # acepta 1..9 dígitos (1=tarjeta; >=3=ID)
     rf"(?:con|con\s+un\s+enganche\s+de)?\s*"
-    rf"(\$?\s*{NUM}\s*mil|\$?\s*{NUM}\s*k|\$?\s*{NUM})",
-    re.IGNORECASE
+    rf"(?P<down>\$?\s*{NUM}\s*mil|\$?\s*{NUM}\s*k|\$?\s*{NUM})",
+    optional=(PLAZO, r"(?P<rate>(?:tasa|interes)\s*\d)"),
 )
-
-# Rango de precios: "entre 250 000 y 290000", "de 250k a 290k", "250 mil - 290 mil"
-RANGO_PRECIOS_RE = re.compile(
-    r"(?:entre|de)?\s*\$?\s*([\d\s\.,]+(?:k|mil)?)\s*(?:a|y|-)\s*\$?\s*([\d\s\.,]+(?:k|mil)?)",
-    re.IGNORECASE
+# "detalles 2" / "detalle del #322722"
+INTENTS.add("detalles", r"\s*detalles?\s+(?:del?\s+)?#?(?P<n>\d{1,9})\b", anchored=True)
+# Paginación: "ver 3 más", "ver más 3", "ver más"
+INTENTS.add("paginate", r"\bver\s+(?:(?P<n>\d+)\s*mas|mas(?:\s+(?P<n_after>\d+))?)\b")
+# Ayuda explícita
+INTENTS.add("help", trie_regex(["ayuda", "help", "que puedes", "como me ayudas"]))
+# Finanzas: "mensualidades de $350,000 con 50k"
+INTENTS.add(
+    "finance",
+    trie_regex(["mensualidad", "enganche", "plazo", "financia"]),
+    optional=(r"(?P<price>\$?\s*[0-9][0-9,\.]+)",
+              r"(?:enganche\s*de|con)\s*(?P<down>[\$0-9\.,]+k|[\$0-9\.,]+|[0-9]+\s*mil)"),
 )
+# Preguntas para la KB
+INTENTS.add("kb", trie_regex(["garanti", "devoluc", "proceso", "entrega", "tiempo", "politica"]))
+# Solo buscamos si hay señales claras
+INTENTS.add("search", _SEARCH_SIGNALS)
+INTENTS.add("search_price", _PRICE_SIGNALS)     # regex de rango muy laxa: solo si nada más aplicó
+# Sin regla: búsqueda si menciona marca/modelo/versión del catálogo ("un kia rio"); si no, menú/ayuda
 
-# Paginación: "ver 3 más", "siguiente 10"
-PAGINATE_RE = re.compile(r"\bver\s+(?:(\d+)\s*m[aá]s|m[aá]s(?:\s+(\d+))?)\b", re.I)
 
-# Quitar filtros: "quita precio", "quita año", "quita marca", "quita modelo", "quita km"
-QUITAR_RE = re.compile(r"\bquita(?:r)?\s+(marca|modelo|a[nñ]o|year|precio|max|min|km|kilometraje)\b", re.I)
+# Con USE_LLM_INTENT=1 un clasificador local (intent_model: MiniLM + centroides) decide las
+# frases libres. Los comandos con slots (cotiza 2 con 50k, detalles 3, ver más, sí/no exactos)
+# siguen siendo de la regex; el clasificador solo reemplaza a las reglas laxas o a "sin regla",
+# y solo cuando su predicción es confiable (si no, manda la tabla).
+_CLASSIFIER_OVERRIDES = frozenset({"help", "kb", "search", "search_price"})
+_MENU_INTENTS = frozenset({"greet", "help"})
 
-# Plazo de cotización
-PLAZO_RE = re.compile(r"(?:a|en)\s*(\d{2,3})\s*(?:mes|meses)", re.I)
-TASA_RE  = re.compile(r"(?:tasa|inter[eé]s)\s*(?:de)?\s*([0-9]+(?:\.[0-9]+)?)\s*%?", re.I)
 
+def _wants_classifier(m: IntentMatch | None) -> bool:
+    return USE_LLM_INTENT and (m is None or m.name in _CLASSIFIER_OVERRIDES)
 
-def _parse_money(s: str) -> float:
-    """
-    Acepta '50k', '50 k', '$50,000', '50,000', '50 mil', '50mil', '50000', '50 000'
-    """
-    t = norm_txt(s).replace(",", "").replace("$", "").replace(" ", "").strip()
-    # 'k'
-    if t.endswith("k"):
-        base = t[:-1].strip()
-        try:
-            return float(base) * 1000.0
-        except Exception:
-            val = parse_numeric(base)
-            return float(val) * 1000.0 if val is not None else 0.0
-    # 'mil'
-    if t.endswith("mil"):
-        base = t[:-3].strip()
-        try:
-            return float(base) * 1000.0
-        except Exception:
-            val = parse_numeric(base)
-            return float(val) * 1000.0 if val is not None else 0.0
-    # números normales
-    val = parse_numeric(t)
-    return float(val) if val is not None else 0.0
-
-
-def _parse_term(text: str, default: int = DEFAULT_TERM) -> int:
-    m = PLAZO_RE.search(text)
-    if not m:
+
+def _merge_label(msg: ParsedMessage, m: IntentMatch | None, label: str | None) -> IntentMatch | None:
+    if label is None or (m is not None and label == m.name):
+        return m
+    if m is None and label in _MENU_INTENTS:
+        return None         # sin regla → el default ya muestra el menú (o busca si hay marca/modelo)
+    return INTENTS.slots(label, msg.norm)
+
+
+def _scan(msg: ParsedMessage) -> IntentMatch | None:
+    m = INTENTS.scan(msg.norm)
+    return _merge_label(msg, m, classify_intent(msg.norm)) if _wants_classifier(m) else m
+
+
+async def _ascan(msg: ParsedMessage) -> IntentMatch | None:
+    """_scan para route_message: el encoder corre en un hilo, sin bloquear el loop."""
+    m = INTENTS.scan(msg.norm)
+    if not _wants_classifier(m):
+        return m
+    return _merge_label(msg, m, await asyncio.to_thread(classify_intent, msg.norm))
+
+
+def _detect_intent(text: MessageLike) -> str:
+    msg = as_message(text)
+    m = _scan(msg)
+    if m is not None:
+        return m.name
+    return "search" if _names_car(catalog_lexicon().spot(msg.norm)) else "help"
+
+
+def _clamp_term(term_s: str | None, default: int = DEFAULT_TERM) -> int:
+    if not term_s:
         return default
     try:
-        term = int(m.group(1))
+        term = int(term_s)
     except Exception:
         return default
     # ajusta a los plazos permitidos
@@ -189,31 +210,6 @@ def _parse_term(text: str, default: int = DEFAULT_TERM) -> int:
     return term
 
 
-# --- Price bounds (min / max) ---
-_MIN_RE = re.compile(r"(?:más de|mas de|mayor a|arriba de|desde)\s*(\$?\s*[\d\s\.,]+(?:k|mil)?)", re.IGNORECASE)
-_MAX_RE = re.compile(r"(?:menos de|menor a|por debajo de|hasta)\s*(\$?\s*[\d\s\.,]+(?:k|mil)?)", re.IGNORECASE)
-
-def _extract_price_bounds(raw: str) -> tuple[float | None, float | None]:
-    """
-    Detecta price_min (>=) y price_max (<=) a partir de frases como:
-      - "más de 290000", "mayor a 250k", "desde 200 mil"  -> min
-      - "menos de 230000", "hasta 250k", "por debajo de 300 mil" -> max
-    Capturamos el número pegado a la frase para no confundirlo con el año.
-    """
-    price_min = None
-    price_max = None
-
-    m_min = _MIN_RE.search(raw)
-    if m_min:
-        price_min = _parse_money(m_min.group(1))
-
-    m_max = _MAX_RE.search(raw)
-    if m_max:
-        price_max = _parse_money(m_max.group(1))
-
-    return price_min, price_max
-
-
 def _apply_remove_filters(filters: Dict[str, Any], raw: str) -> Dict[str, Any]:
     """
     Si el usuario escribe 'quita <filtro>' en el MISMO mensaje,
@@ -233,30 +229,16 @@ def _apply_remove_filters(filters: Dict[str, Any], raw: str) -> Dict[str, Any]:
         elif t in ("año", "ano", "year"):
             to_remove.add("year_min"); to_remove.add("year_max")
         elif t in ("precio", "max", "min"):
-            to_remove.add("price_min"); to_remove.add("price_max")
+            to_remove.add("price_min"); to_remove.add("price_max"); to_remove.add("sort")
         elif t in ("km", "kilometraje"):
             to_remove.add("km_max")
+        elif t in ("carroceria", "carrocería"):
+            to_remove.add("body")
 
     for k in to_remove:
         filters.pop(k, None)
     return filters
 
-def _match_prop_valor_kavak(text):
-    norm = unidecode((text or "").strip().lower())
-    for kw in [
-        "propuesta de valor",
-        "propuesta valor",
-        "valor de kavak",
-        "por que kavak",
-        "porque kavak",
-        "por que elegir kavak",
-        "por que comprar en kavak",
-        "por que comprar con kavak",
-    ]:
-        if kw in norm:
-            return True
-    return False
-
 # ---------------- Router principal ----------------
 async def route_message(channel: str, text: str, user_id: str | None = None) -> str:
     """
@@ -266,218 +248,242 @@ async def route_message(channel: str, text: str, user_id: str | None = None) ->
       2) Finanzas
       3) KB
       4) Búsqueda en catálogo (con paginación persistente, quita-filtros y rangos de precio)
+    El estado vive en la sesión de (canal, user_id); dos mensajes del mismo usuario se serializan.
     """
-    raw = text or ""
-    t = norm_txt(raw)
-
-    # Propuesta de valor de Kavak/por qué Kavak?
-    if _match_prop_valor_kavak(raw):
-        return PROPUESTA_VALOR_KAVAK
-
-    # ---MENÚ / GREET---
-    if GREET_RE.match(raw):
-        return WELCOME_MSG
-
-    # 0) Confirmaciones: “sí / no” y contacto/asesor
-    if YES_RE_RAW.match(raw):
-        ctx = LAST_CTX.get(channel)
-        if ctx and ctx.get("kind") == "quote":
-            return _details_after_quote(ctx)
-        return "¿De qué te comparto detalles? Puedes decir `detalles 1` o `cotiza <ID>`."
-
-    if NO_RE_RAW.match(raw):
-        return "¡Perfecto! ¿Ajustamos precio, año o prefieres otra marca/modelo?"
-
-    m_contact = CONTACT_RE.match(raw)
-    if m_contact:
-        tail = (m_contact.group(3) or "").strip()
-        email = EMAIL_RE.search(tail).group(0) if EMAIL_RE.search(tail) else ""
-        phone = PHONE_RE.search(tail).group(0) if PHONE_RE.search(tail) else ""
-        name  = tail
-        for token in (email, phone):
-            if token:
-                name = name.replace(token, "").strip(",; ").strip()
-
-        if not email and not phone:
-            return ("Perfecto. Compárteme al menos tu *correo* (ej. `contacto Ana ana@mail.com`) "
-                    "o tu *teléfono* (ej. `llámame al +52...`).")
-
-        summary = f"Nombre: {name or '(sin nombre)'}"
-        if email: summary += f" | Email: {email}"
-        if phone: summary += f" | Tel: {phone}"
-        if (LAST_CTX.get(channel) or {}).get("car_id"):
-            summary += f" | Interés en ID #{LAST_CTX[channel]['car_id']}"
-
-        return f"¡Listo! Un asesor te contactará en breve.\n{summary}"
-
-    # ---------- 1) INTENT: COTIZA (captura primero) ----------
-    m = COTIZA_RE.search(raw)
-    if m:
-        car_token = m.group(1)          # puede ser "1" (tarjeta) o "322722" (ID)
-        down_s    = m.group(2)
-        down_payment = _parse_money(down_s)
-        term = _parse_term(raw, default=DEFAULT_TERM)
-
-        # Resolver número de tarjeta → ID real
-        car_id = None
-        if car_token.isdigit() and len(car_token) <= 3:  # 1..999 como índice visible
-            vis = int(car_token)
-            page_map = LAST_PAGE.get(channel) or {}
-            if vis in page_map:
-                car_id = page_map[vis]
-        else:
-            # si viene un ID directo, úsalo tal cual
-            car_id = car_token
-
-        if not car_id:
-            return ("No pude identificar el auto. Usa `cotiza <número>` sobre los resultados actuales "
-                    "o `cotiza <ID>`.")
-
-        reply = cotiza_car(
-            car_id=car_id,
-            down_payment=down_payment,
-            term=term,
-            annual_rate=None,
-        )
-
-        # guarda contexto para responder “sí”
-        LAST_CTX[channel] = {
-            "kind": "quote",
-            "car_id": car_id,
-            "down_payment": int(down_payment or 0),
-            "term": int(term or 0),
-        }
-
-        # Nota de tasa solo si el usuario la mencionó en el mensaje
-        if re.search(r"(tasa|inter[eé]s)\s*\d", raw, re.I):
-            reply += f"\n\n*Nota:* La tasa la define Kavak y puede variar; estándar {KAVAK_ANNUAL_RATE*100:.1f}%."
-
-        reply += (
-            "\n\nSi quieres avanzar, escribe: `contacto <tu nombre> <correo>` "
-            "o envíame *tu teléfono* con: `llámame al <número>`."
-        )
-        return reply
+    # Normalización, tokens, números, años y cotas de precio: una sola vez por mensaje
+    msg = ParsedMessage(text or "")
+
+    # Respuestas fijas (propuesta de valor / ¿por qué Kavak?, ...): una sola pasada por el texto
+    static = match_static(msg.norm, normalized=True)
+    if static:
+        return static.answer
+
+    # Intención antes del lock: el clasificador (USE_LLM_INTENT) no retiene la sesión
+    m = await _ascan(msg)
+    async with SESSIONS.alocked(channel, user_id) as sess:
+        reply = INTENTS.call(m, sess, msg)
+    if reply is None:
+        # KB: la única rama con await; no toca la sesión, así que corre fuera de su lock
+        return await akb_tool(msg.raw)
+    return reply
+
+
+# ---------------- Handlers por intención: (sesión, mensaje, IntentMatch) ----------------
+@INTENTS.handler("greet")
+@INTENTS.handler("help")
+def _on_menu(sess: Session, msg: ParsedMessage, m: IntentMatch | None) -> str:
+    return WELCOME_MSG
+
+
+def _names_car(mentions: List[Mention]) -> bool:
+    # Una versión sola ("se", "le", "sport") no convierte el mensaje en búsqueda
+    return any(x.kind in (BRAND, MODEL) for x in mentions)
+
+
+@INTENTS.default
+def _on_unmatched(sess: Session, msg: ParsedMessage, m: None) -> str:
+    mentions = catalog_lexicon().spot(msg.norm)
+    if _names_car(mentions):
+        return _on_search(sess, msg, m, mentions)
+    return WELCOME_MSG
+
+
+# 0) Confirmaciones: “sí / no” y contacto/asesor
+@INTENTS.handler("yes")
+def _on_yes(sess: Session, msg: ParsedMessage, m: IntentMatch) -> str:
+    ctx = sess.ctx
+    if ctx and ctx.get("kind") == "quote":
+        return _details_after_quote(ctx)
+    return "¿De qué te comparto detalles? Puedes decir `detalles 1` o `cotiza <ID>`."
+
+
+@INTENTS.handler("no")
+def _on_no(sess: Session, msg: ParsedMessage, m: IntentMatch) -> str:
+    return "¡Perfecto! ¿Ajustamos precio, año o prefieres otra marca/modelo?"
+
+
+@INTENTS.handler("contact")
+def _on_contact(sess: Session, msg: ParsedMessage, m: IntentMatch) -> str:
+    m_raw = CONTACT_RE.match(msg.raw)
+    tail = ((m_raw.group(3) if m_raw else m.get("tail", "")) or "").strip()
+    m_email, m_phone = EMAIL_RE.search(tail), PHONE_RE.search(tail)
+    email = m_email.group(0) if m_email else ""
+    phone = m_phone.group(0) if m_phone else ""
+    name  = tail
+    for token in (email, phone):
+        if token:
+            name = name.replace(token, "").strip(",; ").strip()
+
+    if not email and not phone:
+        return ("Perfecto. Compárteme al menos tu *correo* (ej. `contacto Ana ana@mail.com`) "
+                "o tu *teléfono* (ej. `llámame al +52...`).")
+
+    summary = f"Nombre: {name or '(sin nombre)'}"
+    if email: summary += f" | Email: {email}"
+    if phone: summary += f" | Tel: {phone}"
+    if sess.ctx.get("car_id"):
+        summary += f" | Interés en ID #{sess.ctx['car_id']}"
+
+    return f"¡Listo! Un asesor te contactará en breve.\n{summary}"
+
+
+# ---------- 1) COTIZA <n|ID> con <enganche> ----------
+@INTENTS.handler("cotiza")
+def _on_cotiza(sess: Session, msg: ParsedMessage, m: IntentMatch) -> str:
+    car_token = m.get("car")                # puede ser "1" (tarjeta) o "322722" (ID)
+    down_payment = _money_value(m.get("down", ""))
+    term = _clamp_term(m.get("term"), default=DEFAULT_TERM)
+
+    # Resolver número de tarjeta → ID real
+    if len(car_token) <= 3:                 # 1..999 como índice visible
+        car_id = sess.car_at(int(car_token))
+    else:
+        # si viene un ID directo, úsalo tal cual
+        car_id = car_token
+
+    if not car_id:
+        return ("No pude identificar el auto. Usa `cotiza <número>` sobre los resultados actuales "
+                "o `cotiza <ID>`.")
+
+    reply = cotiza_car(
+        car_id=car_id,
+        down_payment=down_payment,
+        term=term,
+        annual_rate=None,
+    )
+
+    # guarda contexto para responder “sí”
+    sess.ctx = {
+        "kind": "quote",
+        "car_id": car_id,
+        "down_payment": int(down_payment or 0),
+        "term": int(term or 0),
+    }
+
+    # Nota de tasa solo si el usuario la mencionó en el mensaje
+    if m.get("rate"):
+        reply += f"\n\n*Nota:* La tasa la define Kavak y puede variar; estándar {KAVAK_ANNUAL_RATE*100:.1f}%."
 
-    # ---------- 1.5) PAGINACIÓN (ver 3 más / ver más 3 / ver más) ----------
-    m_pag = PAGINATE_RE.search(raw)
-    if m_pag:
-        # cuántos quiere ver
-        how_many = m_pag.group(1) or m_pag.group(2)
-        step = int(how_many) if how_many else LAST_LIMIT.get(channel, 5)
+    reply += (
+        "\n\nSi quieres avanzar, escribe: `contacto <tu nombre> <correo>` "
+        "o envíame *tu teléfono* con: `llámame al <número>`."
+    )
+    return reply
 
-        base_filters = LAST_FILTERS.get(channel)
-        if not base_filters:
-            return "No tengo una búsqueda previa para continuar. Dime qué estás buscando."
 
-        prev_offset = LAST_OFFSET.get(channel, 0)
-        prev_limit  = LAST_LIMIT.get(channel, 5)
-        new_offset  = prev_offset + prev_limit
+# ---------- 1.2) DETALLES <n> ----------
+@INTENTS.handler("detalles")
+def _on_detalles(sess: Session, msg: ParsedMessage, m: IntentMatch) -> str:
+    token = m.get("n")
+    car_id = sess.car_at(int(token)) if len(token) <= 3 else token
+    if not car_id:
+        return "No tengo ese número en tus resultados. Usa `detalles <número>` sobre la última búsqueda."
+    idx = int(token) if len(token) <= 3 else car_id
+    return format_details(idx, cars_by_ids([car_id])[0])
 
-        total = search_cars_count(base_filters)
+
+# ---------- 1.5) PAGINACIÓN (ver 3 más / ver más 3 / ver más) ----------
+@INTENTS.handler("paginate")
+def _on_paginate(sess: Session, msg: ParsedMessage, m: IntentMatch) -> str:
+    # cuántos quiere ver
+    how_many = m.get("n") or m.get("n_after")
+    step = int(how_many) if how_many else sess.limit
+
+    base_filters = sess.filters
+    if not base_filters:
+        return "No tengo una búsqueda previa para continuar. Dime qué estás buscando."
+
+    new_offset = sess.offset + sess.limit
+
+    if sess.snapshot is not None:
+        # Páginas siguientes desde el snapshot: sin re-consultar el catálogo ni re-numerar
+        total = len(sess.snapshot)
         if new_offset >= total:
             return ("Ya no hay más resultados. ¿Ajustamos presupuesto o marca/modelo?")
+        step = min(max(step, 1), total - new_offset)
+        sess.offset = new_offset
+        sess.limit  = step
+        cars = cars_by_ids(sess.snapshot[new_offset:new_offset + step])
+        reply = render_results(dict(base_filters), cars, total, new_offset)
+        if sess.catalog_version != catalog_version():
+            reply += "\n\n_El inventario se actualizó desde tu búsqueda; conservo tu lista y numeración._"
+        return reply
 
-        remaining = total - new_offset
-        step = min(max(step, 1), remaining)
-
-        page_cars = search_cars(base_filters, limit=step, offset=new_offset)
-
-        # 🔁 mapping de índice visible → id real (numeración continua)
-        base_index = new_offset + 1
-        page_map = LAST_PAGE.get(channel, {})
-        for idx, it in enumerate(page_cars, start=base_index):
-            page_map[idx] = str(it.get("id"))
-        LAST_PAGE[channel] = page_map
-
-        LAST_OFFSET[channel] = new_offset
-        LAST_LIMIT[channel]  = step
-
-        return retrieve_cars(base_filters, offset=new_offset, limit=step)
-
-    # ---------- 2) INTENT: finanzas / KB / ayuda ----------
-    intent = _detect_intent(raw)
-
-    if intent in ("greet", "help"):
-        return WELCOME_MSG
-
-    if intent == "finance":
-        price = parse_numeric(re.search(r"(\$?\s*[0-9][0-9,\.]+)", raw).group(0)) if re.search(r"(\$?\s*[0-9][0-9,\.]+)", raw) else None
-        down  = None
-        if m := re.search(r"(?:enganche\s*de|con)\s*([\$0-9\.,]+k|[\$0-9\.,]+|[0-9]+\s*mil)", raw, flags=re.I):
-            down = _parse_money(m.group(1))
-        if price is None or down is None:
-            return ("Para cotizar necesito *precio* y *enganche*. "
-                    "Puedes decir: `cotiza 323668 con 40k` o `mensualidades de $350,000 con 50k`.")
-        plan = finance_plan(price=float(price), down_payment=float(down))
-        lines = [f"Precio ${int(price):,} • Enganche ${int(down):,}"]
-        lines += [f"- {p['term_months']} meses: ${p['monthly']:,.0f}" for p in plan["plans"]]
-        return "*Mensualidades aproximadas:*\n" + "\n".join(lines)
-
-    if intent == "kb":
-        return kb_tool(raw)
-
-    # ---------- 3) BÚSQUEDA (por defecto) ----------
-    # ¿Es una petición de paginación? (ver más N)
-    
-    # Si llegamos aquí y NO hay señales de búsqueda, muestra menú (evita listar por “hola”)
-    if intent != "search":
-        return WELCOME_MSG
-    
-    m_pag = PAGINATE_RE.search(raw)
-    if m_pag:
-        # 1) Cuántos quiere ver ahora (si no pone número, usa el último tamaño o 5)
-        step = int(m_pag.group(2)) if m_pag.group(2) else LAST_LIMIT.get(channel, 5)
-
-        base_filters = LAST_FILTERS.get(channel)
-        if not base_filters:
-            return "No tengo una búsqueda previa para continuar. Dime qué estás buscando."
-
-        # 2) Avanza desde lo ya mostrado (offset previo + tamaño previo)
-        prev_offset = LAST_OFFSET.get(channel, 0)
-        prev_limit  = LAST_LIMIT.get(channel, 5)
-        new_offset  = prev_offset + prev_limit
-
-        # 3) Límite por lo que realmente queda
-        total = search_cars_count(base_filters)
-        if new_offset >= total:
-            return ("No encontré más resultados con esos filtros. "
-                    "Ya no hay más resultados. ¿Ajustamos presupuesto o marca/modelo?")
-        remaining = total - new_offset
-        step = min(max(step, 1), remaining)
-
-        # 4) Guarda la página que vas a mostrar (para mapear 1..N → ID)
-        try:
-            page_cars = search_cars(base_filters, limit=step, offset=new_offset)
-        except Exception:
-            page_cars = []
-        LAST_PAGE[channel] = page_cars
-
-        # 5) Actualiza estado y devuelve el texto renderizado
-        LAST_OFFSET[channel] = new_offset
-        LAST_LIMIT[channel]  = step
-        return retrieve_cars(base_filters, offset=new_offset, limit=step)
+    total = search_cars_count(base_filters)
+    if new_offset >= total:
+        return ("Ya no hay más resultados. ¿Ajustamos presupuesto o marca/modelo?")
+
+    remaining = total - new_offset
+    step = min(max(step, 1), remaining)
+
+    page_cars = search_cars(base_filters, limit=step, offset=new_offset)
+
+    # 🔁 mapping de índice visible → id real (numeración continua); solo la página visible,
+    # para que la sesión no crezca con cada "ver más"
+    sess.page = {idx: str(it.get("id")) for idx, it in enumerate(page_cars, start=new_offset + 1)}
+
+    sess.offset = new_offset
+    sess.limit  = step
+
+    return retrieve_cars(base_filters, offset=new_offset, limit=step)
+
+
+# ---------- 2) Finanzas / KB ----------
+@INTENTS.handler("finance")
+def _on_finance(sess: Session, msg: ParsedMessage, m: IntentMatch) -> str:
+    price = parse_numeric(m.get("price")) if m.get("price") else None
+    down  = _money_value(m.get("down")) if m.get("down") else None
+    if price is None or down is None:
+        return ("Para cotizar necesito *precio* y *enganche*. "
+                "Puedes decir: `cotiza 323668 con 40k` o `mensualidades de $350,000 con 50k`.")
+    plan = finance_plan(price=float(price), down_payment=float(down))
+    lines = [f"Precio ${int(price):,} • Enganche ${int(down):,}"]
+    lines += [f"- {p['term_months']} meses: ${p['monthly']:,.0f}" for p in plan["plans"]]
+    return "*Mensualidades aproximadas:*\n" + "\n".join(lines)
+
+
+@INTENTS.handler("kb")
+def _on_kb(sess: Session, msg: ParsedMessage, m: IntentMatch) -> None:
+    # route_message llama a la KB (async) fuera del lock de la sesión
+    return None
+
+
+# ---------- 3) BÚSQUEDA ----------
+NEW_SEARCH_RE = re.compile(r"\b(busco|buscar|quiero|necesito|recomienda|mu[eé]strame)\b")
+
+
+@INTENTS.handler("search")
+@INTENTS.handler("search_price")
+def _on_search(sess: Session, msg: ParsedMessage, m: IntentMatch | None,
+               mentions: List[Mention] | None = None) -> str:
+    raw, t = msg.raw, msg.norm
+    # Marcas/modelos/versiones mencionadas (léxico del catálogo + alias, una pasada)
+    lexicon = catalog_lexicon()
+    if mentions is None:
+        mentions = lexicon.spot(t)
+    brand   = lexicon.first(mentions, BRAND)
+    model   = lexicon.first(mentions, MODEL)
+    version = lexicon.first(mentions, VERSION)
+    if model and not brand:
+        brand = lexicon.brand_of(model)     # "versa" → nissan; "mazda 3" ya incluye la marca
 
     # ---- Nueva búsqueda o refinamiento ----
     # Mezcla: partimos de los filtros previos (si existían) y sobre-escribimos con lo que el usuario dijo hoy
-    base_filters: Dict[str, Any] = LAST_FILTERS.get(channel, {}).copy()
+    base_filters: Dict[str, Any] = sess.filters.copy()
     filters: Dict[str, Any] = {"raw_text": raw}
 
     # Heurística: si el texto suena a *búsqueda nueva*,
     # NO reutilizamos filtros previos (evita que se cuele un precio viejo, etc.)
-    is_new_search = bool(re.search(r"\b(busco|buscar|quiero|necesito|recomienda|mu[eé]strame)\b", t))
-    has_year      = bool(re.search(r"(19|20)\d{2}", t))
-    has_brand     = any(mk in t for mk in ["nissan","toyota","volkswagen","ford","chevrolet","kia","honda",
-                                        "bmw","mercedes benz","mazda","renault","hyundai"])
-    # Si detectas versión/modelo explícitos en tu parser, puedes sumar más señales:
-    has_version   = bool(re.search(r"\b(sense|advance|exclusive|active|trend|highline|comfortline|xlt|xl|limited|lt|ls|xle|xse|sport|platinum|sr|sv|sl)\b", t))
-
-    if is_new_search or has_year or has_brand or has_version:
+    is_new_search = bool(NEW_SEARCH_RE.search(t))
+    has_year      = bool(msg.years)
+
+    if is_new_search or has_year or brand or model or version:
         base_filters = {}  # reset duro: no arrastrar estado previo
     else:
-        base_filters = LAST_FILTERS.get(channel, {}).copy()
+        base_filters = sess.filters.copy()
 
     # Normaliza las palabras sinónimas
-    ni = normalize_intent(raw)
+    ni = normalize_intent(msg)
     # Si el usuario dice "usado", "pocos km", "con poco uso" → fijamos km_max
     if ni.get("km") in {
         "usado", "usada", "usados", "usadas",
@@ -486,52 +492,29 @@ async def route_message(channel: str, text: str, user_id: str | None = None) ->
         if "km_max" not in filters:
             filters["km_max"] = 100_000
 
+    # Carrocería ("camioneta", "sedán", "hb") → filtro body; "jeep" junto a la marca Jeep es la marca
+    body_word = ni.get("carroceria")
+    if body_word and not (body_word == "jeep" and brand == "jeep"):
+        filters["body"] = BODY_ALIAS.get(body_word, body_word)
+    # "barato", "económico", "accesible" → los más baratos primero
+    if ni.get("precio"):
+        filters["sort"] = "price"
+
     # Año mínimo
-    if m := re.search(r"(19|20)\d{2}", t):
-        try:
-            filters["year_min"] = int(m.group(0))
-        except Exception:
-            pass
+    if msg.years:
+        filters["year_min"] = msg.years[0]
 
     # Rangos/ límites de precio
-    m_range = RANGO_PRECIOS_RE.search(raw)
-    if m_range:
-        v1 = _parse_money(m_range.group(1))
-        v2 = _parse_money(m_range.group(2))
-        lo, hi = (min(v1, v2), max(v1, v2))
-        if lo > 0: filters["price_min"] = lo
-        if hi > 0: filters["price_max"] = hi
-    else:
-        pmin, pmax = _extract_price_bounds(raw)
-        if pmin: filters["price_min"] = pmin
-        if pmax: filters["price_max"] = pmax
-
-    # Marca explícita (lock real lo hace search_cars con fuzzy)
-    for mk in ["nissan","toyota","volkswagen","ford","chevrolet","kia","honda",
-            "bmw","mercedes benz","mazda","renault","hyundai"]:
-        if mk in t:
-            filters["brand"] = mk
-            break
-
-    # Versión explícita (tokens típicos)
-    for ver in ["sense","advance","exclusive","lt","ls","sr","le","xe","xl"]:
-        if f" {ver} " in f" {t} ":
-            filters["version"] = ver
-            break
-
-    VERSION_TOKENS = {
-        "sense", "advance", "exclusive", "active", "trend", "highline",
-        "comfortline", "xlt", "xl", "limited", "lt", "ls", "xle", "xse",
-        "sport", "platinum", "sr", "sv", "sl"
-    }
-    has_version_token = any(tok in t for tok in VERSION_TOKENS)
+    if msg.price_min: filters["price_min"] = msg.price_min
+    if msg.price_max: filters["price_max"] = msg.price_max
 
-    if has_version_token and "model" not in filters:
-        MODEL_TOKENS = ["versa","sentra","march","kicks","altima","note","x-trail","xtrail","x trail","pathfinder","murano"]
-        for mtok in MODEL_TOKENS:
-            if mtok in t:
-                filters["model"] = mtok
-                break
+    # Marca / modelo / versión explícitos (el lock real lo hace search_cars con fuzzy)
+    if brand:
+        filters["brand"] = brand
+    if model:
+        filters["model"] = model
+    if version:
+        filters["version"] = version
 
     # Quitar filtros en el mismo mensaje (quita precio / año / marca / modelo / km)
     filters = _apply_remove_filters(filters, raw)
@@ -544,19 +527,28 @@ async def route_message(channel: str, text: str, user_id: str | None = None) ->
     # Nueva búsqueda empieza en offset 0; guardamos estado para “ver más”
     to_save = dict(filters)
     to_save["raw_text"] = ""     # evita re-inferencias en la siguiente página
-    LAST_FILTERS[channel] = to_save
-    LAST_OFFSET[channel]  = 0
-    LAST_LIMIT[channel]   = 5    # tamaño por defecto de página
+    sess.filters = to_save
+    sess.offset  = 0
+    sess.limit   = 5    # tamaño por defecto de página
 
-    # Guarda la primera página mostrada (mapping índice visible → ID real)
+    # Snapshot inmutable de TODOS los resultados (orden + versión de catálogo):
+    # "ver más", "cotiza <n>" y "detalles <n>" se resuelven desde aquí sin re-consultar
+    try:
+        snap = snapshot_search(filters, msg)
+    except Exception:
+        snap = None
+    if snap is not None:
+        sess.snapshot, sess.catalog_version = snap
+        sess.page = {}
+        return render_results(filters, cars_by_ids(sess.snapshot[:5]), len(sess.snapshot), 0)
+    sess.snapshot, sess.catalog_version = None, ""
+
+    # Sin snapshot (IDs no numéricos): mapping índice visible → ID real de la primera página
     try:
         first_page = search_cars(filters, limit=5, offset=0)
     except Exception:
         first_page = []
 
-    page_map = {}
-    for idx, it in enumerate(first_page, start=1):  # visible 1..5
-        page_map[idx] = str(it.get("id"))
-    LAST_PAGE[channel] = page_map
+    sess.page = {idx: str(it.get("id")) for idx, it in enumerate(first_page, start=1)}  # visible 1..5
 
     return retrieve_cars(filters, offset=0, limit=5)
@@ -0,0 +1,195 @@
+# app/nlp/intent_model.py
+from __future__ import annotations
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.nlp.index_store import write_json_atomic
+from app.nlp.normalize import norm_txt
+
+# ------------------------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------------------------
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+# Frases etiquetadas: una por línea, {"text": "me pueden llamar", "intent": "contact"}
+INTENT_PHRASES_FILE = os.getenv("INTENT_PHRASES") or os.path.join(DATA_DIR, "intent_phrases.jsonl")
+# Centroides entrenados (scripts/train_intent.py); si falta o no coincide, se entrena al arrancar
+INTENT_MODEL_FILE = os.getenv("INTENT_MODEL_FILE") or os.path.join(DATA_DIR, "intent_centroids.json")
+# Similitud coseno mínima con el centroide ganador y ventaja mínima sobre el segundo;
+# por debajo, decide la tabla de regex
+INTENT_MIN_CONF   = float(os.getenv("INTENT_MIN_CONF", "0.55"))
+INTENT_MIN_MARGIN = float(os.getenv("INTENT_MIN_MARGIN", "0.03"))
+INTENT_CACHE_SIZE = int(os.getenv("INTENT_CACHE_SIZE", "2048"))
+
+EncodeFn = Callable[[List[str]], np.ndarray]
+
+
+def load_phrases(path: str = INTENT_PHRASES_FILE) -> List[Tuple[str, str]]:
+    """(texto normalizado, intención) por línea del JSONL; líneas vacías se ignoran."""
+    rows = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                row = json.loads(line)
+                rows.append((norm_txt(row["text"]), row["intent"]))
+    return rows
+
+
+def phrases_version(rows: Sequence[Tuple[str, str]]) -> str:
+    h = hashlib.sha1()
+    for text, label in rows:
+        h.update(f"{label}\t{text}\n".encode("utf-8"))
+    return h.hexdigest()[:12]
+
+
+class IntentPrediction:
+    __slots__ = ("label", "score", "margin", "confident")
+
+    def __init__(self, label: str, score: float, margin: float, confident: bool):
+        self.label = label
+        self.score = score
+        self.margin = margin
+        self.confident = confident
+
+    def __repr__(self) -> str:
+        return f"IntentPrediction({self.label!r}, score={self.score:.3f}, margin={self.margin:.3f})"
+
+
+class IntentClassifier:
+    """
+    Centroide más cercano sobre embeddings de oraciones (el mismo encoder de la KB):
+    cada intención es el promedio normalizado de los embeddings de sus frases de ejemplo,
+    y un mensaje se asigna a la de mayor similitud coseno. Es confiable solo si esa
+    similitud supera `min_conf` y le gana a la segunda por `min_margin`.
+    Las predicciones se cachean por texto normalizado (LRU acotado): los mensajes se repiten.
+    """
+
+    def __init__(self, labels: Sequence[str], centroids: np.ndarray, encode: EncodeFn,
+                 min_conf: float = INTENT_MIN_CONF, min_margin: float = INTENT_MIN_MARGIN,
+                 cache_size: int = INTENT_CACHE_SIZE):
+        self.labels = list(labels)
+        self.centroids = np.asarray(centroids, dtype="float32")
+        self.encode = encode
+        self.min_conf = min_conf
+        self.min_margin = min_margin
+        self.cache_size = max(1, int(cache_size))
+        self._cache: "OrderedDict[str, IntentPrediction]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ---------------- Entrenamiento / persistencia ----------------
+    @classmethod
+    def train(cls, rows: Sequence[Tuple[str, str]], encode: EncodeFn, **kwargs) -> "IntentClassifier":
+        labels = sorted({label for _, label in rows})
+        vecs = encode([text for text, _ in rows])
+        y = np.array([labels.index(label) for _, label in rows])
+        centroids = np.stack([vecs[y == i].mean(axis=0) for i in range(len(labels))])
+        centroids /= np.clip(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12, None)
+        return cls(labels, centroids, encode, **kwargs)
+
+    def save(self, path: str, **meta) -> None:
+        payload = {"labels": self.labels, "centroids": self.centroids.tolist()}
+        payload.update(meta)
+        write_json_atomic(path, payload)
+
+    @classmethod
+    def load(cls, path: str, encode: EncodeFn, **kwargs) -> Tuple["IntentClassifier", Dict]:
+        """Clasificador y metadatos guardados (model, phrases) para validar que sigue vigente."""
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        meta = {k: v for k, v in payload.items() if k not in ("labels", "centroids")}
+        return cls(payload["labels"], np.asarray(payload["centroids"]), encode, **kwargs), meta
+
+    # ---------------- Uso ----------------
+    def _decide(self, sims: np.ndarray) -> IntentPrediction:
+        order = np.argsort(sims)[::-1]
+        best = float(sims[order[0]])
+        margin = best - float(sims[order[1]]) if len(order) > 1 else best
+        return IntentPrediction(self.labels[order[0]], best, margin,
+                                best >= self.min_conf and margin >= self.min_margin)
+
+    def predict_many(self, texts: Sequence[str]) -> List[IntentPrediction]:
+        """Sin caché y en un solo batch (entrenamiento/evaluación)."""
+        if not texts:
+            return []
+        sims = self.encode([norm_txt(t) for t in texts]) @ self.centroids.T
+        return [self._decide(row) for row in sims]
+
+    def predict(self, text: str) -> IntentPrediction:
+        key = norm_txt(text)
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                return hit
+        pred = self._decide((self.encode([key]) @ self.centroids.T)[0])
+        with self._lock:
+            self._cache[key] = pred
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return pred
+
+    def classify(self, text: str) -> Optional[str]:
+        """Intención si la predicción es confiable; None → decide la tabla de regex."""
+        pred = self.predict(text)
+        return pred.label if pred.confident else None
+
+
+# ------------------------------------------------------------------------------------
+# Clasificador compartido del proceso
+# ------------------------------------------------------------------------------------
+def model_key() -> str:
+    from app.nlp.embeddings import EMBED_BACKEND, EMBED_MODEL
+    return f"{EMBED_BACKEND}:{EMBED_MODEL}"
+
+
+def build_classifier(phrases_path: str = INTENT_PHRASES_FILE, model_path: str = INTENT_MODEL_FILE,
+                     encode: EncodeFn | None = None) -> IntentClassifier:
+    """
+    Carga los centroides guardados si fueron entrenados con el mismo encoder y las mismas
+    frases; si no, entrena (un batch de embeddings) y los guarda junto a las frases.
+    """
+    if encode is None:
+        from app.nlp.embeddings import embed as encode
+    rows = load_phrases(phrases_path)
+    want = {"model": model_key(), "phrases": phrases_version(rows)}
+    if os.path.exists(model_path):
+        clf, meta = IntentClassifier.load(model_path, encode)
+        if all(meta.get(k) == v for k, v in want.items()):
+            return clf
+    clf = IntentClassifier.train(rows, encode)
+    try:
+        clf.save(model_path, **want)
+    except OSError:
+        pass                        # directorio de solo lectura: se reentrena en cada arranque
+    return clf
+
+
+_CLASSIFIER: Dict[str, Optional[IntentClassifier]] = {"clf": None, "failed": False}
+_CLF_LOCK = threading.Lock()
+
+
+def get_classifier() -> Optional[IntentClassifier]:
+    """
+    Se crea en el lifespan de la app (o en el primer uso fuera de ella), no al importar. Si
+    el encoder no se puede cargar (sin sentence-transformers / modelo), devuelve None y no se
+    reintenta: manda la regex.
+    """
+    if _CLASSIFIER["clf"] is None and not _CLASSIFIER["failed"]:
+        with _CLF_LOCK:
+            if _CLASSIFIER["clf"] is None and not _CLASSIFIER["failed"]:
+                try:
+                    _CLASSIFIER["clf"] = build_classifier()
+                except Exception:
+                    _CLASSIFIER["failed"] = True
+    return _CLASSIFIER["clf"]
+
+
+def classify_intent(text: str) -> Optional[str]:
+    clf = get_classifier()
+    return clf.classify(text) if clf is not None else None
@@ -0,0 +1,137 @@
+# app/nlp/lexical.py
+from __future__ import annotations
+import os
+import re
+import math
+import json
+from collections import Counter
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+from unidecode import unidecode
+
+# ------------------------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------------------------
+LEXICAL_FILE = "kb_bm25.json"
+
+# Atajo léxico: se salta el embedding si el top-1 BM25 cubre todos los términos de la
+# consulta, supera KB_LEXICAL_MIN_SCORE y le saca KB_LEXICAL_MARGIN× al segundo.
+KB_LEXICAL_MIN_SCORE = float(os.getenv("KB_LEXICAL_MIN_SCORE", "3.0"))
+KB_LEXICAL_MARGIN    = float(os.getenv("KB_LEXICAL_MARGIN", "1.5"))
+# En la fusión solo entran candidatos léxicos que cubren al menos esta fracción de términos
+KB_LEXICAL_MIN_COVERAGE = float(os.getenv("KB_LEXICAL_MIN_COVERAGE", "0.5"))
+RRF_K = 60
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes como con contra cual cuales cuando de del
+desde donde dos el ella ellas ellos en entre era es esa esas ese eso esos esta estas este esto estos
+fue ha hay la las le les lo los mas me mi mis muy ni no nos o os otra otro para pero poco por porque
+puede puedo que quien se sea ser si sin sobre son su sus tambien te tengo ti tiene tu tus un una unas
+uno unos usted y ya yo quiero quisiera saber hola favor
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(unidecode(text or "").lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    BM25 (Okapi) sobre los mismos chunks que kb_meta.json.
+    Índice invertido término → (ids de documento, frecuencias), en arrays de numpy.
+    """
+
+    def __init__(self, postings: Dict[str, Tuple[np.ndarray, np.ndarray]], doc_len: np.ndarray,
+                 k1: float = 1.5, b: float = 0.75):
+        self.postings = postings
+        self.doc_len = np.asarray(doc_len, dtype="float32")
+        self.k1, self.b = float(k1), float(b)
+        self.n_docs = len(self.doc_len)
+        avgdl = float(self.doc_len.mean()) if self.n_docs else 1.0
+        # Normalización por largo precalculada: k1 * (1 - b + b * dl / avgdl)
+        self._norm = self.k1 * (1 - self.b + self.b * self.doc_len / max(avgdl, 1e-9))
+        self._idf = {t: math.log(1 + (self.n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+                     for t, (ids, _) in postings.items()}
+
+    @classmethod
+    def build(cls, texts: Sequence[str], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        acc: Dict[str, Tuple[List[int], List[int]]] = {}
+        doc_len = []
+        for i, text in enumerate(texts):
+            toks = tokenize(text)
+            doc_len.append(len(toks))
+            for term, tf in Counter(toks).items():
+                ids, tfs = acc.setdefault(term, ([], []))
+                ids.append(i)
+                tfs.append(tf)
+        postings = {t: (np.asarray(ids, dtype="int32"), np.asarray(tfs, dtype="float32"))
+                    for t, (ids, tfs) in acc.items()}
+        return cls(postings, np.asarray(doc_len), k1, b)
+
+    def search(self, query: str, k: int = 4) -> Tuple[List[int], List[float], List[float]]:
+        """
+        Top-k por BM25: (ids, scores, cobertura) — cobertura = fracción de términos
+        de la consulta presentes en el documento.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.n_docs:
+            return [], [], []
+        scores = np.zeros(self.n_docs, dtype="float32")
+        hits = np.zeros(self.n_docs, dtype="int32")
+        for t in terms:
+            post = self.postings.get(t)
+            if post is None:
+                continue
+            ids, tf = post
+            scores[ids] += self._idf[t] * tf * (self.k1 + 1) / (tf + self._norm[ids])
+            hits[ids] += 1
+        nz = np.flatnonzero(scores)
+        if not len(nz):
+            return [], [], []
+        top = nz[np.argsort(-scores[nz], kind="stable")[:k]]
+        return ([int(i) for i in top], [float(scores[i]) for i in top],
+                [float(hits[i]) / len(terms) for i in top])
+
+    # ---------------- Persistencia ----------------
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "k1": self.k1, "b": self.b,
+            "doc_len": self.doc_len.astype(int).tolist(),
+            "postings": {t: [ids.tolist(), tf.astype(int).tolist()] for t, (ids, tf) in self.postings.items()},
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "BM25Index":
+        postings = {t: (np.asarray(ids, dtype="int32"), np.asarray(tf, dtype="float32"))
+                    for t, (ids, tf) in data["postings"].items()}
+        return cls(postings, np.asarray(data["doc_len"]), data.get("k1", 1.5), data.get("b", 0.75))
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_json(json.load(f))
+
+
+def is_decisive(scores: Sequence[float], coverage: Sequence[float],
+                min_score: float = KB_LEXICAL_MIN_SCORE, margin: float = KB_LEXICAL_MARGIN) -> bool:
+    """¿El top-1 léxico es tan claro que no vale la pena calcular el embedding?"""
+    if not scores or coverage[0] < 1.0 or scores[0] < min_score:
+        return False
+    return len(scores) == 1 or scores[0] >= margin * scores[1]
+
+
+def rrf_scores(rankings: Sequence[Sequence[int]], rrf_k: int = RRF_K) -> Dict[int, float]:
+    """Reciprocal Rank Fusion: suma 1/(rrf_k + rango) de cada lista, en orden de primera aparición."""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for r, doc in enumerate(ranking):
+            fused[doc] = fused.get(doc, 0.0) + 1.0 / (rrf_k + r + 1)
+    return fused
+
+
+def rrf_fuse(rankings: Sequence[Sequence[int]], k: int, rrf_k: int = RRF_K) -> List[int]:
+    """Top-k por RRF; empates por primera aparición."""
+    fused = rrf_scores(rankings, rrf_k)
+    return sorted(fused, key=lambda d: -fused[d])[:k]
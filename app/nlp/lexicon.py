@@ -0,0 +1,124 @@
+# app/nlp/lexicon.py
+from __future__ import annotations
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from app.nlp.aliases import BRAND_ALIAS, KNOWN_BRANDS, MODEL_ALIAS, STOPWORDS, VERSION_ALIAS
+from app.nlp.normalize import norm_txt
+from app.nlp.static_answers import trie_regex
+
+BRAND, MODEL, VERSION = "brand", "model", "version"
+_KNOWN_BRANDS = frozenset(norm_txt(b) for b in (*KNOWN_BRANDS, *BRAND_ALIAS.values()))
+
+
+class Mention:
+    """Entidad encontrada en el texto: `value` es la forma canónica normalizada (la del catálogo)."""
+    __slots__ = ("kind", "value", "text", "start", "end")
+
+    def __init__(self, kind: str, value: str, text: str, start: int, end: int):
+        self.kind = kind
+        self.value = value
+        self.text = text
+        self.start = start
+        self.end = end
+
+    def __repr__(self) -> str:
+        return f"Mention({self.kind}={self.value!r} @{self.start})"
+
+
+def short_version(phrase: str) -> bool:
+    """Versiones que también son palabras comunes ("se", "le", "s"): no cuentan por sí solas."""
+    return len(phrase) <= 2 or phrase in STOPWORDS
+
+
+def _variants(phrase: str) -> Iterable[str]:
+    # "x-trail" también como "x trail" / "xtrail"; "cr-v" como "cr v" / "crv"
+    yield phrase
+    if "-" in phrase:
+        yield phrase.replace("-", " ")
+        yield phrase.replace("-", "")
+
+
+class Lexicon:
+    """
+    Marcas, modelos y versiones (del catálogo + tablas de alias) compilados en UNA regex con
+    forma de trie (la de static_answers): `spot` encuentra todas las menciones en una pasada,
+    a palabra completa y prefiriendo la frase más larga ("mazda 3" antes que "mazda").
+    Una frase puede ser de varios tipos (p. ej. marca y modelo a la vez).
+    Las versiones solo cuentan junto a una marca o modelo mencionados; las cortas o que son
+    stopwords ("se", "le") además deben ir pegadas a ellos ("elantra se").
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str, str]],
+                 model_brands: Optional[Dict[str, Set[str]]] = None, brands: Iterable[str] = ()):
+        by_phrase: Dict[str, List[Tuple[str, str]]] = {}
+        for phrase, kind, value in entries:
+            for p in _variants(norm_txt(phrase)):
+                if p and (kind, value) not in by_phrase.setdefault(p, []):
+                    by_phrase[p].append((kind, value))
+        self._by_phrase = {p: tuple(v) for p, v in by_phrase.items()}
+        self.model_brands = {m: frozenset(b) for m, b in (model_brands or {}).items()}
+        self.brands = frozenset(norm_txt(b) for b in brands)     # solo las del catálogo
+        self._regex = (re.compile(r"(?<![a-z0-9])(?:" + trie_regex(sorted(self._by_phrase)) + r")(?![a-z0-9])")
+                       if self._by_phrase else re.compile(r"(?!x)x"))
+
+    @classmethod
+    def build(cls, brands: Sequence[str] = (), models: Dict[str, Set[str]] | None = None,
+              versions: Sequence[str] = ()) -> "Lexicon":
+        """`models`: modelo normalizado → marcas que lo tienen. Alias y KNOWN_BRANDS se agregan siempre."""
+        models = models or {}
+        entries: List[Tuple[str, str, str]] = []
+        entries += [(b, BRAND, b) for b in brands]
+        entries += [(m, MODEL, m) for m in models]
+        entries += [(v, VERSION, v) for v in versions]
+        # Alias: typos/abreviaturas → forma canónica (también si el catálogo no tiene la marca)
+        entries += [(a, BRAND, norm_txt(b)) for a, b in BRAND_ALIAS.items()]
+        entries += [(b, BRAND, norm_txt(b)) for b in (*KNOWN_BRANDS, *BRAND_ALIAS.values())]
+        entries += [(a, MODEL, norm_txt(m)) for a, m in MODEL_ALIAS.items()]
+        entries += [(a, VERSION, norm_txt(v)) for a, v in VERSION_ALIAS.items()]
+        return cls(entries, models, brands)
+
+    @classmethod
+    def from_catalog(cls, df) -> "Lexicon":
+        """Desde el DataFrame ya normalizado de tools._load_catalog (_brand_n/_model_n/_version_n)."""
+        models: Dict[str, Set[str]] = {}
+        for b, m in zip(df["_brand_n"].tolist(), df["_model_n"].tolist()):
+            if m and m != "nan":
+                models.setdefault(m, set()).add(b)
+        brands = [b for b in df["_brand_n"].unique().tolist() if b and b != "nan"]
+        versions = []
+        if "_version_n" in df.columns:
+            versions = [v for v in df["_version_n"].unique().tolist() if v and v != "nan"]
+        return cls.build(brands, models, versions)
+
+    def __len__(self) -> int:
+        return len(self._by_phrase)
+
+    def spot(self, text: str) -> List[Mention]:
+        """Todas las menciones en `text` (ya normalizado con norm_txt), en orden de aparición."""
+        out: List[Mention] = []
+        for m in self._regex.finditer(text or ""):
+            for kind, value in self._by_phrase[m.group(0)]:
+                out.append(Mention(kind, value, m.group(0), m.start(), m.end()))
+        if not any(m.kind in (BRAND, MODEL) for m in out):
+            return [m for m in out if m.kind != VERSION]
+        # Versión corta: solo inmediatamente después de una marca/modelo ("elantra se")
+        anchors = {m.end for m in out if m.kind in (BRAND, MODEL)}
+        return [m for m in out
+                if m.kind != VERSION or not short_version(m.text) or m.start - 1 in anchors]
+
+    def first(self, mentions: Sequence[Mention], kind: str) -> Optional[str]:
+        return next((m.value for m in mentions if m.kind == kind), None)
+
+    def off_catalog(self, brand: str) -> bool:
+        """Marca conocida (KNOWN_BRANDS / alias) que el catálogo no tiene: "ford" sin Fords."""
+        return brand in _KNOWN_BRANDS and brand not in self.brands
+
+    def brand_of(self, model: str) -> Optional[str]:
+        """Marca del modelo si el catálogo tiene una sola (versa → nissan)."""
+        brands = self.model_brands.get(model)
+        return next(iter(brands)) if brands and len(brands) == 1 else None
+
+
+# Sin catálogo cargado: solo las tablas de alias
+ALIAS_LEXICON = Lexicon.build()
@@ -0,0 +1,278 @@
+# app/nlp/llm.py
+from __future__ import annotations
+import os
+import time
+import asyncio
+import threading
+import weakref
+from typing import Any, Dict, List
+
+import httpx
+from openai import APITimeoutError, OpenAI, AsyncOpenAI
+
+# ------------------------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------------------------
+LLM_TIMEOUT_S       = float(os.getenv("LLM_TIMEOUT_S", "20"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_RETRIES     = int(os.getenv("LLM_MAX_RETRIES", "1"))
+# Circuit breaker: tras N fallos seguidos se deja de llamar al LLM durante el cooldown
+LLM_BREAKER_FAILURES   = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+LLM_BREAKER_COOLDOWN_S = float(os.getenv("LLM_BREAKER_COOLDOWN_S", "30"))
+
+
+def _api_key() -> str:
+    return os.getenv("OPENAI_API_KEY", "").strip()
+
+
+def _base_url() -> str | None:
+    # Permite apuntar a un servidor compatible con OpenAI (mock local, proxy, etc.)
+    return os.getenv("OPENAI_BASE_URL", "").strip() or None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_CONNECTIONS,
+    )
+
+
+# ------------------------------------------------------------------------------------
+# Clientes compartidos (pool de conexiones keep-alive)
+# ------------------------------------------------------------------------------------
+_SYNC: Dict[str, Any] = {"key": None, "client": None}
+_SYNC_LOCK = threading.Lock()
+
+
+def get_client() -> OpenAI:
+    """
+    Cliente síncrono compartido (para kb_answer fuera del event loop). Si cambian la API key
+    o la URL se crea otro y se cierra el anterior (sus conexiones keep-alive).
+    """
+    key = (_api_key(), _base_url())
+    with _SYNC_LOCK:
+        if _SYNC["key"] != key:
+            if _SYNC["client"] is not None:
+                _SYNC["client"].close()
+            _SYNC["client"] = OpenAI(
+                api_key=key[0], base_url=key[1], max_retries=LLM_MAX_RETRIES,
+                timeout=LLM_TIMEOUT_S, http_client=httpx.Client(limits=_limits()),
+            )
+            _SYNC["key"] = key
+        return _SYNC["client"]
+
+
+class _AsyncPool:
+    """Cliente async + semáforo de concurrencia; ambos quedan ligados a un event loop."""
+    __slots__ = ("key", "client", "sem", "__weakref__")
+
+    def __init__(self, key: tuple):
+        self.key = key
+        self.client = AsyncOpenAI(
+            api_key=key[0], base_url=key[1], max_retries=LLM_MAX_RETRIES,
+            timeout=LLM_TIMEOUT_S, http_client=httpx.AsyncClient(limits=_limits()),
+        )
+        self.sem = asyncio.Semaphore(max(1, LLM_MAX_CONCURRENCY))
+
+
+_POOLS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _AsyncPool]" = weakref.WeakKeyDictionary()
+_CLOSING: set = set()      # cierres en curso de pools reemplazados (referencia fuerte a la tarea)
+
+
+def _pool() -> _AsyncPool:
+    loop = asyncio.get_running_loop()
+    key = (_api_key(), _base_url())
+    pool = _POOLS.get(loop)
+    if pool is None or pool.key != key:
+        if pool is not None:
+            # Config nueva: el cliente viejo se cierra en segundo plano
+            task = loop.create_task(pool.client.close())
+            _CLOSING.add(task)
+            task.add_done_callback(_CLOSING.discard)
+        pool = _POOLS[loop] = _AsyncPool(key)
+    return pool
+
+
+def get_async_client() -> AsyncOpenAI:
+    return _pool().client
+
+
+async def aclose() -> None:
+    """Cierra el pool del loop actual (shutdown de la app)."""
+    pool = _POOLS.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.client.close()
+
+
+# ------------------------------------------------------------------------------------
+# Circuit breaker
+# ------------------------------------------------------------------------------------
+class CircuitOpenError(RuntimeError):
+    """El breaker está abierto: no se intenta la llamada al LLM."""
+
+
+class CircuitBreaker:
+    """
+    closed → (N fallos seguidos) → open → (cooldown) → half-open: deja pasar UNA prueba.
+    Si la prueba sale bien vuelve a closed; si falla, vuelve a open.
+    """
+
+    def __init__(self, failures: int = LLM_BREAKER_FAILURES, cooldown: float = LLM_BREAKER_COOLDOWN_S,
+                 clock=time.monotonic):
+        self.threshold = max(1, int(failures))
+        self.cooldown = float(cooldown)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.reset()
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._failures >= self.threshold:
+                self._opened_at = self._clock()
+
+
+BREAKER = CircuitBreaker()
+
+
+# ------------------------------------------------------------------------------------
+# Llamadas
+# ------------------------------------------------------------------------------------
+# chat() corre en hilos (kb_answer síncrono): los contadores se actualizan bajo lock
+_STATS = {"calls": 0, "errors": 0, "timeouts": 0, "short_circuited": 0, "in_flight": 0, "max_in_flight": 0}
+_STATS_LOCK = threading.Lock()
+_TIMEOUT_ERRORS = (asyncio.TimeoutError, TimeoutError, httpx.TimeoutException, APITimeoutError)
+
+
+def _check_breaker() -> None:
+    if not BREAKER.allow():
+        with _STATS_LOCK:
+            _STATS["short_circuited"] += 1
+        raise CircuitOpenError("LLM deshabilitado temporalmente por fallos repetidos")
+
+
+def _record_start() -> None:
+    with _STATS_LOCK:
+        _STATS["calls"] += 1
+        _STATS["in_flight"] += 1
+        _STATS["max_in_flight"] = max(_STATS["max_in_flight"], _STATS["in_flight"])
+
+
+def _record_end() -> None:
+    with _STATS_LOCK:
+        _STATS["in_flight"] -= 1
+
+
+def _record_error(e: BaseException) -> None:
+    with _STATS_LOCK:
+        _STATS["errors"] += 1
+        if isinstance(e, _TIMEOUT_ERRORS):
+            _STATS["timeouts"] += 1
+
+
+async def achat(
+    messages: List[Dict[str, str]],
+    *,
+    model: str,
+    temperature: float = 0.2,
+    max_tokens: int = 600,
+    timeout: float | None = None,
+) -> str:
+    """
+    Chat completion async con el cliente compartido.
+    - Respeta LLM_MAX_CONCURRENCY (las llamadas extra esperan turno sin bloquear el loop).
+    - timeout por llamada (default LLM_TIMEOUT_S).
+    - Con el breaker abierto lanza CircuitOpenError sin tocar la red.
+    """
+    _check_breaker()
+    pool = _pool()
+    async with pool.sem:
+        _record_start()
+        try:
+            completion = await pool.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=LLM_TIMEOUT_S if timeout is None else timeout,
+            )
+        except asyncio.CancelledError:
+            # Cancelada por el deadline del llamador (asyncio.wait_for): cuenta como timeout
+            _record_error(asyncio.TimeoutError())
+            BREAKER.record_failure()
+            raise
+        except Exception as e:
+            _record_error(e)
+            BREAKER.record_failure()
+            raise
+        finally:
+            _record_end()
+    BREAKER.record_success()
+    return (completion.choices[0].message.content or "").strip()
+
+
+def chat(
+    messages: List[Dict[str, str]],
+    *,
+    model: str,
+    temperature: float = 0.2,
+    max_tokens: int = 600,
+    timeout: float | None = None,
+) -> str:
+    """Versión síncrona (mismo pool de conexiones y mismo breaker)."""
+    _check_breaker()
+    _record_start()
+    try:
+        completion = get_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=LLM_TIMEOUT_S if timeout is None else timeout,
+        )
+    except Exception as e:
+        _record_error(e)
+        BREAKER.record_failure()
+        raise
+    finally:
+        _record_end()
+    BREAKER.record_success()
+    return (completion.choices[0].message.content or "").strip()
+
+
+def metrics() -> Dict[str, Any]:
+    with _STATS_LOCK:
+        out = dict(_STATS)
+    out["max_concurrency"] = LLM_MAX_CONCURRENCY
+    out["timeout_s"] = LLM_TIMEOUT_S
+    out["breaker"] = BREAKER.state
+    return out
@@ -0,0 +1,136 @@
+# app/nlp/message.py
+from __future__ import annotations
+import re
+from typing import Optional, Tuple, Union
+
+from app.nlp.aliases import STOPWORDS
+from app.nlp.normalize import norm_txt, parse_numeric
+
+# ------------------------------------------------------------------------------------
+# Montos y precios (compartidos por intent.py y el parseo del mensaje)
+# ------------------------------------------------------------------------------------
+# Rango de precios: "entre 250 000 y 290000", "de 250k a 290k", "250 mil - 290 mil"
+RANGO_PRECIOS_RE = re.compile(
+    r"(?:entre|de)?\s*\$?\s*([\d\s\.,]+(?:k|mil)?)\s*(?:a|y|-)\s*\$?\s*([\d\s\.,]+(?:k|mil)?)",
+    re.IGNORECASE
+)
+
+# --- Price bounds (min / max) ---
+_MIN_RE = re.compile(r"(?:más de|mas de|mayor a|arriba de|desde)\s*(\$?\s*[\d\s\.,]+(?:k|mil)?)", re.IGNORECASE)
+_MAX_RE = re.compile(r"(?:menos de|menor a|por debajo de|hasta)\s*(\$?\s*[\d\s\.,]+(?:k|mil)?)", re.IGNORECASE)
+
+_YEAR_RE   = re.compile(r"(19|20)\d{2}")
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+_MONEY_RE  = re.compile(r"\$\s*\d[\d.,]*(?:\s*(?:k|mil)\b)?|\d[\d.,]*\s*(?:k|mil)\b")
+
+
+def _money_value(t: str) -> float:
+    """
+    Monto en texto ya normalizado (norm_txt): '50k', '50 k', '$50,000', '50,000', '50 mil',
+    '50mil', '50000', '50 000'.
+    """
+    t = t.replace(",", "").replace("$", "").replace(" ", "").strip()
+    # 'k'
+    if t.endswith("k"):
+        base = t[:-1].strip()
+        try:
+            return float(base) * 1000.0
+        except Exception:
+            val = parse_numeric(base)
+            return float(val) * 1000.0 if val is not None else 0.0
+    # 'mil'
+    if t.endswith("mil"):
+        base = t[:-3].strip()
+        try:
+            return float(base) * 1000.0
+        except Exception:
+            val = parse_numeric(base)
+            return float(val) * 1000.0 if val is not None else 0.0
+    # números normales
+    val = parse_numeric(t)
+    return float(val) if val is not None else 0.0
+
+
+# ------------------------------------------------------------------------------------
+# Mensaje parseado una sola vez
+# ------------------------------------------------------------------------------------
+class ParsedMessage:
+    """
+    Todo lo que las etapas de intención y búsqueda leen del texto, calculado una vez por mensaje:
+      raw        texto original (las regex de comandos como cotiza/contacto corren sobre él)
+      norm       sin acentos, minúsculas, espacios colapsados (norm_txt)
+      tokens     tokens de `norm` sin stopwords de búsqueda
+      numbers    números sueltos; money: montos con $ / k / mil
+      years      años (19xx / 20xx) en orden de aparición
+      price_min / price_max   rango ("entre X y Y") o cotas ("menos de X", "desde Y")
+    `norm` y `tokens` se calculan al construir; el resto la primera vez que alguien lo pide
+    (un "sí" o un "hola" no paga el parseo de precios).
+    """
+    __slots__ = ("raw", "norm", "tokens", "_numbers", "_money", "_years", "_prices")
+
+    def __init__(self, raw: str):
+        self.raw = raw or ""
+        self.norm = t = norm_txt(self.raw)
+        self.tokens: Tuple[str, ...] = tuple(tok for tok in t.split() if tok not in STOPWORDS)
+        self._numbers = self._money = self._years = self._prices = None
+
+    @property
+    def numbers(self) -> Tuple[float, ...]:
+        if self._numbers is None:
+            self._numbers = tuple(v for v in (parse_numeric(n) for n in _NUMBER_RE.findall(self.norm))
+                                  if v is not None)
+        return self._numbers
+
+    @property
+    def money(self) -> Tuple[float, ...]:
+        if self._money is None:
+            self._money = tuple(_money_value(m) for m in _MONEY_RE.findall(self.norm))
+        return self._money
+
+    @property
+    def years(self) -> Tuple[int, ...]:
+        if self._years is None:
+            self._years = tuple(int(m.group(0)) for m in _YEAR_RE.finditer(self.norm))
+        return self._years
+
+    def _price_info(self) -> Tuple[bool, bool, Optional[float], Optional[float]]:
+        if self._prices is None:
+            t = self.norm
+            m_range = RANGO_PRECIOS_RE.search(t)
+            m_min, m_max = _MIN_RE.search(t), _MAX_RE.search(t)
+            if m_range:
+                v1, v2 = _money_value(m_range.group(1)), _money_value(m_range.group(2))
+                lo, hi = min(v1, v2), max(v1, v2)
+            else:
+                lo = _money_value(m_min.group(1)) if m_min else None
+                hi = _money_value(m_max.group(1)) if m_max else None
+            # 0 / None → sin cota
+            self._prices = (bool(m_range), bool(m_min or m_max), lo or None, hi or None)
+        return self._prices
+
+    @property
+    def has_range(self) -> bool:
+        return self._price_info()[0]
+
+    @property
+    def has_bound(self) -> bool:
+        return self._price_info()[1]
+
+    @property
+    def price_min(self) -> Optional[float]:
+        return self._price_info()[2]
+
+    @property
+    def price_max(self) -> Optional[float]:
+        return self._price_info()[3]
+
+    def __repr__(self) -> str:
+        return f"ParsedMessage({self.raw!r})"
+
+
+MessageLike = Union[str, ParsedMessage, None]
+
+
+def as_message(text: MessageLike) -> ParsedMessage:
+    """Acepta texto o un ParsedMessage ya construido (para no re-parsear)."""
+    return text if isinstance(text, ParsedMessage) else ParsedMessage(text or "")
@@ -0,0 +1,103 @@
+# app/nlp/relevance.py
+from __future__ import annotations
+import os
+import json
+import math
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.nlp.index_store import write_json_atomic
+
+log = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------------------------
+# Si se define, manda sobre la calibración guardada junto al índice
+KB_MIN_SCORE_ENV = os.getenv("KB_MIN_SCORE", "").strip()
+THRESHOLD_FILE = "kb_threshold.json"
+
+_CACHE: Dict[str, Any] = {"key": None, "value": 0.0}
+
+
+def load_min_score(index_dir: str, index_version: Optional[str] = None, model: Optional[str] = None) -> float:
+    """
+    Similitud mínima (coseno) que debe tener un pasaje para mandarse al LLM.
+    Orden: KB_MIN_SCORE → <index_dir>/kb_threshold.json → 0.0 (sin filtro).
+    La calibración guarda la versión del índice y el encoder (backend:modelo) con que se
+    midieron los scores; si no coinciden con `index_version` / `model` se ignora (con aviso):
+    tras reconstruir la KB o cambiar de backend los scores ya no son comparables.
+    El archivo se relee solo si cambia en disco.
+    """
+    if KB_MIN_SCORE_ENV:
+        return float(KB_MIN_SCORE_ENV)
+
+    path = os.path.join(index_dir, THRESHOLD_FILE)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return 0.0
+    key = (path, st.st_mtime_ns, index_version, model)
+    if _CACHE["key"] != key:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        stale = [name for name, live in (("index_version", index_version), ("model", model))
+                 if live is not None and data.get(name) is not None and data[name] != live]
+        if stale:
+            log.warning("%s ignorado: %s no coincide con el índice vigente; recalibra con "
+                        "scripts/calibrate_threshold.py", path, ", ".join(stale))
+            _CACHE["value"] = 0.0
+        else:
+            _CACHE["value"] = float(data.get("min_score") or 0.0)
+        _CACHE["key"] = key
+    return _CACHE["value"]
+
+
+def calibrate_min_score(
+    relevant_scores: Sequence[float],
+    offtopic_scores: Sequence[float],
+    min_recall: float = 0.95,
+) -> Dict[str, float]:
+    """
+    Elige el umbral más alto que conserva al menos `min_recall` de las preguntas
+    relevantes (top-1 >= umbral), maximizando así las fuera de tema rechazadas.
+    Recibe el score top-1 de cada pregunta etiquetada.
+    """
+    if not relevant_scores:
+        raise ValueError("Se necesita al menos una pregunta relevante para calibrar")
+
+    pos = sorted(float(s) for s in relevant_scores)
+    neg = [float(s) for s in offtopic_scores]
+
+    # Conservar ceil(min_recall * n) relevantes → el umbral es el score de la peor que se conserva
+    keep = min(len(pos), max(1, math.ceil(min_recall * len(pos) - 1e-9)))
+    # Redondeo hacia abajo: nunca dejar fuera a la relevante que define el umbral
+    threshold = math.floor(pos[len(pos) - keep] * 10_000) / 10_000
+
+    recall = sum(s >= threshold for s in pos) / len(pos)
+    rejected = (sum(s < threshold for s in neg) / len(neg)) if neg else 0.0
+    return {"min_score": threshold, "recall": round(recall, 4), "offtopic_rejected": round(rejected, 4)}
+
+
+def save_calibration(index_dir: str, result: Dict[str, Any], extra: Optional[Dict[str, Any]] = None) -> str:
+    path = os.path.join(index_dir, THRESHOLD_FILE)
+    payload = dict(result)
+    payload.update(extra or {})
+    os.makedirs(index_dir, exist_ok=True)
+    # Atómico: load_min_score puede releerlo a mitad de una consulta
+    write_json_atomic(path, payload, indent=2)
+    return path
+
+
+def load_labeled_queries(path: str) -> List[Dict[str, Any]]:
+    """
+    JSONL con una pregunta por línea: {"query": "...", "relevant": true|false}.
+    """
+    rows = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                row = json.loads(line)
+                rows.append({"query": row["query"], "relevant": bool(row.get("relevant"))})
+    return rows
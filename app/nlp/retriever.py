@@ -2,15 +2,29 @@
 import os
 import json
 import re
+import time
+import asyncio
 from typing import List, Dict, Any
 
 import faiss
 import numpy as np
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
-from openai import OpenAI
 from unidecode import unidecode
-from app.texts import PROPUESTA_VALOR_KAVAK
+from app.nlp.static_answers import match_static
+from app.nlp.faq import FaqTable
+from app.nlp.embeddings import get_backend, model_key
+from app.nlp.batcher import EmbeddingBatcher
+from app.nlp.cache import RetrievalCache, SemanticAnswerCache
+from app.nlp.relevance import load_min_score
+from app.nlp import llm
+from app.nlp.singleflight import SingleFlight
+from app.nlp.extractive import split_sentences, rank_sentences, format_extractive
+from app.nlp.context import assemble_context, count_message_tokens, KB_CONTEXT_TOKENS
+from app.nlp.index_store import INDEX_FILE, META_FILE, current_dir, read_version
+from app.nlp.ann import apply_search_params, load_params
+from app.nlp.lexical import (
+    LEXICAL_FILE, KB_LEXICAL_MIN_COVERAGE, BM25Index, is_decisive, rrf_scores,
+)
 
 # Carga variables de entorno
 load_dotenv()
@@ -18,44 +32,92 @@ load_dotenv()
 # ------------------------------------------------------------------------------------
 # Config
 # ------------------------------------------------------------------------------------
-INDEX_DIR   = os.path.join(os.path.dirname(__file__), "..", "data", "faiss_index")
+INDEX_DIR   = os.getenv("KB_INDEX_DIR") or os.path.join(os.path.dirname(__file__), "..", "data", "faiss_index")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o").strip()
-
-# Instanciamos el modelo de embeddings una vez
-_EMB = SentenceTransformer("all-MiniLM-L6-v2")
+KB_CACHE_SIZE = int(os.getenv("KB_CACHE_SIZE", "1024"))
+# Caché semántica de respuestas (salta el LLM en preguntas casi idénticas)
+KB_ANSWER_CACHE_THRESHOLD = float(os.getenv("KB_ANSWER_CACHE_THRESHOLD", "0.95"))
+KB_ANSWER_CACHE_SIZE      = int(os.getenv("KB_ANSWER_CACHE_SIZE", "512"))
+KB_ANSWER_CACHE_TTL       = float(os.getenv("KB_ANSWER_CACHE_TTL", "3600"))
+# Presupuesto total por pregunta (Twilio corta el webhook a los 15 s). Si al llegar al
+# LLM queda menos de KB_MIN_LLM_BUDGET_S, se responde de forma extractiva sin llamarlo.
+KB_DEADLINE_S       = float(os.getenv("KB_DEADLINE_S", "10"))
+KB_MIN_LLM_BUDGET_S = float(os.getenv("KB_MIN_LLM_BUDGET_S", "0.5"))
+KB_EXTRACTIVE_SENTENCES = int(os.getenv("KB_EXTRACTIVE_SENTENCES", "3"))
 
 # ------------------------------------------------------------------------------------
 # Utilidades de índice y embeddings
 # ------------------------------------------------------------------------------------
+_INDEX_STATE: Dict[str, Any] = {"version": None, "dir": None, "index": None, "meta": [], "rejected": None}
+
+
+def _index_location() -> tuple[str, str] | None:
+    """
+    (directorio del build vigente, versión). La versión es la que estampa build_faiss.py en
+    kb_version.json (hash de los chunks + modelo); índices sin estampa usan mtime+tamaño de
+    kb.index y kb_meta.json. None si no existe.
+    """
+    d = current_dir(INDEX_DIR)
+    try:
+        si, sm = os.stat(os.path.join(d, INDEX_FILE)), os.stat(os.path.join(d, META_FILE))
+    except OSError:
+        return None
+    return d, read_version(d) or f"{si.st_mtime_ns}-{si.st_size}:{sm.st_mtime_ns}-{sm.st_size}"
+
+
+def _index_version() -> str | None:
+    loc = _index_location()
+    return loc[1] if loc else None
+
+
 def _load_index():
     """
-    Carga el índice FAISS (kb.index) y el metadata (kb_meta.json).
+    Carga el índice FAISS (kb.index) y el metadata (kb_meta.json) del build vigente.
+    Se mantiene en memoria mientras la versión en disco no cambie.
     Devuelve: (index, meta) o (None, []) si no existe.
     """
-    index_path = os.path.join(INDEX_DIR, "kb.index")
-    meta_path  = os.path.join(INDEX_DIR, "kb_meta.json")
-    if not (os.path.exists(index_path) and os.path.exists(meta_path)):
+    loc = _index_location()
+    if loc is None:
         return None, []
-    index = faiss.read_index(index_path)
-    with open(meta_path, "r", encoding="utf-8") as f:
-        meta = json.load(f)
-    return index, meta
+    d, version = loc
+    if _INDEX_STATE["version"] != version and _INDEX_STATE["rejected"] != version:
+        index = faiss.read_index(os.path.join(d, INDEX_FILE))
+        apply_search_params(index, load_params(d))   # nprobe / efSearch de índices ANN
+        with open(os.path.join(d, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if index.ntotal != len(meta):
+            # Índice y meta no se corresponden: nunca se sirve (ni en la primera carga);
+            # seguimos con el anterior si lo hay
+            _INDEX_STATE["rejected"] = version
+            return _INDEX_STATE["index"], _INDEX_STATE["meta"]
+        _INDEX_STATE.update(version=version, dir=d, index=index, meta=meta)
+    return _INDEX_STATE["index"], _INDEX_STATE["meta"]
 
 
 def _embed(texts: List[str]) -> np.ndarray:
     """
-    Embeddings locales con sentence-transformers.
+    Embeddings locales con el backend configurado (EMBED_BACKEND: torch, torch-int8, onnx, onnx-int8).
     Devuelve vectores float32 normalizados (para similitud coseno con IndexFlatIP).
     """
-    vecs = _EMB.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
-    return vecs.astype("float32")
+    return get_backend().encode(texts)
 
 
-def _build_prompt(query: str, snippets: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+_PROMPT_STATS: Dict[str, Any] = {
+    "requests": 0, "prompt_tokens": 0, "max_prompt_tokens": 0, "last_prompt_tokens": 0,
+    "context_tokens": 0, "chunks_dropped": 0, "overlap_chars_removed": 0,
+}
+
+
+def _build_prompt(query: str, snippets: List[Dict[str, Any]],
+                  scores: List[float] | None = None) -> tuple[List[Dict[str, str]], int]:
     """
-    Construye el prompt (mensajes) para la llamada a OpenAI.
+    Construye el prompt (mensajes) para la llamada a OpenAI y cuenta sus tokens.
+    El contexto se arma dentro de KB_CONTEXT_TOKENS: chunks por score (similitud densa o
+    RRF de la recuperación; sin scores, en el orden recibido), sin repetir el solape entre
+    chunks consecutivos.
     """
-    contexto = "\n\n".join(s.get("text", "") for s in snippets)
+    ctx = assemble_context(snippets, KB_CONTEXT_TOKENS, scores)
+    contexto = ctx["text"]
     system = (
         "Eres un asistente de soporte de Kavak. Responde en español, "
         "de forma clara, concisa y basada EXCLUSIVAMENTE en el contexto provisto. "
@@ -63,11 +125,30 @@ def _build_prompt(query: str, snippets: List[Dict[str, Any]]) -> List[Dict[str,
         "“¿Quieres que te ponga en contacto con un agente de Kavak?”"
     )
     user = f"Pregunta del usuario: {query}\n\nContexto:\n{contexto}"
-    return [
+    messages = [
         {"role": "system", "content": system},
         {"role": "user",   "content": user},
     ]
 
+    tokens = count_message_tokens(messages)
+    _PROMPT_STATS["requests"] += 1
+    _PROMPT_STATS["prompt_tokens"] += tokens
+    _PROMPT_STATS["max_prompt_tokens"] = max(_PROMPT_STATS["max_prompt_tokens"], tokens)
+    _PROMPT_STATS["last_prompt_tokens"] = tokens
+    _PROMPT_STATS["context_tokens"] += ctx["tokens"]
+    _PROMPT_STATS["chunks_dropped"] += ctx["dropped"]
+    _PROMPT_STATS["overlap_chars_removed"] += ctx["overlap_chars"]
+    return messages, tokens
+
+
+def prompt_metrics() -> Dict[str, Any]:
+    out = dict(_PROMPT_STATS)
+    n = out["requests"]
+    out["avg_prompt_tokens"] = round(out["prompt_tokens"] / n, 1) if n else 0.0
+    out["avg_context_tokens"] = round(out["context_tokens"] / n, 1) if n else 0.0
+    out["context_budget"] = KB_CONTEXT_TOKENS
+    return out
+
 
 def postprocess_no_info(text: str) -> str:
     """
@@ -90,60 +171,154 @@ def postprocess_no_info(text: str) -> str:
     return t
 
 # ------------------------------------------------------------------------------------
-# API principal
+# Etapas del pipeline (compartidas por kb_answer y akb_answer)
 # ------------------------------------------------------------------------------------
-def kb_answer(query: str, k: int = 4, temperature: float = 0.2) -> Dict[str, Any]:
-    """
-    1) Recupera los k pasajes más relevantes de la base (FAISS + embeddings locales).
-    2) Redacta la respuesta con OpenAI usando esos pasajes como contexto.
-    Devuelve: {"answer": str, "sources": [snippets...]}
+def _norm_query(query: str) -> str:
+    return unidecode((query or "").strip().lower())
 
-    Atajo: si la consulta corresponde a "propuesta de valor" de Kavak,
-    devolvemos la respuesta estática (no se toca FAISS ni OpenAI).
+
+def _static_answer(query: str) -> Dict[str, Any] | None:
     """
-    # --- Shortcut robusto ---
-    q_norm = unidecode((query or "").strip().lower())
-    trigger_phrases = [
-        "propuesta de valor",
-        "propuesta valor",
-        "valor de kavak",
-        "por que kavak",
-        "porque kavak",
-        "por que elegir kavak",
-        "por que comprar en kavak",
-        "por que comprar con kavak",
-        "por que elegir a kavak",
-        "por que kavak",
-        "por que en kavak",
-        "que ofrece kavak",
-        "qué ofrece kavak",
-        "porque elegir kavak",
-        "por que comprar con kavak",
-        "por que confiar en kavak",
-        "porque confiar en kavak",
-    ]
-    if any(kw in q_norm for kw in trigger_phrases):
-        return {
-            "answer": PROPUESTA_VALOR_KAVAK,
-            "sources": [{"text": "Fuente: texts.py (manual)"}],
-        }
+    Atajo: si la consulta dispara una respuesta fija (p. ej. "propuesta de valor" de Kavak),
+    la devolvemos sin tocar FAISS ni OpenAI. Registro compartido con route_message.
+    """
+    static = match_static(query)
+    if static:
+        return {"answer": static.answer, "sources": [{"text": static.source}]}
+    return None
 
-    # --- Recuperación en FAISS ---
-    index, meta = _load_index()
-    if not index:
-        return {
-            "answer": "La base de conocimiento no está construida aún. Ejecuta scripts/build_faiss.py",
-            "sources": [],
-        }
 
-    qv = _embed([query])
-    D, I = index.search(qv, k)
+_NO_INDEX = {
+    "answer": "La base de conocimiento no está construida aún. Ejecuta scripts/build_faiss.py",
+    "sources": [],
+}
+
+
+# Caché LRU: consulta normalizada → (embedding, ids top-k), invalidada por versión de índice
+_RCACHE = RetrievalCache(KB_CACHE_SIZE)
+
 
-    hits: List[Dict[str, Any]] = []
-    for idx in I[0]:
+def _cache_key(query: str, k: int) -> tuple:
+    # Misma forma normalizada que el atajo, sin puntuación ni espacios repetidos
+    return (" ".join(re.sub(r"[?!.,;:]+", " ", _norm_query(query)).split()), k)
+
+
+def _search(index, meta: List[Dict[str, Any]], qv: np.ndarray, k: int) -> tuple[List[int], List[float]]:
+    """
+    Top-k de FAISS: (ids, similitudes coseno). Descarta ids inválidos (-1 / fuera de meta).
+    """
+    D, I = index.search(qv, k)
+    ids: List[int] = []
+    scores: List[float] = []
+    for score, idx in zip(D[0], I[0]):
         if isinstance(idx, (int, np.integer)) and 0 <= idx < len(meta):
-            hits.append(meta[idx])
+            ids.append(int(idx))
+            scores.append(float(score))
+    return ids, scores
+
+
+def _relevant(ids: List[int], scores: List[float]) -> tuple[List[int], List[float]]:
+    """
+    Filtra por similitud mínima calibrada (KB_MIN_SCORE o kb_threshold.json).
+    Si nada la supera, no vale la pena llamar al LLM.
+    """
+    min_score = load_min_score(INDEX_DIR, _index_version(), model_key())
+    keep = [(i, sc) for i, sc in zip(ids, scores) if sc >= min_score]
+    return [i for i, _ in keep], [sc for _, sc in keep]
+
+
+def _hits_for_ids(meta: List[Dict[str, Any]], ids: List[int],
+                  scores: List[float] | None = None) -> tuple[List[Dict[str, Any]], List[float] | None]:
+    """Chunks de `ids` y sus scores alineados (se descartan los ids fuera de meta)."""
+    keep = [p for p, i in enumerate(ids) if 0 <= i < len(meta)]
+    return [meta[ids[p]] for p in keep], ([scores[p] for p in keep] if scores is not None else None)
+
+
+# BM25 sobre los mismos chunks (kb_bm25.json de build_faiss; si falta, se arma desde meta)
+_LEX_STATE: Dict[str, Any] = {"meta": None, "index": None}
+_LEX_STATS = {"fast_path": 0, "hybrid": 0, "vector_only": 0}
+
+
+def _lexical_index(meta: List[Dict[str, Any]]) -> BM25Index:
+    if _LEX_STATE["meta"] is not meta:
+        lex = None
+        path = os.path.join(_INDEX_STATE["dir"] or INDEX_DIR, LEXICAL_FILE)
+        if meta is _INDEX_STATE["meta"] and os.path.exists(path):
+            lex = BM25Index.load(path)
+            if lex.n_docs != len(meta):
+                lex = None
+        if lex is None:
+            lex = BM25Index.build([m.get("text", "") for m in meta])
+        _LEX_STATE.update(meta=meta, index=lex)
+    return _LEX_STATE["index"]
+
+
+def _lexical_candidates(meta: List[Dict[str, Any]], query: str, k: int) -> tuple[List[int] | None, List[int]]:
+    """
+    BM25 antes que el embedding. Devuelve (ids del atajo o None, candidatos para fusionar).
+    Atajo: el top-1 cubre todos los términos y domina al segundo → no se calcula embedding.
+    """
+    ids, scores, coverage = _lexical_index(meta).search(query, k)
+    if is_decisive(scores, coverage):
+        _LEX_STATS["fast_path"] += 1
+        return [i for i, c in zip(ids, coverage) if c >= KB_LEXICAL_MIN_COVERAGE], []
+    return None, [i for i, c in zip(ids, coverage) if c >= KB_LEXICAL_MIN_COVERAGE]
+
+
+def _fuse(vec_ids: List[int], vec_scores: List[float], lex_ids: List[int],
+          k: int) -> tuple[List[int], List[float]]:
+    """
+    RRF de los ids vectoriales (ya filtrados por umbral) y los léxicos. Devuelve (ids, scores):
+    similitud coseno si no hubo candidatos léxicos, score RRF si se fusionó.
+    """
+    if not lex_ids:
+        _LEX_STATS["vector_only"] += 1
+        return vec_ids, vec_scores
+    _LEX_STATS["hybrid"] += 1
+    fused = rrf_scores([vec_ids, lex_ids])
+    ids = sorted(fused, key=lambda d: -fused[d])[:k]
+    return ids, [fused[d] for d in ids]
+
+
+# Respuestas precalculadas (scripts/precompute_faq.py), válidas solo para su versión de índice
+_FAQ = FaqTable()
+
+
+def _faq_result(entry: Dict[str, Any] | None, meta: List[Dict[str, Any]]) -> Dict[str, Any] | None:
+    if not entry:
+        return None
+    return {"answer": entry["answer"], "sources": _hits_for_ids(meta, entry["chunk_ids"])[0], "faq": entry["question"]}
+
+
+def faq_metrics() -> Dict[str, Any]:
+    return _FAQ.stats()
+
+
+def retrieval_metrics() -> Dict[str, int]:
+    return dict(_LEX_STATS)
+
+
+# Caché semántica: (embedding, ids de chunks, respuesta) con FAISS pequeño + TTL
+_ACACHE = SemanticAnswerCache(KB_ANSWER_CACHE_THRESHOLD, KB_ANSWER_CACHE_SIZE, KB_ANSWER_CACHE_TTL)
+
+
+def _cached_answer(qv: np.ndarray | None, ids: List[int], version: str | None) -> Dict[str, Any] | None:
+    if qv is None or not (version and ids):
+        return None
+    return _ACACHE.lookup(qv, ids, version)
+
+
+def _remember_answer(qv: np.ndarray | None, ids: List[int], version: str | None,
+                     result: Dict[str, Any], from_llm: bool) -> Dict[str, Any]:
+    if from_llm and qv is not None and version and ids:
+        _ACACHE.put(qv, ids, result, version)
+    return result
 
+
+def _precheck_hits(hits: List[Dict[str, Any]]) -> Dict[str, Any] | None:
+    """
+    Casos que no necesitan LLM: sin pasajes relevantes o sin OPENAI_API_KEY.
+    """
     # Si no hay pasajes relevantes → ofrecer escalar a un agente humano
     if not hits:
         return {
@@ -154,9 +329,7 @@ def kb_answer(query: str, k: int = 4, temperature: float = 0.2) -> Dict[str, Any
             "sources": [],
         }
 
-    # --- Redacción con OpenAI ---
-    api_key = os.getenv("OPENAI_API_KEY", "").strip()
-    if not api_key:
+    if not os.getenv("OPENAI_API_KEY", "").strip():
         # Sin clave, devolvemos el contexto concatenado (mejor que nada)
         contexto = "\n\n".join(h.get("text", "") for h in hits)
         return {
@@ -166,25 +339,48 @@ def kb_answer(query: str, k: int = 4, temperature: float = 0.2) -> Dict[str, Any
             ),
             "sources": hits,
         }
+    return None
+
+
+_FALLBACKS = {"extractive": 0, "deadline": 0, "breaker": 0, "error": 0}
+
+
+def _fallback_reason(e: BaseException) -> str:
+    if isinstance(e, llm.CircuitOpenError):
+        return "breaker"
+    if isinstance(e, asyncio.TimeoutError):
+        return "deadline"
+    return "error"
+
+
+def _extractive_result(qv: np.ndarray, hits: List[Dict[str, Any]], sent_vecs: np.ndarray | None,
+                       sentences: List[str], reason: str) -> Dict[str, Any]:
+    _FALLBACKS["extractive"] += 1
+    _FALLBACKS[reason] += 1
+    top = rank_sentences(qv, sentences, sent_vecs, KB_EXTRACTIVE_SENTENCES) if sentences else []
+    return {"answer": format_extractive(top), "sources": hits, "fallback": reason}
+
+
+def _extractive_answer(qv: np.ndarray, hits: List[Dict[str, Any]], reason: str) -> Dict[str, Any]:
+    """
+    Respuesta sin LLM (timeout, breaker abierto o error): las oraciones de los
+    pasajes recuperados más parecidas a la consulta.
+    """
+    sentences = split_sentences(hits)
+    return _extractive_result(qv, hits, _embed(sentences) if sentences else None, sentences, reason)
 
-    try:
-        client = OpenAI(api_key=api_key)
-        messages = _build_prompt(query, hits)
-        completion = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=600,
-        )
-        answer = (completion.choices[0].message.content or "").strip()
-    except Exception as e:
-        # Fallo de red / API / cuota
-        contexto = "\n\n".join(h.get("text", "") for h in hits)
-        answer = (
-            f"No pude generar la respuesta automáticamente ({e}). "
-            "Te comparto el contexto relevante encontrado:\n\n" + contexto
-        )
 
+async def _aextractive_answer(qv: np.ndarray, hits: List[Dict[str, Any]], reason: str) -> Dict[str, Any]:
+    sentences = split_sentences(hits)
+    vecs = await _BATCHER.embed_many(sentences) if sentences else None
+    return _extractive_result(qv, hits, vecs, sentences, reason)
+
+
+def fallback_metrics() -> Dict[str, int]:
+    return dict(_FALLBACKS)
+
+
+def _finalize_answer(answer: str) -> str:
     # Defensa por si el modelo devuelve vacío
     if not answer:
         answer = (
@@ -211,4 +407,172 @@ def kb_answer(query: str, k: int = 4, temperature: float = 0.2) -> Dict[str, Any
     # Post-procesa por si el modelo dijo “no info” con otras frases
     answer = postprocess_no_info(answer)
 
-    return {"answer": answer, "sources": hits}
\ No newline at end of file
+    return answer
+
+
+def _answer_from_hits(query: str, hits: List[Dict[str, Any]], temperature: float,
+                      qv: np.ndarray | None, scores: List[float] | None = None) -> tuple[Dict[str, Any], bool]:
+    """
+    Redacta la respuesta con OpenAI usando los pasajes recuperados como contexto.
+    Si el LLM falla (o el breaker está abierto) responde de forma extractiva.
+    Devuelve (resultado, from_llm); solo las respuestas del modelo son cacheables.
+    """
+    early = _precheck_hits(hits)
+    if early:
+        return early, False
+
+    messages, tokens = _build_prompt(query, hits, scores)
+    try:
+        answer = llm.chat(messages, model=OPENAI_MODEL, temperature=temperature)
+    except Exception as e:
+        qv = _embed([query]) if qv is None else qv      # atajo léxico: aún no hay embedding
+        return _extractive_answer(qv, hits, _fallback_reason(e)), False
+    return {"answer": _finalize_answer(answer), "sources": hits, "prompt_tokens": tokens}, bool(answer)
+
+
+async def _aanswer_from_hits(query: str, hits: List[Dict[str, Any]], temperature: float,
+                             qv: np.ndarray | None, deadline: float | None = None,
+                             scores: List[float] | None = None) -> tuple[Dict[str, Any], bool]:
+    """
+    Igual que _answer_from_hits con el cliente AsyncOpenAI compartido (no bloquea el loop).
+    El LLM solo recibe el tiempo que queda hasta `deadline` (time.monotonic); si no
+    alcanza o se agota, se responde de forma extractiva.
+    """
+    early = _precheck_hits(hits)
+    if early:
+        return early, False
+
+    messages, tokens = _build_prompt(query, hits, scores)
+    budget = None if deadline is None else deadline - time.monotonic()
+    try:
+        if budget is not None and budget < KB_MIN_LLM_BUDGET_S:
+            raise asyncio.TimeoutError("sin presupuesto para el LLM")
+        answer = await asyncio.wait_for(
+            llm.achat(messages, model=OPENAI_MODEL, temperature=temperature, timeout=budget),
+            budget,
+        )
+    except Exception as e:
+        qv = await _aembed(query) if qv is None else qv
+        return await _aextractive_answer(qv, hits, _fallback_reason(e)), False
+    return {"answer": _finalize_answer(answer), "sources": hits, "prompt_tokens": tokens}, bool(answer)
+
+
+# ------------------------------------------------------------------------------------
+# API principal
+# ------------------------------------------------------------------------------------
+def kb_answer(query: str, k: int = 4, temperature: float = 0.2) -> Dict[str, Any]:
+    """
+    1) Recupera los k pasajes más relevantes de la base (FAISS + embeddings locales).
+    2) Redacta la respuesta con OpenAI usando esos pasajes como contexto.
+    Devuelve: {"answer": str, "sources": [snippets...]}
+
+    Atajo: si la consulta corresponde a "propuesta de valor" de Kavak,
+    devolvemos la respuesta estática (no se toca FAISS ni OpenAI).
+    """
+    static = _static_answer(query)
+    if static:
+        return static
+
+    # --- Recuperación en FAISS (o caché) ---
+    index, meta = _load_index()
+    if not index:
+        return dict(_NO_INDEX)
+
+    key, version = _cache_key(query, k), _index_version()
+    # FAQ precalculada: pregunta canónica exacta (sin embedding) o vecino más cercano
+    faq = _faq_result(_FAQ.by_text(INDEX_DIR, version, query), meta)
+    if faq:
+        return faq
+    fast_ids, lex_ids = _lexical_candidates(meta, query, k)
+    if fast_ids is not None:
+        qv, ids, scores = None, fast_ids, None      # ya en orden BM25
+    else:
+        entry = _RCACHE.get(key, version) if version else None
+        if entry:
+            qv, ids, scores = entry.vec, entry.ids, entry.scores
+        else:
+            qv = _embed([query])
+            ids, scores = _search(index, meta, qv, k)
+            if version:
+                _RCACHE.put(key, version, qv[0], ids, scores)
+        faq = _faq_result(_FAQ.nearest(INDEX_DIR, version, qv), meta)
+        if faq:
+            return faq
+
+        # Sin pasajes sobre el umbral (ni coincidencias léxicas) → escalamos directo, sin LLM
+        ids, scores = _fuse(*_relevant(ids, scores), lex_ids, k)
+    cached = _cached_answer(qv, ids, version)
+    if cached:
+        return cached
+    hits, hit_scores = _hits_for_ids(meta, ids, scores)
+    result, from_llm = _answer_from_hits(query, hits, temperature, qv, hit_scores)
+    return _remember_answer(qv, ids, version, result, from_llm)
+
+
+# Micro-batcher compartido: consultas concurrentes se codifican en una sola llamada.
+# Usa _embed vía lambda para respetar monkeypatches en tests.
+_BATCHER = EmbeddingBatcher(lambda texts: _embed(texts))
+
+
+async def _aembed(query: str) -> np.ndarray:
+    vec = await _BATCHER.embed(query)
+    return vec.reshape(1, -1)
+
+
+# Single-flight: preguntas idénticas en vuelo (misma consulta normalizada + versión de índice)
+# comparten una sola recuperación + llamada al LLM
+_FLIGHT = SingleFlight()
+
+
+async def akb_answer(query: str, k: int = 4, temperature: float = 0.2,
+                     deadline_s: float | None = None) -> Dict[str, Any]:
+    """
+    Versión async de kb_answer para el router: el embedding pasa por el micro-batcher
+    y la redacción usa el cliente AsyncOpenAI compartido (pool + límite de concurrencia).
+    Peticiones idénticas concurrentes se coalescen en un solo cálculo.
+    Presupuesto total: deadline_s (default KB_DEADLINE_S); al agotarse, respuesta extractiva.
+    """
+    static = _static_answer(query)
+    if static:
+        return static
+
+    deadline = time.monotonic() + (KB_DEADLINE_S if deadline_s is None else deadline_s)
+    key = (_cache_key(query, k), _index_version(), temperature)
+    res = await _FLIGHT.do(key, lambda: _akb_answer(query, k, temperature, deadline))
+    return dict(res)   # cada llamador recibe su propia copia
+
+
+async def _akb_answer(query: str, k: int, temperature: float, deadline: float | None = None) -> Dict[str, Any]:
+    index, meta = _load_index()
+    if not index:
+        return dict(_NO_INDEX)
+
+    key, version = _cache_key(query, k), _index_version()
+    # FAQ precalculada: pregunta canónica exacta (sin embedding) o vecino más cercano
+    faq = _faq_result(_FAQ.by_text(INDEX_DIR, version, query), meta)
+    if faq:
+        return faq
+    fast_ids, lex_ids = _lexical_candidates(meta, query, k)
+    if fast_ids is not None:
+        qv, ids, scores = None, fast_ids, None      # ya en orden BM25
+    else:
+        entry = _RCACHE.get(key, version) if version else None
+        if entry:
+            qv, ids, scores = entry.vec, entry.ids, entry.scores
+        else:
+            qv = await _aembed(query)
+            ids, scores = _search(index, meta, qv, k)
+            if version:
+                _RCACHE.put(key, version, qv[0], ids, scores)
+        faq = _faq_result(_FAQ.nearest(INDEX_DIR, version, qv), meta)
+        if faq:
+            return faq
+
+        # Sin pasajes sobre el umbral (ni coincidencias léxicas) → escalamos directo, sin LLM
+        ids, scores = _fuse(*_relevant(ids, scores), lex_ids, k)
+    cached = _cached_answer(qv, ids, version)
+    if cached:
+        return cached
+    hits, hit_scores = _hits_for_ids(meta, ids, scores)
+    result, from_llm = await _aanswer_from_hits(query, hits, temperature, qv, deadline, hit_scores)
+    return _remember_answer(qv, ids, version, result, from_llm)
@@ -0,0 +1,170 @@
+# app/nlp/session.py
+from __future__ import annotations
+import os
+import time
+import threading
+from array import array
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Tuple
+
+# ------------------------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------------------------
+SESSION_MAX       = int(os.getenv("SESSION_MAX", "10000"))          # conversaciones vivas
+SESSION_TTL_S     = float(os.getenv("SESSION_TTL_S", "1800"))       # inactividad antes de olvidar
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(32 * 1024 * 1024)))
+
+SessionKey = Tuple[str, str]
+
+
+class Session:
+    """
+    Estado de una conversación (antes LAST_FILTERS / LAST_OFFSET / LAST_LIMIT / LAST_PAGE / LAST_CTX).
+    `snapshot` son los IDs de todos los resultados de la última búsqueda, en orden (array('I')),
+    calculados con el catálogo `catalog_version`: la tarjeta n es snapshot[n-1].
+    `page` (número visible → ID) solo se usa si el catálogo no admite snapshot.
+    """
+    __slots__ = ("filters", "offset", "limit", "page", "ctx", "snapshot", "catalog_version",
+                 "touched", "size", "lock")
+
+    def __init__(self, now: float = 0.0):
+        self.filters: Dict[str, Any] = {}
+        self.offset = 0
+        self.limit = 5
+        self.page: Dict[int, str] = {}
+        self.ctx: Dict[str, Any] = {}
+        self.snapshot: Optional[array] = None
+        self.catalog_version = ""
+        self.touched = now
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def approx_bytes(self) -> int:
+        # Estimación barata (no sys.getsizeof recursivo): registro + entradas de dict
+        snap = 64 + 4 * len(self.snapshot) if self.snapshot is not None else 0
+        return 160 + snap + 72 * len(self.page) + 96 * (len(self.filters) + len(self.ctx))
+
+    def car_at(self, n: int) -> Optional[str]:
+        """ID del auto en la tarjeta visible n (1-based), O(1)."""
+        if self.snapshot is not None:
+            return str(self.snapshot[n - 1]) if 1 <= n <= len(self.snapshot) else None
+        return self.page.get(n)
+
+
+class SessionStore:
+    """
+    Sesiones por (canal, user_id) con expulsión LRU, TTL por inactividad y tope de memoria.
+    El dict se protege con un lock global corto; cada sesión tiene su propio lock para que
+    dos mensajes del mismo usuario no se pisen y usuarios distintos no se bloqueen entre sí.
+    """
+
+    def __init__(self, maxsize: int = SESSION_MAX, ttl: float = SESSION_TTL_S,
+                 max_bytes: int = SESSION_MAX_BYTES, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = float(ttl)
+        self.max_bytes = int(max_bytes)
+        self._clock = clock
+        self._data: "OrderedDict[SessionKey, Session]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    @staticmethod
+    def key(channel: str, user_id: Optional[str]) -> SessionKey:
+        return (channel or "", user_id or "")
+
+    def _drop(self, key: SessionKey) -> None:
+        sess = self._data.pop(key)
+        self._bytes -= sess.size
+
+    def _expire(self, now: float) -> None:
+        # Las más viejas están al principio: basta con mirar la cabeza
+        while self._data:
+            key, sess = next(iter(self._data.items()))
+            if now - sess.touched <= self.ttl:
+                break
+            self._drop(key)
+            self.expired += 1
+
+    def _shrink(self, keep: SessionKey) -> None:
+        while self._data and (len(self._data) > self.maxsize or self._bytes > self.max_bytes):
+            key = next(iter(self._data))
+            if key == keep:
+                break
+            self._drop(key)
+            self.evicted += 1
+
+    def get(self, channel: str, user_id: Optional[str] = None) -> Session:
+        """Sesión viva de (canal, user_id); crea una vacía si no existe o expiró."""
+        key, now = self.key(channel, user_id), self._clock()
+        with self._lock:
+            self._expire(now)
+            sess = self._data.get(key)
+            if sess is None:
+                sess = Session(now)
+                sess.size = sess.approx_bytes()
+                self._data[key] = sess
+                self._bytes += sess.size
+                self.created += 1
+            else:
+                sess.touched = now
+                self._data.move_to_end(key)
+            self._shrink(key)
+            return sess
+
+    def _account(self, key: SessionKey, sess: Session) -> None:
+        size = sess.approx_bytes()
+        with self._lock:
+            if self._data.get(key) is sess:
+                self._bytes += size - sess.size
+                sess.size = size
+                self._shrink(key)
+
+    @contextmanager
+    def locked(self, channel: str, user_id: Optional[str] = None) -> Iterator[Session]:
+        """
+        with SESSIONS.locked(canal, user_id) as s: ...
+        Serializa los mensajes de un mismo usuario y recalcula su tamaño al salir.
+        """
+        key = self.key(channel, user_id)
+        sess = self.get(channel, user_id)
+        with sess.lock:
+            try:
+                yield sess
+            finally:
+                self._account(key, sess)
+
+    @asynccontextmanager
+    async def alocked(self, channel: str, user_id: Optional[str] = None) -> AsyncIterator[Session]:
+        """`locked` para route_message: en memoria no hay I/O que sacar del loop."""
+        with self.locked(channel, user_id) as sess:
+            yield sess
+
+    def peek(self, channel: str, user_id: Optional[str] = None) -> Optional[Session]:
+        with self._lock:
+            return self._data.get(self.key(channel, user_id))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+            self.created = self.expired = self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_s": self.ttl,
+            "created": self.created,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
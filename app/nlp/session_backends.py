@@ -0,0 +1,389 @@
+# app/nlp/session_backends.py
+from __future__ import annotations
+import os
+import abc
+import sys
+import json
+import time
+import socket
+import asyncio
+import sqlite3
+import threading
+from array import array
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+from app.nlp.session import SESSION_TTL_S, Session, SessionStore
+
+try:
+    import msgpack
+except ImportError:          # opcional: sin msgpack las sesiones se guardan como JSON compacto
+    msgpack = None
+
+# ------------------------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------------------------
+# memory (default, un solo proceso) | sqlite (varios workers en un host) | redis (varios hosts)
+SESSION_BACKEND     = os.getenv("SESSION_BACKEND", "memory")
+SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH") or os.path.join(
+    os.path.dirname(__file__), "..", "data", "sessions.db")
+SESSION_REDIS_URL   = os.getenv("SESSION_REDIS_URL", "redis://127.0.0.1:6379/0")
+
+
+class SessionBackendError(RuntimeError):
+    pass
+
+
+# ------------------------------------------------------------------------------------
+# Serialización compacta
+# ------------------------------------------------------------------------------------
+_FORMAT = 2
+_MSGPACK_TAG = b"\x01"      # JSON nunca empieza con 0x01
+_BIG_ENDIAN = sys.byteorder == "big"
+
+
+def _snapshot_bytes(snap: array) -> bytes:
+    # Siempre little-endian, para que workers de distinta arquitectura compartan sesiones
+    if _BIG_ENDIAN:
+        snap = array("I", snap)
+        snap.byteswap()
+    return snap.tobytes()
+
+
+def _snapshot_from_bytes(data: bytes) -> array:
+    snap = array("I")
+    snap.frombytes(data)
+    if _BIG_ENDIAN:
+        snap.byteswap()
+    return snap
+
+
+def dumps_session(sess: Session) -> bytes:
+    """
+    Lista posicional (sin nombres de campo); la página va aplanada [n1, id1, n2, id2, ...].
+    El snapshot de resultados viaja como bytes crudos (msgpack) o lista de enteros (JSON).
+    """
+    page = [x for kv in sess.page.items() for x in kv]
+    snap = sess.snapshot
+    if msgpack is not None:
+        snap = _snapshot_bytes(snap) if snap is not None else None
+        rec = [_FORMAT, sess.filters, sess.offset, sess.limit, page, sess.ctx, snap, sess.catalog_version]
+        return _MSGPACK_TAG + msgpack.packb(rec, use_bin_type=True)
+    snap = snap.tolist() if snap is not None else None
+    rec = [_FORMAT, sess.filters, sess.offset, sess.limit, page, sess.ctx, snap, sess.catalog_version]
+    return json.dumps(rec, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads_session(blob: Optional[bytes]) -> Session:
+    sess = Session(time.monotonic())
+    if not blob:
+        return sess
+    try:
+        if blob[:1] == _MSGPACK_TAG:
+            if msgpack is None:
+                return sess
+            rec = msgpack.unpackb(blob[1:], raw=False, strict_map_key=False)
+        else:
+            rec = json.loads(blob)
+        if rec[0] != _FORMAT:
+            return sess
+        _, sess.filters, sess.offset, sess.limit, page, sess.ctx, snap, sess.catalog_version = rec
+        if isinstance(snap, bytes):
+            sess.snapshot = _snapshot_from_bytes(snap)
+        elif snap is not None:
+            sess.snapshot = array("I", snap)
+    except (ValueError, TypeError, IndexError, OverflowError):
+        return Session(time.monotonic())        # blob corrupto o de otro formato → sesión nueva
+    sess.page = {int(page[i]): page[i + 1] for i in range(0, len(page), 2)}
+    return sess
+
+
+# ------------------------------------------------------------------------------------
+# Base: sesiones serializadas en un almacén externo
+# ------------------------------------------------------------------------------------
+class BlobSessionStore(abc.ABC):
+    """
+    Misma API que SessionStore (locked / alocked / clear / stats), pero cada mensaje hace UNA
+    lectura (que además renueva el TTL) y, solo si la sesión cambió, UNA escritura del blob
+    completo. Los mensajes de un mismo usuario se serializan dentro del proceso con locks por
+    franja; entre procesos gana la última escritura. En `alocked` (route_message) la lectura
+    y la escritura corren en un hilo para no bloquear el loop.
+    """
+
+    kind = "blob"
+
+    def __init__(self, ttl: float = SESSION_TTL_S, stripes: int = 64):
+        self.ttl = float(ttl)
+        n = max(1, stripes)
+        self._stripes = [threading.Lock() for _ in range(n)]
+        # Franjas del camino async: un lock de hilo retenido entre awaits podría agotar el
+        # pool de asyncio.to_thread con mensajes en espera del mismo usuario
+        self._astripes = [asyncio.Lock() for _ in range(n)]
+        self.reads = 0
+        self.writes = 0
+        self.unchanged = 0
+
+    @staticmethod
+    def key(channel: str, user_id: Optional[str]) -> str:
+        return f"sess:{channel or ''}:{user_id or ''}"
+
+    # ---- a implementar por cada backend (I/O bloqueante) ----
+    @abc.abstractmethod
+    def _load(self, key: str) -> Optional[bytes]: ...
+
+    @abc.abstractmethod
+    def _store(self, key: str, blob: bytes) -> None: ...
+
+    @abc.abstractmethod
+    def _clear(self) -> None: ...
+
+    @abc.abstractmethod
+    def _count(self) -> int: ...
+
+    # ---- API común ----
+    def _stripe(self, key: str) -> int:
+        return hash(key) % len(self._stripes)
+
+    def _changed(self, blob: Optional[bytes], sess: Session) -> Optional[bytes]:
+        """Blob nuevo si la sesión cambió; None si no hay nada que escribir."""
+        new = dumps_session(sess)
+        if new == blob:
+            self.unchanged += 1
+            return None
+        self.writes += 1
+        return new
+
+    @contextmanager
+    def locked(self, channel: str, user_id: Optional[str] = None) -> Iterator[Session]:
+        key = self.key(channel, user_id)
+        with self._stripes[self._stripe(key)]:
+            blob = self._load(key)
+            self.reads += 1
+            sess = loads_session(blob)
+            yield sess
+            # Si la rama lanzó excepción no llegamos aquí: no se persiste un estado a medias
+            new = self._changed(blob, sess)
+            if new is not None:
+                self._store(key, new)
+
+    @asynccontextmanager
+    async def alocked(self, channel: str, user_id: Optional[str] = None) -> AsyncIterator[Session]:
+        """`locked` para código async: _load/_store en un hilo, el loop sigue atendiendo."""
+        key = self.key(channel, user_id)
+        async with self._astripes[self._stripe(key)]:
+            blob = await asyncio.to_thread(self._load, key)
+            self.reads += 1
+            sess = loads_session(blob)
+            yield sess
+            new = self._changed(blob, sess)
+            if new is not None:
+                await asyncio.to_thread(self._store, key, new)
+
+    def clear(self) -> None:
+        self._clear()
+        self.reads = self.writes = self.unchanged = 0
+
+    def __len__(self) -> int:
+        return self._count()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.kind, "ttl_s": self.ttl, "reads": self.reads,
+                "writes": self.writes, "unchanged": self.unchanged,
+                "format": "msgpack" if msgpack is not None else "json"}
+
+
+# ------------------------------------------------------------------------------------
+# SQLite (WAL): varios workers de uvicorn en el mismo host
+# ------------------------------------------------------------------------------------
+class SQLiteSessionStore(BlobSessionStore):
+    kind = "sqlite"
+    _PURGE_EVERY = 256
+
+    def __init__(self, path: str = SESSION_SQLITE_PATH, ttl: float = SESSION_TTL_S, **kwargs):
+        super().__init__(ttl, **kwargs)
+        self.path = path
+        self._local = threading.local()
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " key TEXT PRIMARY KEY, data BLOB NOT NULL, expires REAL NOT NULL) WITHOUT ROWID"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        # Una conexión por hilo; autocommit (cada sentencia es su propia transacción)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _load(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        # Lee y renueva la expiración en una sola sentencia
+        rows = self._conn().execute(
+            "UPDATE sessions SET expires = ? WHERE key = ? AND expires > ? RETURNING data",
+            (now + self.ttl, key, now),
+        ).fetchall()                 # consumir todo: cierra la sentencia y libera el lock de escritura
+        return bytes(rows[0][0]) if rows else None
+
+    def _store(self, key: str, blob: bytes) -> None:
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO sessions (key, data, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET data = excluded.data, expires = excluded.expires",
+            (key, blob, now + self.ttl),
+        )
+        if (self.writes + 1) % self._PURGE_EVERY == 0:
+            conn.execute("DELETE FROM sessions WHERE expires <= ?", (now,))
+
+    def _clear(self) -> None:
+        self._conn().execute("DELETE FROM sessions")
+
+    def _count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM sessions WHERE expires > ?", (time.time(),)).fetchone()[0]
+
+
+# ------------------------------------------------------------------------------------
+# Protocolo Redis (RESP2): Redis, Valkey, KeyDB, ...
+# ------------------------------------------------------------------------------------
+class RespClient:
+    """
+    Cliente RESP mínimo (GET/SET/... sin dependencias). Una conexión por hilo;
+    reintenta una vez si la conexión se cayó.
+    """
+
+    def __init__(self, url: str = SESSION_REDIS_URL, timeout: float = 2.0):
+        u = urlparse(url)
+        if u.scheme not in ("redis", ""):
+            raise SessionBackendError(f"URL de sesiones no soportada: {url!r} (usa redis://host:puerto/db)")
+        self.host = u.hostname or "127.0.0.1"
+        self.port = u.port or 6379
+        self.db = int((u.path or "/0").lstrip("/") or 0)
+        self.password = u.password
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @staticmethod
+    def _encode(args) -> bytes:
+        out = [b"*%d\r\n" % len(args)]
+        for a in args:
+            b = a if isinstance(a, bytes) else str(a).encode("utf-8")
+            out.append(b"$%d\r\n%s\r\n" % (len(b), b))
+        return b"".join(out)
+
+    def _read(self, f):
+        line = f.readline()
+        if not line:
+            raise ConnectionError("conexión cerrada por el servidor")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise SessionBackendError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            n = int(rest)
+            if n < 0:
+                return None
+            data = f.read(n + 2)
+            return data[:-2]
+        if kind == b"*":
+            n = int(rest)
+            return None if n < 0 else [self._read(f) for _ in range(n)]
+        raise SessionBackendError(f"respuesta RESP inválida: {line!r}")
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = (sock, sock.makefile("rb"))
+        self._local.conn = conn
+        init = []
+        if self.password:
+            init.append(("AUTH", self.password))
+        if self.db:
+            init.append(("SELECT", self.db))
+        if init:
+            self._roundtrip(init)
+        return conn
+
+    def _roundtrip(self, commands) -> List[Any]:
+        sock, f = getattr(self._local, "conn", None) or self._connect()
+        sock.sendall(b"".join(self._encode(c) for c in commands))
+        return [self._read(f) for _ in commands]
+
+    def pipeline(self, *commands) -> List[Any]:
+        """Envía todos los comandos juntos y lee todas las respuestas: un solo viaje de red."""
+        try:
+            return self._roundtrip(commands)
+        except (ConnectionError, OSError):
+            self.close()
+            return self._roundtrip(commands)
+
+    def execute(self, *args) -> Any:
+        return self.pipeline(args)[0]
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn:
+            try:
+                conn[1].close()
+                conn[0].close()
+            except OSError:
+                pass
+
+
+class RedisSessionStore(BlobSessionStore):
+    kind = "redis"
+
+    def __init__(self, url: str = SESSION_REDIS_URL, ttl: float = SESSION_TTL_S, prefix: str = "kavak:", **kwargs):
+        super().__init__(ttl, **kwargs)
+        self.client = RespClient(url)
+        self.prefix = prefix
+
+    def _ttl_ms(self) -> int:
+        return max(1, int(self.ttl * 1000))
+
+    def _load(self, key: str) -> Optional[bytes]:
+        # GETEX lee y renueva la expiración (Redis ≥ 6.2) en el mismo viaje
+        return self.client.execute("GETEX", self.prefix + key, "PX", self._ttl_ms())
+
+    def _store(self, key: str, blob: bytes) -> None:
+        self.client.execute("SET", self.prefix + key, blob, "PX", self._ttl_ms())
+
+    def _keys(self) -> List[bytes]:
+        # SCAN por lotes: KEYS bloquea al servidor mientras recorre todas las llaves
+        keys, cursor = [], b"0"
+        while True:
+            cursor, batch = self.client.execute("SCAN", cursor, "MATCH", self.prefix + "sess:*", "COUNT", 500)
+            keys.extend(batch or [])
+            if cursor in (b"0", "0"):
+                return keys
+
+    def _clear(self) -> None:
+        keys = self._keys()
+        if keys:
+            self.client.execute("DEL", *keys)
+
+    def _count(self) -> int:
+        return len(self._keys())
+
+
+# ------------------------------------------------------------------------------------
+# Fábrica
+# ------------------------------------------------------------------------------------
+def make_session_store(kind: str = SESSION_BACKEND, **kwargs):
+    kind = (kind or "memory").strip().lower()
+    if kind == "memory":
+        return SessionStore(**kwargs)
+    if kind == "sqlite":
+        return SQLiteSessionStore(**kwargs)
+    if kind == "redis":
+        return RedisSessionStore(**kwargs)
+    raise ValueError(f"SESSION_BACKEND desconocido: {kind!r} (usa memory, sqlite o redis)")
@@ -0,0 +1,62 @@
+# app/nlp/singleflight.py
+from __future__ import annotations
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalescencia de peticiones idénticas en vuelo (estilo "singleflight" de Go).
+    La primera petición con una clave arranca el cálculo como tarea; las que llegan
+    mientras sigue en vuelo esperan esa misma tarea.
+    - Si el cálculo falla, todas las que esperaban reciben la excepción y la clave
+      se libera (la siguiente petición reintenta).
+    - Si una petición se cancela o vence su propio timeout, el cálculo compartido
+      sigue para las demás (asyncio.shield).
+    """
+
+    def __init__(self):
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]], timeout: float | None = None) -> T:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop, self._calls = loop, {}
+
+        task = self._calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = loop.create_task(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t, key=key: self._forget(key, t))
+        else:
+            self.coalesced += 1
+
+        if timeout is None:
+            return await asyncio.shield(task)
+        return await asyncio.wait_for(asyncio.shield(task), timeout)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def metrics(self) -> Dict[str, Any]:
+        total = self.leaders + self.coalesced
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "in_flight": len(self._calls),
+            "coalesce_rate": round(self.coalesced / total, 4) if total else 0.0,
+        }
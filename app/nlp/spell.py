@@ -0,0 +1,144 @@
+# app/nlp/spell.py
+from __future__ import annotations
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Collection, Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, Tuple
+
+from rapidfuzz.distance import OSA
+
+from app.nlp.aliases import BRAND_ALIAS, MODEL_ALIAS, STOPWORDS
+
+_YEAR_RE = re.compile(r"(19|20)\d{2}")
+
+
+@lru_cache(maxsize=8192)          # consultas: las mismas palabras se repiten entre mensajes
+def _deletes(word: str, n: int) -> FrozenSet[str]:
+    """`word` y todas sus variantes con hasta `n` caracteres borrados."""
+    out, level = {word}, {word}
+    for _ in range(n):
+        level = {w[:i] + w[i + 1:] for w in level for i in range(len(w))}
+        out |= level
+    return frozenset(out)
+
+
+def max_edits(term: str) -> int:
+    """
+    Ediciones toleradas según el largo (el mismo corte de similitud ~0.8 de la cascada fuzzy):
+    ≤4 letras solo exacto ("poco" no es "polo"), 5–7 → 1, ≥8 → 2.
+    """
+    n = len(term)
+    return 0 if n <= 4 else 1 if n <= 7 else 2
+
+
+def phrases(t_full: str) -> List[str]:
+    """Unigramas y bigramas útiles de un texto normalizado (candidatos a marca/modelo)."""
+    words = t_full.split()
+    # Bigramas primero (nombres de dos palabras), luego unigramas útiles
+    grams = [f"{a} {b}" for a, b in zip(words, words[1:]) if a not in STOPWORDS and b not in STOPWORDS]
+    # Números solo si no parecen año ("208" sí, "2020" no)
+    grams += [w for w in words if w not in STOPWORDS and not _YEAR_RE.fullmatch(w)]
+    return grams
+
+
+class SymSpell:
+    """
+    Corrección por vecindario de borrados (SymSpell): para cada palabra del vocabulario se
+    indexan sus variantes con hasta `max_distance` borrados del prefijo. Una consulta genera
+    sus propios borrados y solo verifica (distancia OSA) las palabras que comparten alguno,
+    así el costo no crece con el tamaño del vocabulario.
+    """
+
+    def __init__(self, words: Iterable[str], max_distance: int = 2, prefix_length: int = 7,
+                 counts: Optional[Mapping[str, int]] = None):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.counts: Dict[str, int] = dict(counts or {})
+        self._words: Set[str] = set()
+        self._deletes: Dict[str, List[str]] = {}
+        for w in words:
+            self.add(w)
+
+    def add(self, word: str) -> None:
+        if not word or word in self._words:
+            return
+        self._words.add(word)
+        for d in _deletes.__wrapped__(word[:self.prefix_length], self.max_distance):
+            self._deletes.setdefault(d, []).append(word)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._words
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def lookup(self, term: str, max_distance: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Palabras a distancia ≤ max_distance, de la más cercana (y más frecuente) a la más lejana."""
+        if term in self._words:
+            return [(term, 0)]
+        md = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        if md <= 0 or not term:
+            return []
+        seen: Set[str] = set()
+        out: List[Tuple[str, int]] = []
+        for d in _deletes(term[:self.prefix_length], md):
+            for w in self._deletes.get(d, ()):
+                if w in seen:
+                    continue
+                seen.add(w)
+                if abs(len(w) - len(term)) > md:
+                    continue
+                dist = OSA.distance(term, w, score_cutoff=md)
+                if dist <= md:
+                    out.append((w, dist))
+        out.sort(key=lambda x: (x[1], -self.counts.get(x[0], 0), x[0]))
+        return out
+
+
+class CatalogSpeller:
+    """
+    Marca y modelo desde texto libre con typos: alias (BRAND_ALIAS / MODEL_ALIAS) primero,
+    como corrección manual que manda; luego SymSpell sobre unigramas y bigramas del texto
+    ("mercedes bens", "clase c"), con el umbral de max_edits por largo.
+    """
+
+    def __init__(self, brands: Iterable[str], models: Iterable[str],
+                 counts: Optional[Mapping[str, int]] = None):
+        counts = Counter(counts or {})
+        self.brands = SymSpell(brands, counts=counts)
+        self.models = SymSpell(models, counts=counts)
+
+    @classmethod
+    def from_catalog(cls, df) -> "CatalogSpeller":
+        counts = Counter(df["_brand_n"].tolist()) + Counter(df["_model_n"].tolist())
+        brands = [b for b in df["_brand_n"].unique().tolist() if b and b != "nan"]
+        models = [m for m in df["_model_n"].unique().tolist() if m and m != "nan"]
+        return cls(brands, models, counts)
+
+    _phrases = staticmethod(phrases)
+
+    def _best(self, index: SymSpell, aliases: Mapping[str, str], t_full: str,
+              allowed: Optional[Collection[str]]) -> Optional[str]:
+        phrases = self._phrases(t_full)
+        ok = (lambda w: True) if allowed is None else (lambda w: w in allowed)
+        # 1) Alias / exacto
+        for p in phrases:
+            hit = aliases.get(p, p)
+            if hit in index and ok(hit):
+                return hit
+        # 2) Corrección: la de menor distancia en todo el texto
+        best: Optional[Tuple[int, str]] = None
+        for p in phrases:
+            for w, dist in index.lookup(p, max_edits(p)):
+                if ok(w):
+                    if best is None or dist < best[0]:
+                        best = (dist, w)
+                    break
+        return best[1] if best else None
+
+    def brand(self, t_full: str, allowed: Optional[Collection[str]] = None) -> Optional[str]:
+        """`t_full` ya normalizado con norm_txt; `allowed` restringe a marcas del subconjunto actual."""
+        return self._best(self.brands, BRAND_ALIAS, t_full, allowed)
+
+    def model(self, t_full: str, allowed: Optional[Collection[str]] = None) -> Optional[str]:
+        return self._best(self.models, MODEL_ALIAS, t_full, allowed)
@@ -0,0 +1,127 @@
+# app/nlp/static_answers.py
+from __future__ import annotations
+import re
+import threading
+from typing import Dict, List, Optional, Sequence
+
+from unidecode import unidecode
+
+from app.texts import PROPUESTA_VALOR_KAVAK
+
+
+def normalize(text: str) -> str:
+    """Forma en la que se comparan los disparadores: sin acentos, minúsculas, espacios simples."""
+    return " ".join(unidecode(text or "").lower().split())
+
+
+def trie_regex(words: Sequence[str]) -> str:
+    """
+    Alternancia con prefijos comunes factorizados ("por que (?:kavak|elegir kavak)").
+    El motor de `re` descarta ramas por el primer carácter en vez de probar cada
+    alternativa completa en cada posición del texto.
+    """
+    trie: Dict[str, dict] = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}                      # fin de palabra
+
+    def _emit(node: Dict[str, dict]) -> str:
+        alts, optional = [], "" in node
+        # Ramas más largas primero no hace falta: cada rama empieza con un carácter distinto
+        for ch in sorted(k for k in node if k):
+            alts.append(re.escape(ch) + _emit(node[ch]))
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        if optional:
+            # Fin de palabra en este nodo: intentar primero la continuación (match más largo)
+            body = ("(?:" + body + ")?") if len(alts) == 1 else body + "?"
+        return body
+
+    return _emit(trie)
+
+
+class StaticAnswer:
+    __slots__ = ("name", "triggers", "answer", "source")
+
+    def __init__(self, name: str, triggers: Sequence[str], answer: str, source: str):
+        self.name = name
+        self.triggers = tuple(dict.fromkeys(normalize(t) for t in triggers if t.strip()))
+        self.answer = answer
+        self.source = source
+
+
+class StaticAnswerRegistry:
+    """
+    Respuestas fijas (no pasan por catálogo, FAISS ni LLM).
+    Todos los disparadores se compilan en UNA regex con forma de trie (prefijos comunes
+    factorizados), así el texto normalizado se recorre una sola vez sin importar cuántas
+    respuestas haya; ante prefijos compartidos gana el disparador más largo.
+    Coincidencia por subcadena, igual que el `kw in texto` anterior.
+    """
+
+    def __init__(self):
+        self._answers: Dict[str, StaticAnswer] = {}
+        self._by_trigger: Dict[str, StaticAnswer] = {}
+        self._regex: Optional[re.Pattern] = None
+        self._lock = threading.Lock()
+
+    def register(self, name: str, triggers: Sequence[str], answer: str, source: str = "") -> StaticAnswer:
+        entry = StaticAnswer(name, triggers, answer, source or f"Fuente: {name} (manual)")
+        with self._lock:
+            self._answers[name] = entry
+            self._regex = None          # se recompila en el siguiente match
+        return entry
+
+    def _compile(self) -> re.Pattern:
+        regex = self._regex
+        if regex is not None:
+            return regex
+        with self._lock:
+            if self._regex is None:
+                by_trigger: Dict[str, StaticAnswer] = {}
+                for entry in self._answers.values():
+                    for t in entry.triggers:
+                        by_trigger.setdefault(t, entry)
+                self._by_trigger = by_trigger
+                self._regex = re.compile(trie_regex(list(by_trigger))) if by_trigger else re.compile(r"(?!x)x")
+            return self._regex
+
+    def match(self, text: str, normalized: bool = False) -> Optional[StaticAnswer]:
+        """`normalized=True` si `text` ya pasó por normalize / norm_txt (p. ej. ParsedMessage.norm)."""
+        m = self._compile().search(text if normalized else normalize(text))
+        return self._by_trigger[m.group(0)] if m else None
+
+    def names(self) -> List[str]:
+        return list(self._answers)
+
+
+STATIC_ANSWERS = StaticAnswerRegistry()
+
+STATIC_ANSWERS.register(
+    "propuesta_valor",
+    [
+        "propuesta de valor",
+        "propuesta valor",
+        "valor de kavak",
+        "por que kavak",
+        "porque kavak",
+        "por que elegir kavak",
+        "porque elegir kavak",
+        "por que elegir a kavak",
+        "por que comprar en kavak",
+        "por que comprar con kavak",
+        "por que en kavak",
+        "que ofrece kavak",
+        "por que confiar en kavak",
+        "porque confiar en kavak",
+    ],
+    PROPUESTA_VALOR_KAVAK,
+    source="Fuente: texts.py (manual)",
+)
+
+
+def match_static(text: str, normalized: bool = False) -> Optional[StaticAnswer]:
+    return STATIC_ANSWERS.match(text, normalized)
@@ -1,7 +1,10 @@
 # app/nlp/tools.py
 from __future__ import annotations
 import os
-from typing import Dict, Any, List, Tuple
+import hashlib
+import threading
+from array import array
+from typing import Dict, Any, List, Optional, Tuple
 
 import pandas as pd
 from rapidfuzz import process, fuzz, distance
@@ -13,7 +16,11 @@ from app.settings import KAVAK_ANNUAL_RATE, ALLOWED_TERMS, DEFAULT_TERM
 from app.nlp.normalize import norm_txt
 
 # app/nlp/tools.py
-from app.nlp.aliases import BRAND_ALIAS, MODEL_ALIAS, VERSION_ALIAS, STOPWORDS
+from app.nlp.aliases import BRAND_ALIAS, BODY_ALIAS, BODY_BY_MODEL, MODEL_ALIAS, VERSION_ALIAS, STOPWORDS
+from app.nlp.message import ParsedMessage
+from app.nlp.lexicon import ALIAS_LEXICON, Lexicon
+from app.nlp.spell import CatalogSpeller
+from app.nlp.triples import TripleMatcher
 
 # ------------------------------------------------------------
 # Rutas y carga de catálogo
@@ -22,6 +29,16 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "data"))
 CATALOG_PATH = os.getenv("CATALOG_PATH") or os.path.join(DATA_DIR, "catalog.csv")
 
+# Corrección de typos en marca/modelo: "symspell" (índice de borrados, costo ~constante)
+# o "fuzzy" (cascada rapidfuzz anterior, lineal en el vocabulario)
+TYPO_INDEX = os.getenv("TYPO_INDEX", "symspell").strip().lower()
+
+# Marca/modelo/versión de la búsqueda: "triples" (una etapa cdist sobre las combinaciones del
+# catálogo) o "cascade" (versión → marca → modelo, la anterior). MATCH_WORKERS: hilos de cdist
+# (-1 = todos los núcleos; con 1 CPU el costo de lanzar hilos supera la ganancia).
+CATALOG_MATCH = os.getenv("CATALOG_MATCH", "triples").strip().lower()
+MATCH_WORKERS = int(os.getenv("MATCH_WORKERS", "1"))
+
 
 def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
@@ -39,6 +56,7 @@ def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
         "price":    ["price", "precio", "amount", "cost"],
         "location": ["location", "ubicacion", "ciudad", "sede", "source"],
         "version":  ["version", "versión", "trim", "variant"],
+        "body":     ["body", "body_type", "carroceria", "carrocería", "tipo", "segmento"],
     }
     rename = {}
     for target, alts in synonyms.items():
@@ -74,21 +92,72 @@ def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     df["_model_n"] = df["model"].map(norm_txt)
     df["_version_n"] = df["version"].map(norm_txt) 
 
+    # 6) Carrocería canónica (suv, sedan, hatchback, pickup, ...): la del CSV si la trae;
+    #    si no, la del modelo (BODY_BY_MODEL); "" = desconocida
+    body = df["body"].fillna("").astype(str).map(norm_txt) if "body" in df.columns else pd.Series("", index=df.index)
+    body = body.map(lambda b: BODY_ALIAS.get(b, b))
+    df["_body_n"] = body.where(body != "", df["_model_n"].map(lambda m: BODY_BY_MODEL.get(m, "")))
+
     return df
 
 
+# Catálogo cacheado por (ruta, mtime, tamaño): se relee solo si el CSV cambió.
+# Los llamadores no deben mutar el DataFrame devuelto (usar .copy()).
+# `lexicon` (marcas/modelos/versiones para spotting), `speller` (typos) y `matcher` (tripletas
+# marca/modelo/versión) se reconstruyen en cada recarga.
+_CATALOG: Dict[str, Any] = {"key": None, "df": None, "version": None, "by_id": None, "lexicon": None,
+                            "speller": None, "matcher": None}
+_CATALOG_LOCK = threading.Lock()
+_RECORD_COLS = ("id", "brand", "model", "version", "year", "km", "price", "location")
+
+
+def _read_catalog(path: str) -> pd.DataFrame:
+    try:
+        df = pd.read_csv(path)           # CSV con coma
+    except Exception:
+        df = pd.read_csv(path, sep=";")  # fallback si viene con ';'
+    return _normalize_columns(df)        # SIEMPRE normalizar aquí
+
+
 def _load_catalog() -> pd.DataFrame:
     if not os.path.exists(CATALOG_PATH):
         raise FileNotFoundError(
             f"catalog.csv not found at {os.path.abspath(CATALOG_PATH)}. "
             f"Set CATALOG_PATH env var or place the file in app/data/catalog.csv"
         )
+    st = os.stat(CATALOG_PATH)
+    key = (os.path.abspath(CATALOG_PATH), st.st_mtime_ns, st.st_size)
+    if _CATALOG["key"] != key:
+        with _CATALOG_LOCK:
+            if _CATALOG["key"] != key:
+                with open(CATALOG_PATH, "rb") as f:
+                    version = hashlib.sha1(f.read()).hexdigest()[:12]
+                df = _read_catalog(CATALOG_PATH)
+                cols = [c for c in _RECORD_COLS if c in df.columns]
+                ids = pd.to_numeric(df["id"], errors="coerce")
+                by_id = None
+                # Snapshots de resultados (array('I')) solo si todos los IDs son enteros de 32 bits
+                if len(df) and ids.notna().all() and ids.between(0, 2**32 - 1).all() and (ids % 1 == 0).all():
+                    by_id = dict(zip(ids.astype("int64").tolist(), df[cols].to_dict(orient="records")))
+                _CATALOG.update(key=key, df=df, version=version, by_id=by_id,
+                                lexicon=Lexicon.from_catalog(df), speller=CatalogSpeller.from_catalog(df),
+                                matcher=TripleMatcher.from_catalog(df, MATCH_WORKERS))
+    return _CATALOG["df"]
+
+
+def catalog_lexicon() -> Lexicon:
+    """Léxico del catálogo vigente; solo alias si el catálogo no se puede cargar."""
     try:
-        df = pd.read_csv(CATALOG_PATH)           # CSV con coma
+        _load_catalog()
     except Exception:
-        df = pd.read_csv(CATALOG_PATH, sep=";")  # fallback si viene con ';'
-    df = _normalize_columns(df)                  # SIEMPRE normalizar aquí
-    return df
+        return ALIAS_LEXICON
+    return _CATALOG["lexicon"] or ALIAS_LEXICON
+
+
+def catalog_version() -> str:
+    """Hash corto del contenido del catálogo cargado (cambia cuando se reemplaza el CSV)."""
+    _load_catalog()
+    return _CATALOG["version"]
 
 
 # ------------------------------------------------------------
@@ -107,17 +176,38 @@ def _map_alias(s: str | None) -> str | None:
     return BRAND_ALIAS.get(s, s)
 
 
-def _guess_brand(raw_text: str, brands: List[str]) -> str | None:
+def _search_tokens(t_full: str, tokens=None) -> List[str]:
+    # Tokens útiles para marca/modelo (≥ 3 letras, sin stopwords); reutiliza ParsedMessage.tokens si viene
+    if tokens is None:
+        tokens = [tok for tok in t_full.split() if tok not in STOPWORDS]
+    return [tok for tok in tokens if len(tok) >= 3]
+
+
+def _guess_brand(t_full: str, brands: List[str], tokens=None) -> str | None:
+    """Marca desde texto libre ya normalizado: SymSpell del catálogo o la cascada fuzzy (TYPO_INDEX)."""
+    speller = _CATALOG["speller"]
+    if TYPO_INDEX == "symspell" and speller is not None:
+        return speller.brand(t_full, set(brands))
+    return _fuzzy_guess_brand(t_full, brands, tokens)
+
+
+def _guess_model(t_full: str, candidate_models: List[str], tokens=None) -> str | None:
+    """Modelo desde texto libre ya normalizado, restringido a `candidate_models`."""
+    speller = _CATALOG["speller"]
+    if TYPO_INDEX == "symspell" and speller is not None:
+        return speller.model(t_full, set(candidate_models))
+    return _fuzzy_guess_model(t_full, candidate_models, tokens)
+
+
+def _fuzzy_guess_brand(t_full: str, brands: List[str], tokens=None) -> str | None:
     """
-    Inferencia robusta de marca:
+    Inferencia robusta de marca (t_full ya normalizado con norm_txt):
     - Alias por token (vw->volkswagen, nizzan->nissan, etc.)
     - Luego WRatio / token_set_ratio sobre la frase
     - Última red: token por token con Levenshtein
     """
-    t_full = norm_txt(raw_text)
-
     # 1) Alias por token: si algún token mapea directo a una marca del catálogo, úsalo
-    tokens = [tok for tok in t_full.split() if len(tok) >= 3 and tok not in STOPWORDS]
+    tokens = _search_tokens(t_full, tokens)
     for tok in tokens:
         alias_tok = _map_alias(tok)  # <-- alias por token
         if alias_tok in brands:
@@ -142,15 +232,14 @@ def _guess_brand(raw_text: str, brands: List[str]) -> str | None:
     return None
 
 
-def _guess_model(raw_text: str, candidate_models: List[str]) -> str | None:
+def _fuzzy_guess_model(t_full: str, candidate_models: List[str], tokens=None) -> str | None:
     """
-    Inferencia robusta de modelo (tolerante a typos) con 3 niveles:
+    Inferencia robusta de modelo (tolerante a typos; t_full ya normalizado) con 3 niveles:
     1) Alias por token (kix->kicks, xtrail->x-trail, corola->corolla, etc.)
     2) Matching de la frase completa (WRatio / token_set_ratio)
     3) Última red: token por token con Levenshtein
     """
-    t_full = norm_txt(raw_text)
-    tokens = [tok for tok in t_full.split() if len(tok) >= 3 and tok not in STOPWORDS]
+    tokens = _search_tokens(t_full, tokens)
 
     # 1) Alias por token → match directo si coincide con algún modelo del catálogo
     for tok in tokens:
@@ -176,13 +265,56 @@ def _guess_model(raw_text: str, candidate_models: List[str]) -> str | None:
     return None
 
 
+def _cascade_locks(df: pd.DataFrame, raw_text: str, raw_toks, brand_q: str | None,
+                   model_q: str | None, version_q: str | None) -> Tuple[str | None, str | None, str | None]:
+    """
+    Cascada anterior (CATALOG_MATCH=cascade): versión, luego marca, luego modelo, cada una
+    con sus propias llamadas a extractOne sobre el subconjunto que dejó la anterior.
+    """
+    brands = df["_brand_n"].dropna().unique().tolist()
+    models = df["_model_n"].dropna().unique().tolist()
+    brand_lock = model_lock = version_lock = None
+
+    candidate_versions = df["_version_n"].dropna().unique().tolist() if "_version_n" in df.columns else []
+    if version_q:
+        best_ver, _ = fuzzy_best(VERSION_ALIAS.get(version_q, version_q), candidate_versions, score_cutoff=85)
+        version_lock = best_ver
+    elif raw_text:
+        # Inferencia desde texto libre (tokens)
+        for tok in raw_text.split():
+            if tok in VERSION_ALIAS:
+                best_ver, _ = fuzzy_best(VERSION_ALIAS[tok], candidate_versions, score_cutoff=80)
+                if best_ver:
+                    version_lock = best_ver
+                    break
+    if version_lock:
+        df = df[df["_version_n"] == version_lock]
+
+    # Marca
+    if not brand_q and raw_text:
+        brand_lock = _guess_brand(raw_text, brands, raw_toks)
+    elif brand_q:
+        brand_lock, _ = fuzzy_best(brand_q, brands, score_cutoff=86)
+    if brand_lock:
+        df = df[df["_brand_n"] == brand_lock]
+
+    # Modelos candidatos (si hay marca bloqueada, solo de esa marca)
+    candidate_models = df["_model_n"].dropna().unique().tolist() if brand_lock else models
+    if not model_q and raw_text:
+        model_lock = _guess_model(raw_text, candidate_models, raw_toks)
+    elif model_q:
+        model_lock, _ = fuzzy_best(model_q, candidate_models, score_cutoff=85)
+    return brand_lock, model_lock, version_lock
+
+
 # ------------------------------------------------------------
 # Búsqueda principal en catálogo
 # ------------------------------------------------------------
 # ------------------------------------------------------------
 # Filtro común (devuelve el DataFrame filtrado y ordenado)
 # ------------------------------------------------------------
-def _filtered_df_for_search(filters: Dict[str, Any]) -> pd.DataFrame:
+def _filtered_df_for_search(filters: Dict[str, Any], msg: ParsedMessage | None = None) -> pd.DataFrame:
+    """`msg`: el mensaje ya parseado cuyo texto es filters["raw_text"] (evita re-normalizarlo)."""
     df = _load_catalog().copy()
     if df.empty:
         return df
@@ -195,96 +327,34 @@ def _filtered_df_for_search(filters: Dict[str, Any]) -> pd.DataFrame:
     price_min = filters.get("price_min")
     km_max    = filters.get("km_max")
     year_min  = filters.get("year_min")
-    raw_text  = norm_txt(filters.get("raw_text") or "")
-
-    # -------- Vocabularios --------
-    brands = df["_brand_n"].dropna().unique().tolist()
-    models = df["_model_n"].dropna().unique().tolist()
-    all_versions = df["_version_n"].dropna().unique().tolist() if "_version_n" in df.columns else []
-
-    # -------- Inferencia de marca/modelo/version con locks --------
-    brand_lock = None
-    model_lock = None
-    version_lock = None
-
-    # Determina candidatos de versión según el subconjunto actual del DF
-    if "_version_n" in df.columns:
-        candidate_versions = df["_version_n"].dropna().unique().tolist()
+    body      = norm_txt(filters.get("body"))
+    sort      = filters.get("sort")
+    use_msg   = msg is not None and filters.get("raw_text") == msg.raw
+    raw_text  = msg.norm if use_msg else norm_txt(filters.get("raw_text") or "")
+    raw_toks  = msg.tokens if use_msg else None
+
+    # -------- Marca / modelo / versión bloqueados --------
+    matcher = _CATALOG["matcher"]
+    if CATALOG_MATCH == "triples" and matcher is not None:
+        brand_lock, model_lock, version_lock = matcher.match(raw_text, brand_q, model_q, version_q)
     else:
-        candidate_versions = []
+        brand_lock, model_lock, version_lock = _cascade_locks(df, raw_text, raw_toks, brand_q, model_q, version_q)
+
+    # Marca conocida que el inventario no tiene ("busco un ford"): los locks solo fijan marcas
+    # del catálogo, así que sin esto se listaría todo en vez de decir que no hay
+    if brand_q and _CATALOG["lexicon"] is not None and _CATALOG["lexicon"].off_catalog(brand_q):
+        return df.iloc[0:0]
 
-    if version_q:
-        vq = VERSION_ALIAS.get(version_q, version_q)
-        best_ver, score_v = fuzzy_best(vq, candidate_versions, score_cutoff=85)
-        if best_ver:
-            version_q = best_ver
-            version_lock = best_ver
-    else:
-        # Inferencia desde texto libre (tokens)
-        if raw_text:
-            for tok in raw_text.split():
-                tok = tok.strip()
-                if tok in VERSION_ALIAS:
-                    vq = VERSION_ALIAS[tok]
-                    best_ver, score_v = fuzzy_best(vq, candidate_versions, score_cutoff=80)
-                    if best_ver:
-                        version_lock = best_ver
-                        break
-
-    # Aplica versión si se bloqueó
     if version_lock and "_version_n" in df.columns:
         df = df[df["_version_n"] == version_lock]
-
-    # Marca
-    if not brand_q and raw_text:
-        gb = _guess_brand(raw_text, brands)
-        if gb:
-            brand_q = gb
-            brand_lock = gb
-            df = df[df["_brand_n"] == gb]
-    else:
-        if brand_q:
-            best_brand, score_b = fuzzy_best(brand_q, brands, score_cutoff=86)
-            if best_brand:
-                brand_q = best_brand
-                brand_lock = best_brand
-                df = df[df["_brand_n"] == best_brand]
-            else:
-                brand_q = None
-
-    # Modelos candidatos (si hay marca bloqueada, solo de esa marca)
-    candidate_models = df["_model_n"].dropna().unique().tolist() if brand_lock else models
-
-    # Candidatos de versión (si hay modelo bloqueado, tomamos solo sus versiones)
-    if model_lock:
-        candidate_versions = (
-            df.loc[df["_model_n"] == model_lock, "_version_n"]
-            .dropna().unique().tolist()
-        )
-    else:
-        candidate_versions = df["_version_n"].dropna().unique().tolist()
-
-    # Modelo
-    if not model_q and raw_text:
-        gm = _guess_model(raw_text, candidate_models)
-        if gm:
-            model_q = gm
-            model_lock = gm
-    elif model_q:
-        best_model, score_m = fuzzy_best(norm_txt(model_q), candidate_models, score_cutoff=85)
-        if best_model:
-            model_q = best_model
-            model_lock = best_model
-        else:
-            model_q = None
-
-    # Aplica modelo si está bloqueado
+    if brand_lock:
+        df = df[df["_brand_n"] == brand_lock]
     if model_lock:
         df = df[df["_model_n"] == model_lock]
 
-    # Salvaguarda final de marca (evita mezclar)
-    if brand_lock is not None and not df.empty:
-        df = df[df["_brand_n"] == brand_lock]
+    # Carrocería ("camioneta" → suv): los modelos sin carrocería conocida no pasan
+    if body:
+        df = df[df["_body_n"] == BODY_ALIAS.get(body, body)]
 
     # -------- Filtros numéricos --------
     if price_min is not None:
@@ -315,7 +385,10 @@ def _filtered_df_for_search(filters: Dict[str, Any]) -> pd.DataFrame:
         return df
 
     # -------- Ordenamiento --------
-    if year_min is not None:
+    if sort == "price":
+        # "barato", "económico": los más baratos primero
+        df = df.sort_values(by=["price", "km", "year"], ascending=[True, True, False])
+    elif year_min is not None:
         try:
             df["_year_diff"] = (df["year"] - int(year_min)).abs()
             df = df.sort_values(by=["_year_diff", "km", "price"], ascending=[True, True, True])
@@ -350,6 +423,41 @@ def search_cars_count(filters: Dict[str, Any]) -> int:
     return int(len(df))
 
 
+# ------------------------------------------------------------
+# Snapshot de resultados (paginación / cotiza / detalles sin re-consultar)
+# ------------------------------------------------------------
+def snapshot_search(filters: Dict[str, Any], msg: ParsedMessage | None = None) -> Optional[Tuple[array, str]]:
+    """
+    IDs de TODOS los resultados, en el orden de search_cars, como array('I') (4 bytes por auto)
+    más la versión del catálogo con que se calcularon. None si el catálogo tiene IDs no numéricos.
+    """
+    df = _filtered_df_for_search(filters, msg)
+    if _CATALOG["by_id"] is None:
+        return None
+    return array("I", df["id"].astype("int64").tolist()), _CATALOG["version"]
+
+
+def _car_record(car_id) -> Optional[Dict[str, Any]]:
+    """
+    Registro de un auto por ID: O(1) en `by_id` si el catálogo tiene IDs enteros; si no
+    (IDs alfanuméricos, "A1"), búsqueda por el ID como texto en el DataFrame.
+    """
+    df = _load_catalog()
+    key = str(car_id).strip()
+    by_id = _CATALOG["by_id"]
+    if by_id is not None:
+        return by_id.get(int(key)) if key.isdigit() else None
+    rows = df[df["id"].astype(str) == key]
+    if rows.empty:
+        return None
+    return rows[[c for c in _RECORD_COLS if c in rows.columns]].iloc[0].to_dict()
+
+
+def cars_by_ids(ids) -> List[Dict[str, Any]]:
+    """Registros por ID; los que ya no están en el catálogo vuelven como {"id", "missing"}."""
+    return [_car_record(i) or {"id": i, "missing": True} for i in ids]
+
+
 # ------------------------------------------------------------
 # Finanzas: pago mensual (amortización francesa)
 # ------------------------------------------------------------
@@ -402,15 +510,14 @@ def cotiza_car(car_id: str, down_payment: float, term: int | None = None, annual
     - term por defecto viene de DEFAULT_TERM (settings)
     - tasa por defecto viene de KAVAK_ANNUAL_RATE (settings)
     """
-    df = _load_catalog()
-    car = df[df["id"].astype(str) == str(car_id)]
-    if car.empty:
+    car = _car_record(car_id)
+    if car is None:
         return f"No encontré el auto con ID {car_id}."
 
-    brand = str(car["brand"].iloc[0])
-    model = str(car["model"].iloc[0])
-    year  = int(car["year"].iloc[0])
-    price = float(car["price"].iloc[0])
+    brand = str(car["brand"])
+    model = str(car["model"])
+    year  = int(car["year"])
+    price = float(car["price"])
 
     rate = KAVAK_ANNUAL_RATE if (annual_rate is None) else float(annual_rate)
     n = int(term if term is not None else DEFAULT_TERM)
@@ -435,6 +542,17 @@ def cotiza_car(car_id: str, down_payment: float, term: int | None = None, annual
 # ------------------------------------------------------------
 # KB / RAG: wrapper seguro (opcional, si usas retriever)
 # ------------------------------------------------------------
+def _format_kb_result(res: Any) -> str:
+    if isinstance(res, dict):
+        answer = res.get("answer") or res.get("reply") or ""
+        srcs = res.get("sources") or []
+        suffix = ""
+        if srcs:
+            suffix = "\n\nFuentes:\n" + "\n".join(f"- {s}" for s in srcs)
+        return (answer or "No encontré información en la base de conocimiento.") + suffix
+    return str(res)
+
+
 def kb_tool(question: str) -> str:
     """
     Llama al retriever si está disponible. Si no, responde de forma segura.
@@ -445,14 +563,21 @@ def kb_tool(question: str) -> str:
         return "La base de conocimiento no está disponible por ahora."
 
     try:
-        res = kb_answer(question)
-        if isinstance(res, dict):
-            answer = res.get("answer") or res.get("reply") or ""
-            srcs = res.get("sources") or []
-            suffix = ""
-            if srcs:
-                suffix = "\n\nFuentes:\n" + "\n".join(f"- {s}" for s in srcs)
-            return (answer or "No encontré información en la base de conocimiento.") + suffix
-        return str(res)
+        return _format_kb_result(kb_answer(question))
+    except Exception:
+        return "No pude consultar la base de conocimiento en este momento."
+
+
+async def akb_tool(question: str) -> str:
+    """
+    Igual que kb_tool pero sin bloquear el event loop (micro-batching de embeddings).
+    """
+    try:
+        from .retriever import akb_answer  # evita import circular
+    except Exception:
+        return "La base de conocimiento no está disponible por ahora."
+
+    try:
+        return _format_kb_result(await akb_answer(question))
     except Exception:
         return "No pude consultar la base de conocimiento en este momento."
@@ -0,0 +1,134 @@
+# app/nlp/triples.py
+from __future__ import annotations
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+from rapidfuzz.distance import OSA
+
+from app.nlp.aliases import BRAND_ALIAS, MODEL_ALIAS, VERSION_ALIAS
+from app.nlp.lexicon import short_version
+from app.nlp.spell import max_edits, phrases
+
+# Peso de cada componente al elegir la tripleta: ante un conflicto ("toyota versa") manda el
+# modelo, que es lo más específico; la versión ("sport", "sense") es la señal más débil.
+W_BRAND, W_MODEL, W_VERSION = 0.9, 1.0, 0.5
+# Un match débil (una edición más de lo que max_edits permite) vale la mitad
+WEAK = 0.5
+
+Triple = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+def _vocab(values: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+    """Valores distintos (sin vacíos) e índice de cada fila; las filas vacías apuntan a len(vocab)."""
+    keep = sorted({v for v in values if v and v != "nan"})
+    pos = {v: i for i, v in enumerate(keep)}
+    return keep, np.array([pos.get(v, len(keep)) for v in values], dtype=np.intp)
+
+
+class TripleMatcher:
+    """
+    Marca, modelo y versión en UNA etapa: las combinaciones distintas (marca, modelo, versión)
+    del catálogo se indexan una vez por recarga; por consulta, `process.cdist` puntúa en bloque
+    los n-gramas del texto contra el vocabulario de cada componente y la puntuación de cada
+    tripleta es la suma ponderada de sus tres componentes. Gana la mejor tripleta, así que
+    marca, modelo y versión bloqueados siempre existen juntos en el catálogo.
+
+      marca / modelo   distancia OSA con el tope de max_edits por largo (como SymSpell),
+                       después de los alias ("vw" → volkswagen, "kix" → kicks)
+      versión          token_set_ratio ≥ 80 (≥ 85 si viene explícita), solo sobre tokens de
+                       VERSION_ALIAS: "sport" no debe bloquear versión por parecido casual.
+                       Desde el texto solo se bloquea junto a marca o modelo; las versiones
+                       cortas o stopwords ("le", "se") solo pegadas a una palabra de marca o
+                       modelo del catálogo, como en el Lexicon ("corolla le" sí, "que le" no)
+    """
+
+    def __init__(self, brands: Sequence[str], models: Sequence[str], versions: Sequence[str],
+                 workers: int = 1):
+        self.workers = workers
+        triples = sorted({(b, m, v) for b, m, v in zip(brands, models, versions)})
+        self.brands, self._tb = _vocab([t[0] for t in triples])
+        self.models, self._tm = _vocab([t[1] for t in triples])
+        self.versions, self._tv = _vocab([t[2] for t in triples])
+        self._brand_len = np.array([len(b) for b in self.brands], dtype=np.int32)
+        self._model_len = np.array([len(m) for m in self.models], dtype=np.int32)
+        # Palabras tras las que una versión corta sí cuenta ("corolla le", "mazda 3 s")
+        self._anchors = sorted({p.split()[-1] for p in [*self.brands, *self.models, *BRAND_ALIAS, *MODEL_ALIAS]})
+
+    @classmethod
+    def from_catalog(cls, df, workers: int = 1) -> "TripleMatcher":
+        """Desde el DataFrame ya normalizado de tools._load_catalog (_brand_n/_model_n/_version_n)."""
+        versions = df["_version_n"].tolist() if "_version_n" in df.columns else [""] * len(df)
+        return cls(df["_brand_n"].tolist(), df["_model_n"].tolist(), versions, workers)
+
+    def __len__(self) -> int:
+        return len(self._tb)
+
+    # ---------------- Puntuación por componente ----------------
+    def _edit_scores(self, queries: List[str], vocab: List[str],
+                     lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Mejor similitud (0..1) de cada palabra del vocabulario contra las consultas:
+        `strong` dentro de max_edits; `weak` con una edición más (≥ 3 letras), que solo
+        cuenta si otro componente de la misma tripleta la respalda ("aui a1" → audi a1).
+        """
+        strong, weak = np.zeros(len(vocab) + 1), np.zeros(len(vocab) + 1)
+        if not queries or not vocab:
+            return strong, weak
+        dist = process.cdist(queries, vocab, scorer=OSA.distance, dtype=np.int32,
+                             score_cutoff=3, workers=self.workers)
+        allowed = np.array([max_edits(q) for q in queries], dtype=np.int32)[:, None]
+        q_len = np.array([len(q) for q in queries], dtype=np.int32)[:, None]
+        sim = 1.0 - dist / np.maximum(np.maximum(q_len, lengths[None, :]), 1)
+        strong[:-1] = np.where(dist <= allowed, sim, 0.0).max(axis=0)
+        weak[:-1] = np.where((dist == allowed + 1) & (q_len >= 3), sim, 0.0).max(axis=0)
+        weak[strong > 0] = 0.0
+        return strong, weak
+
+    def _version_scores(self, queries: List[str], cutoff: int) -> np.ndarray:
+        out = np.zeros(len(self.versions) + 1)
+        if not queries or not self.versions:
+            return out
+        sc = process.cdist(queries, self.versions, scorer=fuzz.token_set_ratio, dtype=np.uint8,
+                           score_cutoff=cutoff, workers=self.workers)
+        out[:-1] = sc.max(axis=0) / 100.0
+        return out
+
+    def _anchored(self, word: str) -> bool:
+        """¿`word` es (con typos dentro de max_edits) palabra de una marca o modelo?"""
+        return process.extractOne(word, self._anchors, scorer=OSA.distance,
+                                  score_cutoff=max_edits(word)) is not None
+
+    # ---------------- Uso ----------------
+    def match(self, text: str = "", brand: Optional[str] = None, model: Optional[str] = None,
+              version: Optional[str] = None) -> Triple:
+        """
+        (marca, modelo, versión) bloqueables, None donde no hubo evidencia. `text` ya normalizado
+        con norm_txt; un componente explícito (filtros de la sesión) reemplaza al del texto.
+        """
+        grams = phrases(text) if text and not (brand and model and version) else []
+        bq = [BRAND_ALIAS.get(brand, brand)] if brand else [BRAND_ALIAS.get(g, g) for g in grams]
+        mq = [MODEL_ALIAS.get(model, model)] if model else [MODEL_ALIAS.get(g, g) for g in grams]
+        if version:
+            vq, v_cut = [VERSION_ALIAS.get(version, version)], 85
+        else:
+            toks = text.split()
+            vq, v_cut = [VERSION_ALIAS[t] for i, t in enumerate(toks)
+                         if t in VERSION_ALIAS and (not short_version(t) or (i > 0 and self._anchored(toks[i - 1])))], 80
+
+        sb, wb = self._edit_scores(bq, self.brands, self._brand_len)
+        sm, wm = self._edit_scores(mq, self.models, self._model_len)
+        sv = self._version_scores(vq, v_cut)
+        if not len(self) or not (sb.any() or sm.any() or sv.any()):
+            return None, None, None
+
+        b, m, v = sb[self._tb], sm[self._tm], sv[self._tv]
+        b_weak, m_weak = wb[self._tb], wm[self._tm]
+        score = W_BRAND * (b + WEAK * b_weak) + W_MODEL * (m + WEAK * m_weak) + W_VERSION * v
+        best = int(np.argmax(score))
+        brand_ok = b[best] > 0 or (b_weak[best] > 0 and (m[best] > 0 or v[best] > 0))
+        model_ok = m[best] > 0 or (m_weak[best] > 0 and (b[best] > 0 or v[best] > 0))
+        version_ok = v[best] > 0 and (bool(version) or brand_ok or model_ok)
+        return (self.brands[self._tb[best]] if brand_ok else None,
+                self.models[self._tm[best]] if model_ok else None,
+                self.versions[self._tv[best]] if version_ok else None)
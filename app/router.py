@@ -16,9 +16,16 @@ def _format_car(c: Dict[str, Any]) -> str:
         f"{_fmt_km(c['km'])} • {_fmt_mxn(c['price'])} • {c.get('location','Online')}"
     )
 
+_BODY_LABEL = {"suv": "SUV", "sedan": "Sedán", "hatchback": "Hatchback", "pickup": "Pickup",
+               "coupe": "Coupé", "van": "Van"}
+
+def _body_label(body: Any) -> str:
+    return _BODY_LABEL.get(str(body), str(body).title())
+
 # ---------- NUEVO: chips/encabezado compacto ----------
 def _chips_from_filters(f: Dict[str, Any]) -> str:
     chips: List[str] = []
+    if f.get("body"):    chips.append(_body_label(f["body"]))
     if f.get("brand"):   chips.append(str(f["brand"]).title())
     if f.get("model"):   chips.append(str(f["model"]).title())
     if f.get("version"): chips.append(str(f["version"]).title())
@@ -32,6 +39,7 @@ def _chips_from_filters(f: Dict[str, Any]) -> str:
     if f.get("price_max"): chips.append(f"hasta {_fmt_mxn(f['price_max'])}")
 
     if f.get("km_max"): chips.append(f"hasta {int(f['km_max']):,} km")
+    if f.get("sort") == "price": chips.append("más baratos primero")
 
     return "Todos los autos" if not chips else " • ".join(chips)
 
@@ -63,6 +71,8 @@ def _format_filters(filters: Dict[str, Any]) -> str:
         chips.append(f"precio≤${int(float(filters['price_max'])):,.0f}")
     if filters.get("km_max"):
         chips.append(f"km≤{int(filters['km_max']):,}")
+    if filters.get("body"):
+        chips.append(f"carrocería={_body_label(filters['body'])}")
     return "*Filtros:* " + ", ".join(chips) if chips else "*Filtros:* (sin filtros)"
 
 def retrieve_cars(filters: Dict[str, Any], offset: int = 0, limit: int = 5) -> str:
@@ -71,7 +81,16 @@ def retrieve_cars(filters: Dict[str, Any], offset: int = 0, limit: int = 5) -> s
     - offset/limit permiten 'ver más N'
     """
     total_count = search_cars_count(filters)
+    cars = search_cars(filters, limit=limit, offset=offset) if 0 < total_count and offset < total_count else []
+    return render_results(filters, cars, total_count, offset)
 
+
+def render_results(filters: Dict[str, Any], cars: List[Dict[str, Any]], total_count: int, offset: int = 0) -> str:
+    """
+    Mismo mensaje que retrieve_cars a partir de una página ya resuelta (p. ej. desde el
+    snapshot de la sesión). Las tarjetas se numeran de forma continua (offset+1, ...),
+    que es el número que aceptan `cotiza <n>` y `detalles <n>`.
+    """
     # 1) Sin resultados
     if total_count == 0:
         chips = _chips_from_filters(filters)
@@ -89,20 +108,20 @@ def retrieve_cars(filters: Dict[str, Any], offset: int = 0, limit: int = 5) -> s
             "Ya no hay más resultados. Puedes ajustar la búsqueda (ej. *≤$350,000* o *Nissan 2021*)."
         )
 
-    # 3) Página solicitada
-    cars = search_cars(filters, limit=limit, offset=offset)  # lista de dicts
+    # 3) Página solicitada (los autos que ya no están en el catálogo no cuentan para los chips)
+    listed = [c for c in cars if not c.get("missing")]
 
     # Echo de marca/modelo/versión si todos coinciden (ayuda a formar chips)
-    if cars and not filters.get("brand"):
-        brands_set = {c["brand"] for c in cars}
+    if listed and not filters.get("brand"):
+        brands_set = {c["brand"] for c in listed}
         if len(brands_set) == 1:
             filters["brand"] = next(iter(brands_set))
-    if cars and not filters.get("model"):
-        models_set = {c["model"] for c in cars}
+    if listed and not filters.get("model"):
+        models_set = {c["model"] for c in listed}
         if len(models_set) == 1:
             filters["model"] = next(iter(models_set))
-    if cars and not filters.get("version"):
-        versions_set = {str(c.get("version") or "").strip().lower() for c in cars}
+    if listed and not filters.get("version"):
+        versions_set = {str(c.get("version") or "").strip().lower() for c in listed}
         versions_set.discard("")
         if len(versions_set) == 1:
             filters["version"] = next(iter(versions_set))
@@ -121,10 +140,13 @@ def retrieve_cars(filters: Dict[str, Any], offset: int = 0, limit: int = 5) -> s
     chips = _chips_from_filters(filters)
     header = f"🔎 Búsqueda: {chips}   |   {total_count} resultado{'s' if total_count != 1 else ''}\n\n*Te recomiendo:*"
 
-    # 6) Cuerpo numerado (1..N de la página)
+    # 6) Cuerpo numerado (continúa la numeración de páginas anteriores)
     body_lines: List[str] = [header, ""]
-    for i, car in enumerate(cars, start=1):
-        body_lines.append(_format_card(i, car))
+    for i, car in enumerate(cars, start=offset + 1):
+        if car.get("missing"):
+            body_lines.append(f"{i}) Ya no está disponible (ID {car['id']})")
+        else:
+            body_lines.append(_format_card(i, car))
         body_lines.append("")  # salto
 
     # 7) Footer con call-to-action claro
@@ -139,4 +161,11 @@ def retrieve_cars(filters: Dict[str, Any], offset: int = 0, limit: int = 5) -> s
         "Para cotizar: `cotiza <número de opción> con 40 mil pesos` o `cotiza <ID del auto> con 40 mil pesos`."
     )
 
-    return "\n".join(body_lines)
\ No newline at end of file
+    return "\n".join(body_lines)
+
+
+def format_details(idx: int, c: Dict[str, Any]) -> str:
+    """Respuesta a `detalles <n>`."""
+    if c.get("missing"):
+        return f"El auto #{c['id']} ya no está disponible. ¿Busco opciones parecidas?"
+    return f"{_format_car(c)}\n\nPara cotizar: `cotiza {idx} con 40k` (enganche) o `cotiza {idx} con 40k a 48 meses`."
@@ -0,0 +1,78 @@
+# scripts/bench_embeddings.py
+"""
+Latencia (consulta única) y throughput (lotes) de cada backend de embeddings.
+
+    python scripts/bench_embeddings.py --backends torch,torch-int8,onnx,onnx-int8
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+import numpy as np
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE not in sys.path:
+    sys.path.insert(0, BASE)
+
+from app.nlp.embeddings import make_backend
+
+QUERIES = [
+    "¿Cuál es la garantía?",
+    "¿Cómo funciona la devolución de 7 días?",
+    "¿Cómo es la entrega del auto?",
+    "¿Qué documentos necesito para el financiamiento?",
+    "¿Puedo vender mi auto a Kavak?",
+    "¿Cuánto tarda el proceso de compra?",
+    "¿Qué cubre el seguro de satisfacción?",
+    "¿Tienen sedes en Monterrey?",
+]
+
+
+def _bench_single(backend, n: int) -> tuple[float, float]:
+    times = []
+    for i in range(n):
+        q = QUERIES[i % len(QUERIES)]
+        t0 = time.perf_counter()
+        backend.encode([q])
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    return statistics.median(times), times[int(len(times) * 0.95) - 1]
+
+
+def _bench_batch(backend, batch: int, rounds: int) -> float:
+    texts = [QUERIES[i % len(QUERIES)] for i in range(batch)]
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        backend.encode(texts)
+    return batch * rounds / (time.perf_counter() - t0)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--backends", default="torch,torch-int8,onnx,onnx-int8")
+    ap.add_argument("--n", type=int, default=200, help="consultas únicas por backend")
+    ap.add_argument("--rounds", type=int, default=20, help="repeticiones por tamaño de lote")
+    args = ap.parse_args()
+
+    ref = None
+    print(f"{'backend':<12} {'p50 ms':>8} {'p95 ms':>8} {'b=8 q/s':>9} {'b=32 q/s':>9} {'cos vs 1º':>10}")
+    for kind in [k.strip() for k in args.backends.split(",") if k.strip()]:
+        try:
+            be = make_backend(kind)
+        except Exception as e:
+            print(f"{kind:<12} no disponible: {e}")
+            continue
+        vecs = be.encode(QUERIES)   # warm-up + paridad
+        if ref is None:
+            ref = vecs
+        cos = float(np.min(np.sum(ref * vecs, axis=1)))
+        p50, p95 = _bench_single(be, args.n)
+        b8 = _bench_batch(be, 8, args.rounds)
+        b32 = _bench_batch(be, 32, args.rounds)
+        print(f"{kind:<12} {p50:>8.2f} {p95:>8.2f} {b8:>9.0f} {b32:>9.0f} {cos:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# scripts/bench_hybrid.py
+"""
+Latencia de recuperación vector-only vs híbrida (BM25 + vector, con atajo léxico) y
+acuerdo de la híbrida con los resultados vector-only, sobre el índice construido.
+
+    python scripts/bench_hybrid.py                       # preguntas de ejemplo
+    python scripts/bench_hybrid.py --queries queries.jsonl --k 4
+
+queries.jsonl usa el formato de calibrate_threshold.py ({"query": ..., "relevant": ...}).
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE not in sys.path:
+    sys.path.insert(0, BASE)
+
+from app.nlp import retriever
+from app.nlp.relevance import load_labeled_queries
+
+QUERIES = [
+    "garantía de 3 meses",
+    "política de devolución 7 días",
+    "¿Cuál es la garantía?",
+    "¿Cómo funciona la devolución?",
+    "¿Qué documentos necesito para el financiamiento?",
+    "¿Puedo vender mi auto a Kavak?",
+    "¿Cómo es la entrega a domicilio?",
+    "¿Tienen sedes en Monterrey?",
+]
+
+
+def _vector_only(index, meta, query, k):
+    qv = retriever._embed([query])
+    ids, scores = retriever._search(index, meta, qv, k)
+    return retriever._relevant(ids, scores)[0], False
+
+
+def _hybrid(index, meta, query, k):
+    fast_ids, lex_ids = retriever._lexical_candidates(meta, query, k)
+    if fast_ids is not None:
+        return fast_ids, True
+    qv = retriever._embed([query])
+    ids, scores = retriever._search(index, meta, qv, k)
+    return retriever._fuse(*retriever._relevant(ids, scores), lex_ids, k)[0], False
+
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, (time.perf_counter() - t0) * 1000
+
+
+def _pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p * len(xs)))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--queries", help="JSONL con {query, relevant} (default: preguntas de ejemplo)")
+    ap.add_argument("--k", type=int, default=4)
+    ap.add_argument("--rounds", type=int, default=5, help="repeticiones por pregunta")
+    args = ap.parse_args()
+
+    index, meta = retriever._load_index()
+    if not index:
+        raise SystemExit("No hay índice. Ejecuta scripts/build_faiss.py primero.")
+    queries = [r["query"] for r in load_labeled_queries(args.queries)] if args.queries else QUERIES
+
+    retriever._embed(["warm-up"])
+    retriever._lexical_index(meta)
+
+    t_vec, t_hyb, top1, overlap, fast = [], [], 0, [], 0
+    for q in queries:
+        for _ in range(args.rounds):
+            (v_ids, _), tv = _timed(_vector_only, index, meta, q, args.k)
+            (h_ids, is_fast), th = _timed(_hybrid, index, meta, q, args.k)
+            t_vec.append(tv)
+            t_hyb.append(th)
+        fast += is_fast
+        top1 += bool(v_ids and h_ids and v_ids[0] == h_ids[0]) or (not v_ids and not h_ids)
+        union = set(v_ids) | set(h_ids)
+        overlap.append(len(set(v_ids) & set(h_ids)) / len(union) if union else 1.0)
+
+    n = len(queries)
+    print(f"{n} preguntas × {args.rounds} rondas, k={args.k}, {len(meta)} chunks")
+    print(f"{'modo':<12} {'p50 ms':>8} {'p95 ms':>8} {'media ms':>9}")
+    for name, ts in (("vector", t_vec), ("híbrido", t_hyb)):
+        print(f"{name:<12} {statistics.median(ts):>8.2f} {_pct(ts, 0.95):>8.2f} {statistics.mean(ts):>9.2f}")
+    print(f"atajo léxico: {fast}/{n} ({fast / n:.0%})")
+    print(f"acuerdo con vector-only: top-1 {top1 / n:.0%}, Jaccard@k medio {statistics.mean(overlap):.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# scripts/bench_index.py
+"""
+Recall@k contra Flat, latencia por consulta y memoria de cada tipo de índice
+sobre un corpus sintético (vectores normalizados agrupados, como los de MiniLM).
+
+    python scripts/bench_index.py --n 100000 --factories "Flat;HNSW32;IVF1024,SQ8;IVF1024,PQ48"
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+import numpy as np
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE not in sys.path:
+    sys.path.insert(0, BASE)
+
+from app.nlp.ann import build_ann_index, index_memory_bytes
+
+
+def make_corpus(n: int, dim: int, n_queries: int, clusters: int = 200, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype("float32")
+    xb = centers[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim)).astype("float32")
+    xq = xb[rng.integers(0, n, n_queries)] + 0.3 * rng.standard_normal((n_queries, dim)).astype("float32")
+    xb /= np.linalg.norm(xb, axis=1, keepdims=True)
+    xq /= np.linalg.norm(xq, axis=1, keepdims=True)
+    return xb, xq
+
+
+def _latency_ms(index, xq: np.ndarray, k: int) -> tuple[float, float]:
+    times = []
+    for q in xq:
+        t0 = time.perf_counter()
+        index.search(q.reshape(1, -1), k)
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    return statistics.median(times), times[max(0, int(len(times) * 0.95) - 1)]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=50_000, help="vectores en el corpus")
+    ap.add_argument("--dim", type=int, default=384, help="dimensión (all-MiniLM-L6-v2 = 384)")
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--k", type=int, default=4)
+    ap.add_argument("--factories", default="Flat;HNSW32;IVF{nlist},SQ8;IVF{nlist},PQ48",
+                    help="separadas por ';' ({nlist} = 4·√n)")
+    ap.add_argument("--nprobe", type=int, default=8)
+    ap.add_argument("--ef-search", type=int, default=64)
+    args = ap.parse_args()
+
+    import faiss
+
+    xb, xq = make_corpus(args.n, args.dim, args.queries)
+    nlist = int(4 * np.sqrt(args.n))
+    flat, _ = build_ann_index(xb, "Flat")
+    _, truth = flat.search(xq, args.k)
+
+    print(f"n={args.n} dim={args.dim} k={args.k} queries={args.queries}")
+    print(f"{'factory':<18} {'build s':>8} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8} {'MB':>8}")
+    for spec in [f.strip().format(nlist=nlist) for f in args.factories.split(";") if f.strip()]:
+        t0 = time.perf_counter()
+        index, params = build_ann_index(xb, spec, nprobe=args.nprobe, ef_search=args.ef_search)
+        build_s = time.perf_counter() - t0
+
+        _, found = index.search(xq, args.k)
+        recall = np.mean([len(set(f) & set(t)) / args.k for f, t in zip(found, truth)])
+        threads = faiss.omp_get_max_threads()
+        faiss.omp_set_num_threads(1)     # latencia de una consulta, como en el webhook
+        p50, p95 = _latency_ms(index, xq, args.k)
+        faiss.omp_set_num_threads(threads)
+        mb = index_memory_bytes(index) / 1e6
+        print(f"{params['factory']:<18} {build_s:>8.2f} {recall:>9.3f} {p50:>8.3f} {p95:>8.3f} {mb:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
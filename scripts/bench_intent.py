@@ -0,0 +1,120 @@
+# scripts/bench_intent.py
+"""
+Throughput de la clasificación de intención: tabla INTENTS (una regex combinada, slots en
+la misma pasada) vs la cadena anterior de regex en secuencia (varias con re.search inline).
+También verifica que ambas clasifiquen igual el corpus.
+
+    python scripts/bench_intent.py --n 100000
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE not in sys.path:
+    sys.path.insert(0, BASE)
+
+from app.nlp.intent import INTENTS, _detect_intent
+from app.nlp.message import ParsedMessage, RANGO_PRECIOS_RE, _MIN_RE, _MAX_RE, _YEAR_RE
+
+CORPUS = [
+    "hola", "Hola, buenas tardes", "menú", "sí", "Ok!", "no gracias", "gracias",
+    "contacto Ana ana@mail.com", "llámame al +5215512345678",
+    "cotiza 1 con 50k", "cotiza 322722 con $40,000 a 48 meses", "cotiza 2 con 30 mil tasa 12",
+    "detalles 2", "detalle del #322722", "ver 3 más", "ver más", "ver más 10",
+    "¿qué puedes hacer?", "mensualidades de $350,000 con 50k", "¿Cuál es el plazo máximo?",
+    "¿Cuál es la garantía?", "tiempo de entrega", "política de devolución",
+    "Busco un Nissan Versa 2020 menos de 300k", "quiero una camioneta toyota desde 2021",
+    "necesito algo barato con pocos km", "muéstrame un jetta hasta $280,000",
+    "autos mazda más de 250 mil", "kia rio 2019 quita precio", "honda civic sport 2022",
+    "entre 250 mil y 300 mil", "algo familiar", "ok ok", "asdf", "un kia rio", "vw jetta",
+]
+
+# --- Cadena anterior (route_message + _detect_intent), tal cual estaba, con la extracción
+#     de slots que hacía cada rama (plazo/tasa en cotiza, precio/enganche en finanzas) ---
+_GREET  = re.compile(r'^\s*(hola+|buenas|hey|hi|menu|ayuda|start)\b', re.I)
+_YES    = re.compile(r'^\s*(s[ií]|si|claro|vale|ok(ay)?|de acuerdo|correcto|adelante|por favor)\s*[!.…]*\s*$', re.I)
+_NO     = re.compile(r'^\s*(no|luego|despu[eé]s|gracias)\s*[!.…]*\s*$', re.I)
+_CONT   = re.compile(r'^\s*(contact(o|arme)|asesor|ll[aá]mame|llamada)\b(.*)$', re.I)
+_NUM    = r"(?:\d[\d\s.,]*)"
+_COTIZA = re.compile(rf"(?:^|\s)cotiza\s+(\d{{1,9}})\s+(?:con|con\s+un\s+enganche\s+de)?\s*"
+                     rf"(\$?\s*{_NUM}\s*mil|\$?\s*{_NUM}\s*k|\$?\s*{_NUM})", re.I)
+_DET    = re.compile(r"^\s*detalles?\s+(?:del?\s+)?#?(\d{1,9})\b", re.I)
+_TRIGGERS = (
+    "busca", "buscar", "encuentra", "quiero", "necesito", "muéstrame", "muestrame",
+    "nissan", "toyota", "chevrolet", "honda", "mazda", "kia", "volkswagen", "ford", "bmw",
+    "sentra", "versa", "corolla", "civic", "jetta", "swift", "tracker",
+    "2019", "2020", "2021", "2022", "2023", "2024", "2025",
+)
+_PLAZO  = re.compile(r"(?:a|en)\s*(\d{2,3})\s*(?:mes|meses)", re.I)
+_PAG    = re.compile(r"\bver\s+(?:(\d+)\s*m[aá]s|m[aá]s(?:\s+(\d+))?)\b", re.I)
+
+
+def legacy(text: str) -> str:
+    msg = ParsedMessage(text)
+    raw, t = msg.raw, msg.norm
+    for name, rx in (("greet", _GREET), ("yes", _YES), ("no", _NO), ("contact", _CONT)):
+        if rx.match(raw):
+            return name
+    m = _COTIZA.search(raw)
+    if m:
+        m.group(1), m.group(2), _PLAZO.search(raw), re.search(r"(tasa|inter[eé]s)\s*\d", raw, re.I)
+        return "cotiza"
+    m = _DET.match(raw)
+    if m:
+        m.group(1)
+        return "detalles"
+    m = _PAG.search(raw)
+    if m:
+        m.group(1) or m.group(2)
+        return "paginate"
+    if _GREET.match(raw):
+        return "greet"
+    if re.search(r"(ayuda|help|qué puedes|que puedes|como me ayudas)", t):
+        return "help"
+    if re.search(r"(mensualidad|mensualidades|enganche|plazo|financia|financiamiento)", t):
+        if re.search(r"(\$?\s*[0-9][0-9,\.]+)", raw):
+            re.search(r"(\$?\s*[0-9][0-9,\.]+)", raw).group(0)
+        re.search(r"(?:enganche\s*de|con)\s*([\$0-9\.,]+k|[\$0-9\.,]+|[0-9]+\s*mil)", raw, flags=re.I)
+        return "finance"
+    if re.search(r"(garanti|devoluc|proceso|entrega|tiempo|politica)", t):
+        return "kb"
+    if any(tok in t for tok in _TRIGGERS) or _YEAR_RE.search(t) \
+            or RANGO_PRECIOS_RE.search(t) or _MIN_RE.search(t) or _MAX_RE.search(t):
+        return "search"
+    return "help"
+
+
+def table(text: str) -> str:
+    name = _detect_intent(ParsedMessage(text))          # tabla + léxico del catálogo si nada aplicó
+    return "search" if name == "search_price" else name     # mismo handler
+
+
+def _bench(fn, n):
+    msgs = CORPUS
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn(msgs[i % len(msgs)])
+    return n / (time.perf_counter() - t0)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100_000)
+    args = ap.parse_args()
+
+    diff = [(t, legacy(t), table(t)) for t in CORPUS if legacy(t) != table(t)]
+    print(f"corpus={len(CORPUS)} mensajes · intenciones={len(INTENTS.names())} · "
+          f"desacuerdos={len(diff)}")
+    for t, a, b in diff:
+        print(f"  {t!r}: anterior={a} tabla={b}")    # p. ej. "menú": antes la regex corría sobre el texto con acento
+
+    for name, fn in (("anterior", legacy), ("tabla", table)):
+        rate = _bench(fn, args.n)
+        print(f"{name:9s} {rate:12,.0f} msg/s  ({1e6 / rate:6.2f} µs/msg, incluye normalizar)")
+
+
+if __name__ == "__main__":
+    main()
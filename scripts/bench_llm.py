@@ -0,0 +1,74 @@
+# scripts/bench_llm.py
+"""
+Compara el camino anterior (cliente OpenAI nuevo por pregunta, llamada bloqueante)
+contra el cliente AsyncOpenAI compartido, usando el mock local (scripts/mock_openai.py).
+
+    python scripts/bench_llm.py --requests 50 --delay-ms 200
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE not in sys.path:
+    sys.path.insert(0, BASE)
+
+from openai import OpenAI
+from app.nlp import llm
+from scripts.mock_openai import start_mock_server
+
+MSGS = [{"role": "user", "content": "Pregunta del usuario: ¿Cuál es la garantía?"}]
+
+
+def _report(name: str, lat: list, wall: float, n: int):
+    lat = sorted(lat)
+    p95 = lat[max(0, int(len(lat) * 0.95) - 1)]
+    print(f"{name:<28} {n / wall:>8.1f} req/s  p50 {statistics.median(lat):>7.1f} ms  p95 {p95:>7.1f} ms")
+
+
+def bench_blocking(n: int):
+    """Un OpenAI() por pregunta, en serie: así se comportaba el event loop antes."""
+    lat = []
+    t0 = time.perf_counter()
+    for _ in range(n):
+        t = time.perf_counter()
+        OpenAI(api_key=os.environ["OPENAI_API_KEY"]).chat.completions.create(model="mock", messages=MSGS)
+        lat.append((time.perf_counter() - t) * 1000)
+    _report("bloqueante (por llamada)", lat, time.perf_counter() - t0, n)
+
+
+async def bench_async(n: int):
+    lat = []
+
+    async def one():
+        t = time.perf_counter()
+        await llm.achat(MSGS, model="mock")
+        lat.append((time.perf_counter() - t) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    _report(f"async pool (conc={llm.LLM_MAX_CONCURRENCY})", lat, time.perf_counter() - t0, n)
+    await llm.aclose()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=50)
+    ap.add_argument("--delay-ms", type=float, default=200.0)
+    args = ap.parse_args()
+
+    server, url = start_mock_server(args.delay_ms)
+    os.environ["OPENAI_BASE_URL"] = url
+    os.environ.setdefault("OPENAI_API_KEY", "dummy")
+    try:
+        bench_blocking(args.requests)
+        asyncio.run(bench_async(args.requests))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# scripts/bench_message.py
+"""
+CPU por mensaje de route_message y cuántas veces se normaliza el texto (norm_txt / unidecode).
+
+    python scripts/bench_message.py                 # solo ruteo/parsing (catálogo simulado)
+    python scripts/bench_message.py --catalog       # incluye el filtrado real del catálogo (CSV sintético)
+
+Cada mensaje corre sobre una sesión nueva, en un solo hilo, midiendo time.process_time().
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+from array import array
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE not in sys.path:
+    sys.path.insert(0, BASE)
+
+CORPUS = [
+    "hola",
+    "Busco un Nissan Versa 2020 menos de 300k",
+    "quiero una camioneta toyota desde 2021 entre 350 mil y 450 mil",
+    "necesito algo barato con pocos km",
+    "muéstrame un jetta hasta $280,000",
+    "autos mazda más de 250 mil",
+    "cotiza 1 con 50k a 48 meses",
+    "detalles 2",
+    "ver 3 más",
+    "mensualidades de $350,000 con 50k",
+    "¿Cuál es la garantía?",
+    "contacto Ana ana@mail.com",
+    "si",
+    "no gracias",
+    "kia rio 2019 quita precio",
+    "honda civic sport 2022 hasta 420 mil",
+]
+
+
+def _fake_catalog_csv(n: int = 2000) -> str:
+    brands = [("Nissan", ["Versa", "Sentra", "March"]), ("Toyota", ["Corolla", "RAV4"]),
+              ("Volkswagen", ["Jetta", "Vento"]), ("Mazda", ["Mazda 3", "CX-5"]),
+              ("KIA", ["Rio", "Sportage"]), ("Honda", ["Civic", "CR-V"])]
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write("id,brand,model,version,year,km,price,location\n")
+        for i in range(n):
+            b, models = brands[i % len(brands)]
+            f.write(f"{100000 + i},{b},{models[i % len(models)]},Sport,{2015 + i % 10},"
+                    f"{(i * 7919) % 150000},{180000 + (i * 104729) % 500000},Online\n")
+    return path
+
+
+def _count_calls(name_mods):
+    """Envuelve norm_txt/unidecode en todos los módulos que los importaron por nombre."""
+    counts = {"norm_txt": 0, "unidecode": 0}
+    for mod in list(sys.modules.values()):
+        if not (getattr(mod, "__name__", "") or "").startswith("app."):
+            continue
+        for name in name_mods:
+            fn = getattr(mod, name, None)
+            if fn is None or getattr(fn, "_counted", False) or not callable(fn):
+                continue
+
+            def wrap(*a, __fn=fn, __name=name, **kw):
+                counts[__name] += 1
+                return __fn(*a, **kw)
+            wrap._counted = True
+            setattr(mod, name, wrap)
+    return counts
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--catalog", action="store_true", help="filtrar un catálogo sintético real")
+    ap.add_argument("--rounds", type=int, default=200)
+    args = ap.parse_args()
+
+    if args.catalog:
+        os.environ["CATALOG_PATH"] = _fake_catalog_csv()
+
+    import app.nlp.intent as intent
+    import app.nlp.tools as tools
+
+    if not args.catalog:
+        ids = array("I", range(100000, 100020))
+        car = {"id": 100000, "brand": "Nissan", "model": "Versa", "version": "", "year": 2020,
+               "km": 1000, "price": 250000, "location": "Online"}
+        intent.snapshot_search = lambda f, msg=None: (ids, "bench")
+        intent.cars_by_ids = lambda xs: [dict(car, id=int(x)) for x in xs]
+        intent.catalog_version = lambda: "bench"
+        intent.render_results = lambda f, cars, total, offset: "ok"
+        intent.cotiza_car = lambda **kw: "ok"
+    else:
+        tools.cotiza_car(car_id="100000", down_payment=0)       # carga el catálogo fuera de la medición
+
+    async def _kb(q):
+        return "kb"
+    intent.akb_tool = _kb
+
+    counts = _count_calls(["norm_txt", "unidecode"])
+    loop = asyncio.new_event_loop()
+
+    per_msg, calls = [], {"norm_txt": 0, "unidecode": 0}
+    for r in range(args.rounds):
+        intent.SESSIONS.clear()
+        for i, text in enumerate(CORPUS):
+            before = dict(counts)
+            t0 = time.process_time()
+            loop.run_until_complete(intent.route_message("bench", text, user_id="u"))
+            dt = time.process_time() - t0
+            if r:                                   # la 1.ª ronda calienta cachés
+                per_msg.append(dt * 1e6)
+            if r == 1:
+                for k in calls:
+                    calls[k] += counts[k] - before[k]
+
+    n = len(CORPUS)
+    print(f"mensajes={n} rondas={args.rounds - 1} catálogo={'real' if args.catalog else 'simulado'}")
+    print(f"CPU por mensaje: media {statistics.mean(per_msg):.1f} µs · p50 {statistics.median(per_msg):.1f} µs")
+    print(f"norm_txt por mensaje: {calls['norm_txt'] / n:.2f} · unidecode por mensaje: {calls['unidecode'] / n:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# scripts/bench_static.py
+"""
+Micro-benchmark del matcher de respuestas fijas: regex compilada (una pasada)
+vs el escaneo anterior (unidecode + `any(kw in texto)` por cada disparador).
+
+    python scripts/bench_static.py --n 200000 --answers 20
+"""
+import os
+import sys
+import time
+import argparse
+
+from unidecode import unidecode
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE not in sys.path:
+    sys.path.insert(0, BASE)
+
+from app.nlp.static_answers import STATIC_ANSWERS, StaticAnswerRegistry
+
+MESSAGES = [
+    "busca sentra 2021",
+    "¿Por qué Kavak?",
+    "cotiza 320505 con 40 mil",
+    "entre 250k y 300k automático",
+    "¿Cuál es la garantía de los autos?",
+    "quiero un nissan versa 2020 con poco kilometraje por favor",
+    "hola",
+    "¿qué ofrece Kavak a los compradores?",
+]
+
+
+def _linear(triggers):
+    def match(text):
+        norm = unidecode((text or "").strip().lower())
+        return any(kw in norm for kw in triggers)
+    return match
+
+
+def _bench(fn, n):
+    msgs = MESSAGES
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn(msgs[i % len(msgs)])
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100_000)
+    ap.add_argument("--answers", type=int, default=20, help="respuestas fijas simuladas (además de las reales)")
+    args = ap.parse_args()
+
+    for extra in (0, args.answers):
+        reg = StaticAnswerRegistry()
+        triggers = []
+        for name in STATIC_ANSWERS.names():
+            entry = STATIC_ANSWERS._answers[name]
+            reg.register(name, entry.triggers, entry.answer)
+            triggers.extend(entry.triggers)
+        for j in range(extra):
+            fake = [f"pregunta frecuente {j} variante {v}" for v in range(15)]
+            reg.register(f"faq_{j}", fake, "...")
+            triggers.extend(fake)
+
+        lin = _bench(_linear(triggers), args.n)
+        rx = _bench(reg.match, args.n)
+        print(f"{len(triggers):>4} disparadores: lineal {lin:7.2f} µs/msg | regex {rx:7.2f} µs/msg | ×{lin / rx:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# scripts/bench_triples.py
+"""
+Marca/modelo/versión de la búsqueda: la etapa única de tripletas (app/nlp/triples.py, cdist)
+vs la cascada anterior versión → marca → modelo (_cascade_locks, con SymSpell o fuzzy).
+
+    python scripts/bench_triples.py                    # VOCAB de bench_typos × versiones
+    python scripts/bench_triples.py --pad 3000         # + 3000 modelos sintéticos
+    python scripts/bench_triples.py --workers -1       # cdist con todos los núcleos
+
+Casos: frases con marca y/o modelo con typo (los de bench_typos), con y sin versión, y los
+controles negativos. Acierto = la tripleta bloqueada completa es la esperada.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+import pandas as pd
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE not in sys.path:
+    sys.path.insert(0, BASE)
+
+from app.nlp import tools
+from app.nlp.normalize import norm_txt
+from app.nlp.spell import CatalogSpeller
+from app.nlp.triples import TripleMatcher
+from scripts.bench_typos import NEGATIVES, TEMPLATES, VOCAB, _typo
+
+VERSIONS = ["sense", "advance", "exclusive", "lt", "ls", "le", "xle", "sport", "limited", "highline",
+            "comfortline", "trend", "active", "platinum"]
+
+
+def build_df(pad: int, seed: int = 7) -> pd.DataFrame:
+    rnd = random.Random(seed)
+    rows = []
+    for b, ms in VOCAB.items():
+        for m in ms:
+            for v in rnd.sample(VERSIONS, 3):
+                rows.append((len(rows), b, m, v))
+    for j in range(pad):
+        name = "".join(rnd.choice("bcdfgklmnprstvz") + rnd.choice("aeiou") for _ in range(rnd.randint(2, 4)))
+        rows.append((len(rows), "Padbrand", f"{name}{j}", rnd.choice(VERSIONS)))
+    df = pd.DataFrame(rows, columns=["id", "brand", "model", "version"])
+    df["year"], df["km"], df["price"] = 2020, 1000, 250000
+    return tools._normalize_columns(df)
+
+
+def build_cases(df: pd.DataFrame, seed: int = 7):
+    rnd = random.Random(seed)
+    cases = []
+    real = df[df["_brand_n"] != "padbrand"]
+    for (b, m), grp in real.groupby(["_brand_n", "_model_n"]):
+        v = rnd.choice(grp["_version_n"].tolist())
+        tpl = rnd.choice(TEMPLATES)
+        cases.append((tpl.format(f"{_typo(b, rnd)} {_typo(m, rnd)}"), (b, m, None)))
+        # "mazda 3" ya nombra la marca
+        cases.append((tpl.format(f"{_typo(m, rnd)} {v}"), (b if m.split()[0] == b else None, m, v)))
+        cases.append((rnd.choice(TEMPLATES).format(f"{b} {m} {v}"), (b, m, v)))
+    for b in real["_brand_n"].unique():
+        cases.append((rnd.choice(TEMPLATES).format(_typo(b, rnd)), (b, None, None)))
+    cases += [(t, (None, None, None)) for t in NEGATIVES]
+    return cases
+
+
+def evaluate(name, fn, cases):
+    ok = 0
+    times = []
+    for text, want in cases:
+        t = norm_txt(text)
+        t0 = time.perf_counter()
+        got = fn(t)
+        times.append((time.perf_counter() - t0) * 1e6)
+        ok += tuple(got) == want
+    print(f"{name:16s} aciertos {ok}/{len(cases)} ({ok / len(cases):.1%})"
+          f" · latencia media {statistics.mean(times):8.1f} µs · p95 {sorted(times)[int(len(times) * 0.95)]:8.1f} µs")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pad", type=int, default=0, help="modelos sintéticos extra en el vocabulario")
+    ap.add_argument("--workers", type=int, default=1, help="hilos de cdist (-1 = todos los núcleos)")
+    args = ap.parse_args()
+
+    df = build_df(args.pad)
+    cases = build_cases(df)
+    t0 = time.perf_counter()
+    matcher = TripleMatcher.from_catalog(df, workers=args.workers)
+    print(f"tripletas: {len(matcher)} · marcas {len(matcher.brands)} · modelos {len(matcher.models)}"
+          f" · casos {len(cases)} · índice en {(time.perf_counter() - t0) * 1e3:.0f} ms")
+
+    # La cascada lee el speller de _CATALOG: lo apuntamos al vocabulario del benchmark
+    tools._CATALOG["speller"] = CatalogSpeller.from_catalog(df)
+    evaluate("triples", lambda t: matcher.match(t), cases)
+    for index in ("symspell", "fuzzy"):
+        tools.TYPO_INDEX = index
+        evaluate(f"cascade/{index}", lambda t: tools._cascade_locks(df, t, None, None, None, None), cases)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# scripts/bench_typos.py
+"""
+Precisión y latencia de la corrección de typos en marca/modelo:
+SymSpell (app/nlp/spell.py) vs la cascada rapidfuzz anterior (_fuzzy_guess_brand/_model).
+
+    python scripts/bench_typos.py                 # vocabulario de ~25 marcas / ~120 modelos
+    python scripts/bench_typos.py --pad 5000      # + 5000 modelos sintéticos (escalabilidad)
+
+El set de prueba: typos generados (borrado, transposición, sustitución, duplicado) de cada
+marca/modelo dentro de frases típicas, los alias conocidos, y frases SIN auto (controles
+negativos: cualquier marca/modelo devuelto ahí es un falso positivo).
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+import pandas as pd
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE not in sys.path:
+    sys.path.insert(0, BASE)
+
+from app.nlp.aliases import BRAND_ALIAS, MODEL_ALIAS
+from app.nlp.normalize import norm_txt
+from app.nlp.spell import CatalogSpeller
+from app.nlp.tools import _fuzzy_guess_brand, _fuzzy_guess_model, _normalize_columns
+
+VOCAB = {
+    "Nissan": ["Versa", "Sentra", "March", "Kicks", "X-Trail", "Altima", "Frontier", "Pathfinder", "NP300"],
+    "Toyota": ["Corolla", "Camry", "RAV4", "Hilux", "Yaris", "Avanza", "Tacoma", "Highlander"],
+    "Volkswagen": ["Jetta", "Vento", "Polo", "Tiguan", "Virtus", "Taos", "Golf", "Saveiro"],
+    "Chevrolet": ["Aveo", "Onix", "Spark", "Cavalier", "Tracker", "Captiva", "Trax", "Equinox"],
+    "Honda": ["Civic", "City", "CR-V", "HR-V", "Accord", "Fit", "BR-V"],
+    "Mazda": ["Mazda 2", "Mazda 3", "CX-3", "CX-30", "CX-5", "CX-9"],
+    "KIA": ["Rio", "Forte", "Sportage", "Seltos", "Soul", "Sorento"],
+    "Hyundai": ["Accent", "Elantra", "Tucson", "Creta", "Grand i10", "Santa Fe"],
+    "Ford": ["Figo", "Fiesta", "Focus", "Escape", "Explorer", "Ranger", "Lobo", "Territory"],
+    "Suzuki": ["Swift", "Ignis", "Vitara", "Ciaz", "Ertiga"],
+    "Renault": ["Kwid", "Duster", "Stepway", "Logan", "Koleos", "Oroch"],
+    "Mercedes Benz": ["Clase A", "Clase C", "Clase E", "GLA", "GLC"],
+    "BMW": ["Serie 1", "Serie 3", "X1", "X3", "X5"],
+    "Audi": ["A1", "A3", "A4", "Q3", "Q5"],
+    "Seat": ["Ibiza", "Leon", "Arona", "Ateca"],
+    "Peugeot": ["208", "2008", "3008", "Partner"],
+    "Mitsubishi": ["Mirage", "L200", "Outlander", "Eclipse Cross"],
+    "Jeep": ["Compass", "Renegade", "Cherokee", "Wrangler"],
+    "Dodge": ["Attitude", "Journey", "Durango"],
+    "Fiat": ["Mobi", "Uno", "Pulse"],
+    "MG": ["MG5", "ZS", "HS"],
+    "Volvo": ["XC40", "XC60", "XC90"],
+    "Subaru": ["Impreza", "Forester", "Outback", "XV"],
+    "Mini": ["Cooper", "Countryman"],
+    "Cupra": ["Formentor", "Born"],
+}
+
+TEMPLATES = ["busco un {}", "quiero una {} 2020", "{} menos de 300 mil", "tienes {} automatica", "me interesa el {}"]
+NEGATIVES = [
+    "quiero una camioneta barata", "algo en el centro de la ciudad", "con pocos km por favor",
+    "que tal la garantia", "busco algo familiar y seguro", "para mi esposa que maneja poco",
+    "me gusta el color rojo", "mensualidades de 5 mil", "algo economico para uber", "tienen autos hibridos",
+    "carro para la playa", "quiero ver opciones nuevas", "cual me recomiendas", "tengo un presupuesto corto",
+]
+
+
+def _typo(word: str, rnd: random.Random) -> str:
+    letters = [i for i, ch in enumerate(word) if ch.isalpha()]
+    if len(letters) < 4:
+        return word
+    i = rnd.choice(letters[1:-1])
+    kind = rnd.choice(["del", "swap", "sub", "dup"])
+    if kind == "del":
+        return word[:i] + word[i + 1:]
+    if kind == "swap":
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    if kind == "dup":
+        return word[:i] + word[i] + word[i:]
+    return word[:i] + rnd.choice("aeiouszcnmrlt") + word[i + 1:]
+
+
+def build_cases(seed: int = 7):
+    rnd = random.Random(seed)
+    cases = []
+    for brand, models in VOCAB.items():
+        b = norm_txt(brand)
+        for model in models:
+            m = norm_txt(model)
+            tpl = rnd.choice(TEMPLATES)
+            cases.append(("brand", tpl.format(_typo(b, rnd)), b))
+            cases.append(("model", tpl.format(f"{_typo(m, rnd)}"), m))
+            cases.append(("model", rnd.choice(TEMPLATES).format(m), m))              # sin typo
+    known_b = {norm_txt(b) for b in VOCAB}
+    known_m = {norm_txt(m) for ms in VOCAB.values() for m in ms}
+    cases += [("brand", f"busco un {a}", b) for a, b in BRAND_ALIAS.items() if b in known_b]
+    cases += [("model", f"busco un {a}", m) for a, m in MODEL_ALIAS.items() if m in known_m]
+    cases += [("none", t, None) for t in NEGATIVES]
+    return cases
+
+
+def build_df(pad: int, seed: int = 7) -> pd.DataFrame:
+    rnd = random.Random(seed)
+    rows = [(i, b, m) for i, (b, m) in enumerate((b, m) for b, ms in VOCAB.items() for m in ms)]
+    for j in range(pad):
+        name = "".join(rnd.choice("bcdfgklmnprstvz") + rnd.choice("aeiou") for _ in range(rnd.randint(2, 4)))
+        rows.append((len(rows), "Padbrand", f"{name}{j}"))
+    df = pd.DataFrame(rows, columns=["id", "brand", "model"])
+    df["year"], df["km"], df["price"] = 2020, 1000, 250000
+    return _normalize_columns(df)
+
+
+def evaluate(name, guess_brand, guess_model, cases):
+    ok = fp = 0
+    times = []
+    for kind, text, want in cases:
+        t = norm_txt(text)
+        t0 = time.perf_counter()
+        b, m = guess_brand(t), guess_model(t)
+        times.append((time.perf_counter() - t0) * 1e6)
+        if kind == "none":
+            fp += bool(b or m)
+            ok += not (b or m)
+        else:
+            ok += (b if kind == "brand" else m) == want
+    pos = sum(1 for c in cases if c[0] != "none")
+    print(f"{name:9s} aciertos {ok}/{len(cases)} ({ok / len(cases):.1%}) · falsos positivos {fp}/{len(cases) - pos}"
+          f" · latencia media {statistics.mean(times):8.1f} µs · p95 {sorted(times)[int(len(times) * 0.95)]:8.1f} µs")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pad", type=int, default=0, help="modelos sintéticos extra en el vocabulario")
+    args = ap.parse_args()
+
+    df = build_df(args.pad)
+    brands = df["_brand_n"].unique().tolist()
+    models = df["_model_n"].unique().tolist()
+    cases = build_cases()
+    print(f"vocabulario: {len(brands)} marcas · {len(models)} modelos · casos: {len(cases)}")
+
+    t0 = time.perf_counter()
+    speller = CatalogSpeller.from_catalog(df)
+    print(f"índice SymSpell construido en {(time.perf_counter() - t0) * 1e3:.0f} ms")
+    allowed_b, allowed_m = set(brands), set(models)
+
+    evaluate("symspell", lambda t: speller.brand(t, allowed_b), lambda t: speller.model(t, allowed_m), cases)
+    evaluate("fuzzy", lambda t: _fuzzy_guess_brand(t, brands), lambda t: _fuzzy_guess_model(t, models), cases)
+
+
+if __name__ == "__main__":
+    main()
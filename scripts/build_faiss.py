@@ -1,60 +1,177 @@
 # scripts/build_faiss.py
+"""
+Construye el índice FAISS de la KB de forma incremental.
+
+    python scripts/build_faiss.py            # reutiliza embeddings de chunks sin cambios
+    python scripts/build_faiss.py --full     # re-codifica todo
+    python scripts/build_faiss.py --kb-dir docs/ --workers 4
+    python scripts/build_faiss.py --factory HNSW32     # o "IVF256,SQ8", "IVF256,PQ48" (KB_INDEX_FACTORY)
+
+Fuentes: Markdown/TXT/PDF bajo KB_DIR (app/data/kb) más app/data/kb.md si existe.
+La extracción corre en un pool de procesos y los chunks se codifican en lotes a
+medida que llegan; el metadata guarda source, page y offset de cada chunk.
+
+Cada chunk se identifica por el hash de su texto; los vectores se guardan en
+kb_embeddings.npz junto al índice, así editar la KB solo re-codifica lo que cambió.
+Cada build se escribe completo (kb.index, kb_meta.json, kb_bm25.json, kb_version.json…)
+en builds/<versión>-xxxx/ y se publica reemplazando el puntero CURRENT con un solo
+os.replace; se conservan los KB_KEEP_BUILDS builds más recientes (default 2) y el resto
+se borra.
+"""
 import os
+import sys
 import json
-import faiss
+import time
+import argparse
+import numpy as np
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
 
 load_dotenv()
 
-BASE       = os.path.dirname(os.path.dirname(__file__))
+BASE       = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 KB_PATH    = os.path.join(BASE, "app", "data", "kb.md")
 INDEX_DIR  = os.path.join(BASE, "app", "data", "faiss_index")
 
-# Mismo modelo que en retriever.py
-_EMB = SentenceTransformer("all-MiniLM-L6-v2")
+if BASE not in sys.path:
+    sys.path.insert(0, BASE)
+
+# Mismo backend/modelo que en retriever.py (EMBED_MODEL / EMBED_BACKEND)
+from app.nlp.embeddings import get_backend, EMBED_BACKEND, EMBED_MODEL
+from app.nlp.index_store import (
+    STORE_FILE, EmbeddingStore, chunk_hash, index_version_for, publish_index,
+)
+from app.nlp.ann import KB_INDEX_FACTORY, build_ann_index
+from app.nlp.lexical import LEXICAL_FILE, BM25Index
+from app.nlp.ingest import KB_DIR, INGEST_WORKERS, IngestStats, chunk_spans, discover, iter_documents
+
+EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "64"))
 
 def chunk_text(text: str, chunk_size=600, overlap=60):
-    text = text.strip()
-    chunks = []
-    start = 0
-    n = len(text)
-    while start < n:
-        end = min(start + chunk_size, n)
-        chunk = text[start:end]
-        if chunk.strip():
-            chunks.append(chunk)
-        if end == n:
-            break
-        start = max(end - overlap, 0)
-    return chunks
+    return [chunk for _, chunk in chunk_spans(text, chunk_size, overlap)]
 
-def main():
-    if not os.path.exists(KB_PATH):
-        raise FileNotFoundError(f"{KB_PATH} not found")
+def model_key() -> str:
+    return f"{EMBED_BACKEND}:{EMBED_MODEL}"
+
+def _open_store(index_dir, key, full):
+    store_path = os.path.join(index_dir, STORE_FILE)
+    return store_path, (EmbeddingStore(key) if full else EmbeddingStore.load(store_path, key))
+
+def _publish(records, vecs, store, store_path, index_dir, key, factory):
+    # Índice de producto interno (coseno con vectores normalizados): Flat exacto o ANN
+    index, params = build_ann_index(vecs, factory)
 
-    with open(KB_PATH, "r", encoding="utf-8") as f:
-        content = f.read()
+    hashes = [chunk_hash(r["text"]) for r in records]
+    # La versión cubre texto + metadata + tipo de índice (cambiar cualquiera republica)
+    version = index_version_for(
+        f"{key}|{params['factory']}",
+        [chunk_hash(json.dumps(r, sort_keys=True, ensure_ascii=False)) for r in records],
+    )
+    meta = [dict(id=i, **r) for i, r in enumerate(records)]
+    os.makedirs(index_dir, exist_ok=True)
+    store.save(store_path, keep=hashes)
+    # BM25 sobre los mismos chunks (búsqueda híbrida y atajo léxico en el retriever)
+    lexical = BM25Index.build([r["text"] for r in records])
+    publish_index(index_dir, index, meta,
+                  {"version": version, "model": key, "chunks": len(records), "factory": params["factory"]},
+                  params, extras={LEXICAL_FILE: lexical.to_json()})
+    return version
 
-    chunks = chunk_text(content)
-    if not chunks:
-        raise ValueError("kb.md está vacío")
+def build_index(chunks, index_dir=INDEX_DIR, encode=None, key=None, full=False, factory=KB_INDEX_FACTORY):
+    """
+    Publica el índice para `chunks` (textos o dicts con "text" + metadata)
+    reutilizando los vectores ya calculados. Devuelve estadísticas del build.
+    """
+    encode = encode or (lambda texts: get_backend().encode(texts))
+    key = key or model_key()
+    records = [c if isinstance(c, dict) else {"text": c} for c in chunks]
+    store_path, store = _open_store(index_dir, key, full)
 
-    # Embeddings locales normalizados
-    vecs = _EMB.encode(chunks, normalize_embeddings=True, convert_to_numpy=True).astype("float32")
+    t0 = time.perf_counter()
+    vecs, embedded = store.embed([r["text"] for r in records], encode)
+    embed_s = time.perf_counter() - t0
 
-    # Index para similitud coseno (dot product con vectores normalizados)
-    index = faiss.IndexFlatIP(vecs.shape[1])
-    index.add(vecs)
+    version = _publish(records, vecs, store, store_path, index_dir, key, factory)
+    return {
+        "version": version,
+        "chunks": len(records),
+        "embedded": embedded,
+        "reused": len(records) - embedded,
+        "embed_s": round(embed_s, 3),
+    }
+
+def ingest(paths, index_dir=INDEX_DIR, base_dir=KB_DIR, encode=None, key=None, full=False,
+           workers=INGEST_WORKERS, batch=EMBED_BATCH, factory=KB_INDEX_FACTORY):
+    """
+    Pipeline multi-documento: extracción en paralelo → chunks en lotes de `batch`
+    al encoder (vía store incremental) → publicación atómica.
+    Devuelve estadísticas con pages/s, chunks/s y pico de memoria.
+    """
+    encode = encode or (lambda texts: get_backend().encode(texts))
+    key = key or model_key()
+    store_path, store = _open_store(index_dir, key, full)
+    stats = IngestStats()
+
+    records, parts, pending = [], [], []
+
+    def _flush():
+        if pending:
+            t0 = time.perf_counter()
+            vecs, embedded = store.embed([r["text"] for r in pending], encode)
+            stats.embed_s += time.perf_counter() - t0
+            parts.append(vecs)
+            records.extend(pending)
+            stats.embedded += embedded
+            pending.clear()
+
+    for _source, n_pages, chunks in iter_documents(paths, base_dir, workers):
+        stats.documents += 1
+        stats.pages += n_pages
+        stats.chunks += len(chunks)
+        for c in chunks:
+            pending.append(c)
+            if len(pending) >= batch:
+                _flush()
+    _flush()
+
+    if not records:
+        raise ValueError("La KB no tiene texto indexable")
+    out = stats.as_dict()
+    out["version"] = _publish(records, np.vstack(parts), store, store_path, index_dir, key, factory)
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--full", action="store_true", help="ignora el store y re-codifica todos los chunks")
+    ap.add_argument("--kb-dir", default=KB_DIR, help="carpeta con .md/.txt/.pdf (default app/data/kb)")
+    ap.add_argument("--workers", type=int, default=INGEST_WORKERS, help="procesos de extracción (0 = CPUs)")
+    ap.add_argument("--batch", type=int, default=EMBED_BATCH, help="chunks por lote de embeddings")
+    ap.add_argument("--factory", default=KB_INDEX_FACTORY, help="faiss.index_factory: Flat, HNSW32, IVF256,SQ8, ...")
+    args = ap.parse_args()
 
-    os.makedirs(INDEX_DIR, exist_ok=True)
-    faiss.write_index(index, os.path.join(INDEX_DIR, "kb.index"))
+    paths = discover(args.kb_dir, extra=[KB_PATH])
+    if not paths:
+        raise FileNotFoundError(f"No hay documentos en {args.kb_dir} ni {KB_PATH}")
 
-    meta = [{"id": i, "text": chunks[i]} for i in range(len(chunks))]
-    with open(os.path.join(INDEX_DIR, "kb_meta.json"), "w", encoding="utf-8") as f:
-        json.dump(meta, f, ensure_ascii=False, indent=2)
+    stats = ingest(paths, base_dir=args.kb_dir, full=args.full, workers=args.workers, batch=args.batch,
+                   factory=args.factory)
+    print(f"Built FAISS index at {INDEX_DIR} (version {stats['version']})")
+    print(json.dumps({k: v for k, v in stats.items() if k != "version"}, indent=2))
+    refresh_faq()
 
-    print(f"Built FAISS index with {len(chunks)} chunks at {INDEX_DIR}")
+def refresh_faq():
+    """
+    Regenera las respuestas precalculadas para la versión recién publicada
+    (si hay preguntas canónicas y OPENAI_API_KEY); la tabla anterior deja de servirse sola.
+    """
+    from app.nlp.faq import FAQ_QUESTIONS_FILE
+    if not os.path.exists(FAQ_QUESTIONS_FILE):
+        return
+    if not os.getenv("OPENAI_API_KEY", "").strip():
+        print("FAQ: falta OPENAI_API_KEY, no se regeneró (la tabla anterior queda inactiva)")
+        return
+    from scripts.precompute_faq import run
+    res = run(FAQ_QUESTIONS_FILE)
+    print(f"FAQ: {res['stored']} respuestas precalculadas, {len(res['skipped'])} omitidas")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,61 @@
+# scripts/calibrate_threshold.py
+"""
+Calibra la similitud mínima de recuperación (KB_MIN_SCORE) a partir de preguntas etiquetadas.
+
+    python scripts/calibrate_threshold.py queries.jsonl --min-recall 0.95
+
+queries.jsonl: una pregunta por línea, {"query": "¿Cuál es la garantía?", "relevant": true}.
+Escribe app/data/faiss_index/kb_threshold.json, que retriever.py usa en cada consulta mientras
+la versión del índice y el encoder (EMBED_BACKEND:EMBED_MODEL) sean los de la calibración.
+"""
+import os
+import sys
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE not in sys.path:
+    sys.path.insert(0, BASE)
+
+from app.nlp import retriever
+from app.nlp.embeddings import model_key
+from app.nlp.relevance import calibrate_min_score, load_labeled_queries, save_calibration
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("labeled", help="JSONL con {query, relevant}")
+    ap.add_argument("--min-recall", type=float, default=0.95,
+                    help="fracción de preguntas relevantes que deben seguir llegando al LLM")
+    ap.add_argument("--dry-run", action="store_true", help="no escribir kb_threshold.json")
+    args = ap.parse_args()
+
+    index, meta = retriever._load_index()
+    if not index:
+        raise SystemExit("No hay índice. Ejecuta scripts/build_faiss.py primero.")
+
+    rows = load_labeled_queries(args.labeled)
+    vecs = retriever._embed([r["query"] for r in rows])
+    D, _ = index.search(vecs, 1)
+    top1 = [float(d[0]) for d in D]
+
+    pos = [s for s, r in zip(top1, rows) if r["relevant"]]
+    neg = [s for s, r in zip(top1, rows) if not r["relevant"]]
+    res = calibrate_min_score(pos, neg, min_recall=args.min_recall)
+
+    print(f"Preguntas: {len(pos)} relevantes, {len(neg)} fuera de tema")
+    print(f"Umbral: {res['min_score']:.4f}  recall={res['recall']:.2%}  "
+          f"fuera de tema rechazadas={res['offtopic_rejected']:.2%}")
+    if not args.dry_run:
+        path = save_calibration(retriever.INDEX_DIR, res, {
+            "model": model_key(),
+            "index_version": retriever._index_version(),
+            "labeled_queries": len(rows),
+        })
+        print(f"Guardado en {path}")
+
+
+if __name__ == "__main__":
+    main()
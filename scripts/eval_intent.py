@@ -0,0 +1,106 @@
+# scripts/eval_intent.py
+"""
+Exactitud y latencia del clasificador local de intenciones vs la tabla de regex.
+
+    python scripts/eval_intent.py                        # validación cruzada (5 folds) sobre las frases
+    python scripts/eval_intent.py --labeled otras.jsonl  # entrena con todas y evalúa en un set aparte
+
+Reporta, por umbral de confianza: cobertura (predicciones confiables), exactitud del
+clasificador en ellas y exactitud del sistema híbrido (clasificador + regex de respaldo)
+frente a la regex sola; y la latencia por mensaje sin caché y con caché.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE not in sys.path:
+    sys.path.insert(0, BASE)
+
+from app.nlp.embeddings import embed
+from app.nlp.intent_model import INTENT_MIN_CONF, INTENT_PHRASES_FILE, IntentClassifier, load_phrases, model_key
+from app.nlp.message import ParsedMessage
+
+# La regex resuelve "sin regla" al menú, igual que el default de route_message
+_MENU = {"greet", "help"}
+
+
+def _regex_label(text: str) -> str:
+    from app.nlp.intent import INTENTS
+    m = INTENTS.scan(ParsedMessage(text).norm)
+    name = m.name if m is not None else "help"
+    return "search" if name == "search_price" else name
+
+
+def _same(pred: str, want: str) -> bool:
+    return pred == want or (pred in _MENU and want in _MENU)
+
+
+def _folds(rows, k: int, seed: int = 7):
+    rows = rows[:]
+    random.Random(seed).shuffle(rows)
+    for i in range(k):
+        test = rows[i::k]
+        train = [r for j, r in enumerate(rows) if j % k != i]
+        yield train, test
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--phrases", default=INTENT_PHRASES_FILE)
+    ap.add_argument("--labeled", help="set de evaluación aparte (JSONL {text, intent})")
+    ap.add_argument("--folds", type=int, default=5)
+    args = ap.parse_args()
+
+    rows = load_phrases(args.phrases)
+    splits = [(rows, load_phrases(args.labeled))] if args.labeled else list(_folds(rows, args.folds))
+    print(f"Encoder: {model_key()} · frases {len(rows)} · evaluación "
+          + (f"en {args.labeled}" if args.labeled else f"{args.folds}-fold"))
+
+    # Predicciones sin umbral (score y margen) para barrer umbrales después
+    results = []
+    for train, test in splits:
+        clf = IntentClassifier.train(train, embed)
+        for (text, want), pred in zip(test, clf.predict_many([t for t, _ in test])):
+            results.append((text, want, pred))
+
+    regex_ok = sum(_same(_regex_label(t), y) for t, y, _ in results)
+    print(f"regex sola            exactitud {regex_ok / len(results):.1%}")
+    for thr in sorted({0.3, 0.4, 0.5, INTENT_MIN_CONF, 0.6, 0.7, 0.8}):
+        conf = [(t, y, p) for t, y, p in results if p.score >= thr and p.margin >= clf.min_margin]
+        clf_ok = sum(_same(p.label, y) for _, y, p in conf)
+        hybrid_ok = sum(
+            _same(p.label, y) if (p.score >= thr and p.margin >= clf.min_margin) else _same(_regex_label(t), y)
+            for t, y, p in results
+        )
+        mark = " ←" if thr == INTENT_MIN_CONF else ""
+        print(f"umbral {thr:.2f}  cobertura {len(conf) / len(results):6.1%} · clasificador {clf_ok / max(len(conf), 1):6.1%}"
+              f" · híbrido {hybrid_ok / len(results):6.1%}{mark}")
+
+    # Latencia por mensaje (un texto por llamada, como en route_message)
+    clf = IntentClassifier.train(rows, embed)
+    texts = [t for t, _ in rows]
+    cold = []
+    for t in texts:
+        t0 = time.perf_counter()
+        clf.predict(t)
+        cold.append((time.perf_counter() - t0) * 1e3)
+    warm = []
+    for t in texts:
+        t0 = time.perf_counter()
+        clf.predict(t)
+        warm.append((time.perf_counter() - t0) * 1e3)
+    p95 = lambda xs: sorted(xs)[int(len(xs) * 0.95)]
+    print(f"latencia sin caché  media {statistics.mean(cold):.2f} ms · p95 {p95(cold):.2f} ms")
+    print(f"latencia con caché  media {statistics.mean(warm) * 1e3:.1f} µs · p95 {p95(warm) * 1e3:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
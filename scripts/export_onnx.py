@@ -0,0 +1,29 @@
+# scripts/export_onnx.py
+import os
+import sys
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE not in sys.path:
+    sys.path.insert(0, BASE)
+
+from app.nlp.embeddings import EMBED_MODEL, ONNX_DIR, export_onnx
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Exporta el modelo de embeddings a ONNX (fp32 + int8).")
+    ap.add_argument("--model", default=EMBED_MODEL)
+    ap.add_argument("--out", default=ONNX_DIR)
+    ap.add_argument("--no-int8", action="store_true", help="No generar la variante cuantizada")
+    args = ap.parse_args()
+
+    out = export_onnx(args.model, args.out, quantize=not args.no_int8)
+    print(f"ONNX exportado en {os.path.abspath(out)}")
+    print("Usa EMBED_BACKEND=onnx o EMBED_BACKEND=onnx-int8 para activarlo.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# scripts/mock_openai.py
+"""
+Servidor local compatible con OpenAI (solo POST /v1/chat/completions) para tests y benchmarks.
+
+    python scripts/mock_openai.py --port 8089 --delay-ms 300
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=dummy uvicorn app.main:app
+
+Responde "Respuesta simulada: <pregunta>" tras `delay` segundos.
+Atributos ajustables en caliente: server.delay (s), server.status (HTTP), server.requests.
+"""
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive: el pool del cliente reutiliza conexiones
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        srv = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        with srv.lock:
+            srv.requests += 1
+            srv.in_flight += 1
+            srv.max_in_flight = max(srv.max_in_flight, srv.in_flight)
+        try:
+            if srv.delay:
+                time.sleep(srv.delay)
+            if srv.status != 200:
+                payload = {"error": {"message": "mock error", "type": "server_error"}}
+                return self._send(srv.status, payload)
+
+            user = next((m["content"] for m in reversed(body.get("messages", [])) if m.get("role") == "user"), "")
+            question = user.split("\n", 1)[0].replace("Pregunta del usuario:", "").strip()
+            self._send(200, {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": f"Respuesta simulada: {question}"},
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+        finally:
+            with srv.lock:
+                srv.in_flight -= 1
+
+    def _send(self, status: int, payload: dict):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_mock_server(delay_ms: float = 0.0, port: int = 0, status: int = 200):
+    """
+    Arranca el mock en un hilo daemon. Devuelve (server, base_url).
+    Detener con server.shutdown().
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    server.daemon_threads = True
+    server.delay = delay_ms / 1000.0
+    server.status = status
+    server.requests = 0
+    server.in_flight = 0
+    server.max_in_flight = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--delay-ms", type=float, default=300.0)
+    args = ap.parse_args()
+    server, url = start_mock_server(args.delay_ms, args.port)
+    print(f"Mock OpenAI en {url} (delay {args.delay_ms:.0f} ms). Ctrl+C para salir.")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# scripts/mock_redis.py
+"""
+Servidor local que habla el protocolo de Redis (RESP2), suficiente para las sesiones.
+
+    python scripts/mock_redis.py --port 6390
+    SESSION_BACKEND=redis SESSION_REDIS_URL=redis://127.0.0.1:6390/0 uvicorn app.main:app --workers 4
+
+Comandos: PING, AUTH, SELECT, GET, GETEX, SET (EX/PX), DEL, KEYS, SCAN (MATCH/COUNT), DBSIZE, FLUSHDB.
+Atributos: server.commands (comandos recibidos), server.data.
+"""
+import time
+import fnmatch
+import argparse
+import threading
+import socketserver
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if line[:1] != b"*":                       # comando inline ("PING\r\n")
+            return line.strip().split()
+        args = []
+        for _ in range(int(line[1:])):
+            n = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(n + 2)[:-2])
+        return args
+
+    def handle(self):
+        srv = self.server
+        while True:
+            cmd = self._read_command()
+            if cmd is None:
+                return
+            self.wfile.write(self._dispatch(srv, cmd))
+
+    @staticmethod
+    def _bulk(v):
+        return b"$-1\r\n" if v is None else b"$%d\r\n%s\r\n" % (len(v), v)
+
+    def _dispatch(self, srv, args) -> bytes:
+        name = args[0].decode().upper()
+        with srv.lock:
+            srv.commands += 1
+            now = time.monotonic()
+            for k in [k for k, (_, exp) in srv.data.items() if exp is not None and exp <= now]:
+                del srv.data[k]
+
+            if name == "PING":
+                return b"+PONG\r\n"
+            if name in ("AUTH", "SELECT"):
+                return b"+OK\r\n"
+            if name == "GET":
+                item = srv.data.get(args[1])
+                return self._bulk(item[0] if item else None)
+            if name in ("SET", "GETEX"):
+                key, opts = args[1], [a.decode().upper() for a in args[2 if name == "GETEX" else 3:]]
+                exp = None
+                for flag, mult in (("PX", 0.001), ("EX", 1.0)):
+                    if flag in opts:
+                        exp = now + float(opts[opts.index(flag) + 1]) * mult
+                if name == "SET":
+                    srv.data[key] = (args[2], exp)
+                    return b"+OK\r\n"
+                item = srv.data.get(key)
+                if item is None:
+                    return self._bulk(None)
+                srv.data[key] = (item[0], exp if exp is not None else item[1])
+                return self._bulk(item[0])
+            if name == "DEL":
+                n = sum(1 for k in args[1:] if srv.data.pop(k, None) is not None)
+                return b":%d\r\n" % n
+            if name == "KEYS":
+                pat = args[1].decode()
+                keys = [k for k in srv.data if fnmatch.fnmatchcase(k.decode(), pat)]
+                return b"*%d\r\n" % len(keys) + b"".join(self._bulk(k) for k in keys)
+            if name == "SCAN":
+                # Cursor = posición en las llaves ordenadas; 0 al terminar
+                opts = [a.decode() for a in args[2:]]
+                pat = opts[opts.index("MATCH") + 1] if "MATCH" in opts else "*"
+                count = int(opts[opts.index("COUNT") + 1]) if "COUNT" in opts else 10
+                start, keys = int(args[1]), sorted(srv.data)
+                batch = keys[start:start + count]
+                cursor = start + count if start + count < len(keys) else 0
+                found = [k for k in batch if fnmatch.fnmatchcase(k.decode(), pat)]
+                return (b"*2\r\n" + self._bulk(str(cursor).encode())
+                        + b"*%d\r\n" % len(found) + b"".join(self._bulk(k) for k in found))
+            if name == "DBSIZE":
+                return b":%d\r\n" % len(srv.data)
+            if name == "FLUSHDB":
+                srv.data.clear()
+                return b"+OK\r\n"
+            return b"-ERR unknown command '%s'\r\n" % name.encode()
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def start_mock_redis(port: int = 0):
+    """
+    Arranca el servidor en un hilo daemon. Devuelve (server, url).
+    Detener con server.shutdown().
+    """
+    server = _Server(("127.0.0.1", port), _Handler)
+    server.data = {}
+    server.commands = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"redis://127.0.0.1:{server.server_address[1]}/0"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=6390)
+    args = ap.parse_args()
+    server, url = start_mock_redis(args.port)
+    print(f"Mock Redis en {url}. Ctrl+C para salir.")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
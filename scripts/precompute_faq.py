@@ -0,0 +1,56 @@
+# scripts/precompute_faq.py
+"""
+Precalcula las respuestas de las preguntas frecuentes contra la versión actual del índice.
+
+    python scripts/precompute_faq.py                       # app/data/faq_questions.txt
+    python scripts/precompute_faq.py --questions faq.txt
+
+Corre kb_answer completo (recuperación + LLM) por cada pregunta canónica y guarda
+respuesta, ids de chunks y embedding en kb_faq.json. En runtime kb_tool la sirve si la
+pregunta coincide (texto o embedding) y el índice no cambió. build_faiss.py la
+regenera automáticamente tras publicar una versión nueva.
+"""
+import os
+import sys
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE not in sys.path:
+    sys.path.insert(0, BASE)
+
+from app.nlp import retriever
+from app.nlp.faq import FAQ_QUESTIONS_FILE, load_questions, precompute_faq
+
+
+def run(questions_path: str = FAQ_QUESTIONS_FILE) -> dict:
+    index, _ = retriever._load_index()
+    version = retriever._index_version()
+    if not index or not version:
+        raise SystemExit("No hay índice. Ejecuta scripts/build_faiss.py primero.")
+    if not os.getenv("OPENAI_API_KEY", "").strip():
+        raise SystemExit("Falta OPENAI_API_KEY: las respuestas precalculadas deben venir del LLM.")
+
+    retriever._FAQ.enabled = False          # no servir la tabla vieja mientras se regenera
+    try:
+        return precompute_faq(load_questions(questions_path), retriever.INDEX_DIR, version,
+                              retriever.kb_answer, retriever._embed)
+    finally:
+        retriever._FAQ.enabled = True
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--questions", default=FAQ_QUESTIONS_FILE, help="una pregunta canónica por línea")
+    args = ap.parse_args()
+
+    res = run(args.questions)
+    print(f"FAQ: {res['stored']} respuestas guardadas para la versión {retriever._index_version()}")
+    for q in res["skipped"]:
+        print(f"  omitida (sin fuentes o respuesta de respaldo): {q}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# scripts/train_intent.py
+"""
+Entrena el clasificador local de intenciones (USE_LLM_INTENT=1): un centroide por intención
+sobre embeddings del encoder configurado (EMBED_MODEL / EMBED_BACKEND).
+
+    python scripts/train_intent.py                                 # app/data/intent_phrases.jsonl
+    python scripts/train_intent.py --phrases mis_frases.jsonl --out /tmp/intent.json
+
+Escribe INTENT_MODEL_FILE (app/data/intent_centroids.json) con el modelo y el hash de las
+frases: si cualquiera de los dos cambia, la app reentrena sola al arrancar.
+"""
+import os
+import sys
+import time
+import argparse
+from collections import Counter
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE not in sys.path:
+    sys.path.insert(0, BASE)
+
+from app.nlp.embeddings import embed
+from app.nlp.intent_model import (
+    INTENT_MODEL_FILE, INTENT_PHRASES_FILE, IntentClassifier, load_phrases, model_key, phrases_version,
+)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--phrases", default=INTENT_PHRASES_FILE, help="JSONL con {text, intent}")
+    ap.add_argument("--out", default=INTENT_MODEL_FILE)
+    args = ap.parse_args()
+
+    rows = load_phrases(args.phrases)
+    per_label = Counter(label for _, label in rows)
+    print(f"Frases: {len(rows)} · " + ", ".join(f"{k}={v}" for k, v in sorted(per_label.items())))
+
+    t0 = time.perf_counter()
+    clf = IntentClassifier.train(rows, embed)
+    print(f"Entrenado en {time.perf_counter() - t0:.2f} s ({model_key()})")
+
+    train_acc = sum(p.label == y for p, (_, y) in zip(clf.predict_many([t for t, _ in rows]), rows)) / len(rows)
+    print(f"Exactitud sobre las frases de entrenamiento: {train_acc:.1%}")
+
+    clf.save(args.out, model=model_key(), phrases=phrases_version(rows))
+    print(f"Guardado en {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -71,11 +71,7 @@ def stub_tools(monkeypatch):
 @pytest.fixture(autouse=True)
 def reset_state():
     import app.nlp.intent as intent
-    intent.LAST_FILTERS.clear()
-    intent.LAST_OFFSET.clear()
-    intent.LAST_LIMIT.clear()
-    intent.LAST_PAGE.clear()
-    intent.LAST_CTX.clear()
+    intent.SESSIONS.clear()
     yield
 
 # ---------- TestClient de FastAPI ----------
@@ -119,4 +115,42 @@ def sample_catalog_df():
         (8,  "KIA",         "Rio",        2020,  39492, 331999.0, "Online"),
         (9,  "Mercedes Benz","Clase C",   2017,  74700, 882999.0, "Online"),
     ]
-    return pd.DataFrame(data, columns=["id","brand","model","year","km","price","location"])
\ No newline at end of file
+    return pd.DataFrame(data, columns=["id","brand","model","year","km","price","location"])
+
+# ---------- Servidor local compatible con OpenAI ----------
+@pytest.fixture
+def mock_openai(monkeypatch):
+    from scripts.mock_openai import start_mock_server
+    from app.nlp import llm
+
+    server, base_url = start_mock_server()
+    monkeypatch.setenv("OPENAI_BASE_URL", base_url)
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+    llm.BREAKER.reset()
+    yield server
+    llm.BREAKER.reset()
+    server.shutdown()
+    server.server_close()
+
+# ---------- KB falsa en memoria (sin archivos ni encoder) ----------
+@pytest.fixture
+def fake_kb(monkeypatch):
+    """
+    Factory: fake_kb(vectors, meta, version=None, embed=None) arma un IndexFlatIP con `vectors`
+    y lo sirve como el índice vigente (con `meta` y `version`). `embed`, si se pasa, reemplaza
+    a retriever._embed. Devuelve el índice.
+    """
+    import faiss
+    import numpy as np
+    import app.nlp.retriever as r
+
+    def _make(vectors, meta, version=None, embed=None):
+        vecs = np.ascontiguousarray(vectors, dtype="float32")
+        index = faiss.IndexFlatIP(vecs.shape[1])
+        index.add(vecs)
+        monkeypatch.setattr(r, "_load_index", lambda: (index, meta))
+        monkeypatch.setattr(r, "_index_version", lambda: version)
+        if embed is not None:
+            monkeypatch.setattr(r, "_embed", embed)
+        return index
+    return _make
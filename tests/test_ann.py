@@ -0,0 +1,58 @@
+# tests/test_ann.py
+import os
+import json
+
+import numpy as np
+import pytest
+
+import app.nlp.retriever as r
+from app.nlp.ann import PARAMS_FILE, build_ann_index
+from app.nlp.index_store import current_dir
+from scripts.bench_index import make_corpus
+from scripts.build_faiss import build_index
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    return make_corpus(3000, 32, 50, clusters=30)
+
+
+def _recall(index, flat, xq, k=4):
+    _, truth = flat.search(xq, k)
+    _, found = index.search(xq, k)
+    return np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+
+
+@pytest.mark.parametrize("spec, min_recall", [("HNSW16", 0.8), ("IVF64,SQ8", 0.8), ("IVF64,PQ16x4", 0.5)])
+def test_ann_factories_keep_recall(corpus, spec, min_recall):
+    xb, xq = corpus
+    flat, _ = build_ann_index(xb, "Flat")
+    index, params = build_ann_index(xb, spec, nprobe=16, ef_search=64)
+    assert params["factory"] == spec and params["ntotal"] == len(xb)
+    assert _recall(index, flat, xq) >= min_recall     # PQ comprime: recall menor a cambio de memoria
+
+
+def test_factory_is_fitted_to_small_corpora(corpus):
+    xb, _ = corpus
+    _, params = build_ann_index(xb[:200], "IVF1024,PQ8")
+    assert params["factory"] == "IVF5,SQ8"         # nlist ≤ n/39; PQ necesita ≥ 256 puntos
+    _, params = build_ann_index(xb[:20], "IVF64,SQ8")
+    assert params["factory"] == "Flat"
+
+
+def test_retriever_applies_saved_search_params(tmp_path, monkeypatch, corpus):
+    xb, _ = corpus
+    chunks = [f"chunk {i}" for i in range(len(xb))]
+    lookup = dict(zip(chunks, xb))
+    build_index(chunks, str(tmp_path), encode=lambda ts: np.stack([lookup[t] for t in ts]),
+                key="test", factory="IVF32,Flat")
+    with open(os.path.join(current_dir(str(tmp_path)), PARAMS_FILE), encoding="utf-8") as f:
+        assert json.load(f)["factory"] == "IVF32,Flat"
+
+    monkeypatch.setattr(r, "INDEX_DIR", str(tmp_path))
+    monkeypatch.setitem(r._INDEX_STATE, "version", None)
+    monkeypatch.setenv("KB_INDEX_NPROBE", "5")
+    import faiss
+    index, meta = r._load_index()
+    assert faiss.extract_index_ivf(index).nprobe == 5
+    assert len(meta) == len(xb)
@@ -0,0 +1,58 @@
+# tests/test_answer_cache.py
+import numpy as np
+
+import app.nlp.retriever as r
+from app.nlp.cache import SemanticAnswerCache
+
+
+def _unit(v):
+    v = np.asarray(v, dtype="float32")
+    return v / np.linalg.norm(v)
+
+
+A      = _unit([1.0, 0.0, 0.0, 0.0])
+A_NEAR = _unit([1.0, 0.05, 0.0, 0.0])   # coseno ≈ 0.999
+B      = _unit([0.0, 1.0, 0.0, 0.0])
+
+
+def test_serves_near_duplicate_with_same_chunks():
+    c = SemanticAnswerCache(threshold=0.95)
+    c.put(A, [0, 1], {"answer": "3 meses", "sources": []}, "v1")
+
+    assert c.lookup(A_NEAR, [0, 1], "v1")["answer"] == "3 meses"
+    assert c.lookup(B, [0, 1], "v1") is None          # pregunta distinta
+    assert c.lookup(A_NEAR, [1, 2], "v1") is None     # recuperó otros chunks
+    assert c.lookup(A_NEAR, [0, 1], "v2") is None     # índice reconstruido
+    assert c.stats()["hits"] == 1
+
+
+def test_ttl_and_size_eviction():
+    now = [0.0]
+    c = SemanticAnswerCache(threshold=0.9, maxsize=2, ttl=10, clock=lambda: now[0])
+    c.put(A, [0], {"answer": "a"}, "v1")
+    c.put(B, [1], {"answer": "b"}, "v1")
+    c.put(_unit([0, 0, 1, 0]), [2], {"answer": "c"}, "v1")   # expulsa A (LRU)
+    assert len(c) == 2
+    assert c.lookup(A, [0], "v1") is None
+    assert c.lookup(B, [1], "v1")["answer"] == "b"
+
+    now[0] = 11.0
+    assert c.lookup(B, [1], "v1") is None                    # caducó
+    assert len(c) == 1
+
+
+def test_kb_answer_skips_llm_for_near_duplicate(fake_kb, mock_openai):
+    meta = [{"id": 0, "text": "Garantía de 3 meses"}, {"id": 1, "text": "Devolución 7 días"}]
+    vectors = {"cual es la garantia": A, "cual es la garantia del auto": A_NEAR}
+    fake_kb(np.stack([A, B]), meta, "v1",
+            lambda texts: vectors[r._cache_key(texts[0], 1)[0]].reshape(1, -1))
+    r._RCACHE.clear()
+    r._ACACHE.clear()
+
+    a1 = r.kb_answer("¿Cuál es la garantía?", k=1)
+    a2 = r.kb_answer("¿Cuál es la garantía del auto?", k=1)
+
+    assert mock_openai.requests == 1
+    assert a1 == a2
+    r._RCACHE.clear()
+    r._ACACHE.clear()
@@ -0,0 +1,56 @@
+# tests/test_batcher.py
+import asyncio
+import numpy as np
+
+from app.nlp.batcher import EmbeddingBatcher
+
+
+def _fake_encode(calls):
+    def encode(texts):
+        calls.append(list(texts))
+        # vector = [len(texto), índice] para poder verificar el reparto por petición
+        return np.array([[len(t), i] for i, t in enumerate(texts)], dtype="float32")
+    return encode
+
+
+def test_concurrent_queries_share_one_encode_call():
+    calls = []
+    b = EmbeddingBatcher(_fake_encode(calls), max_batch=16, window_ms=20)
+    texts = ["garantía", "devoluciones", "cómo es la entrega"]
+
+    async def run():
+        return await asyncio.gather(*(b.embed(t) for t in texts))
+
+    vecs = asyncio.get_event_loop().run_until_complete(run())
+
+    assert calls == [texts]
+    assert [int(v[0]) for v in vecs] == [len(t) for t in texts]
+    m = b.metrics()
+    assert m["batches"] == 1 and m["items"] == 3
+    assert m["batch_sizes"] == {3: 1}
+    assert m["queue_delay_ms"]["max"] >= 0
+
+
+def test_max_batch_flushes_without_waiting_window():
+    calls = []
+    b = EmbeddingBatcher(_fake_encode(calls), max_batch=2, window_ms=10_000)
+
+    async def run():
+        return await asyncio.wait_for(asyncio.gather(*(b.embed(f"q{i}") for i in range(4))), 2)
+
+    asyncio.get_event_loop().run_until_complete(run())
+    assert [len(c) for c in calls] == [2, 2]
+    assert b.metrics()["avg_batch_size"] == 2
+
+
+def test_encode_error_propagates_to_every_waiter():
+    def boom(texts):
+        raise RuntimeError("modelo caído")
+
+    b = EmbeddingBatcher(boom, max_batch=8, window_ms=5)
+
+    async def run():
+        return await asyncio.gather(b.embed("a"), b.embed("b"), return_exceptions=True)
+
+    res = asyncio.get_event_loop().run_until_complete(run())
+    assert all(isinstance(r, RuntimeError) for r in res)
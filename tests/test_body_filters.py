@@ -0,0 +1,28 @@
+# tests/test_body_filters.py
+import asyncio
+
+import app.nlp.intent as intent
+import app.nlp.tools as tools
+
+CSV = ("id,brand,model,year,km,price\n"
+       "1,Nissan,Versa,2020,10000,260000\n2,Nissan,Kicks,2021,20000,330000\n"
+       "3,Toyota,RAV4,2019,30000,310000\n4,Mazda,CX-5,2020,40000,290000\n")
+
+
+def _say(text):
+    return asyncio.get_event_loop().run_until_complete(intent.route_message("whatsapp", text, user_id="u1"))
+
+
+def test_body_and_cheap_feed_search_filters(tmp_path, monkeypatch):
+    path = tmp_path / "catalog.csv"
+    path.write_text(CSV, encoding="utf-8")
+    monkeypatch.setattr(tools, "CATALOG_PATH", str(path))
+
+    reply = _say("una camioneta barata")
+    sess = intent.SESSIONS.peek("whatsapp", "u1")
+    assert sess.filters["body"] == "suv" and sess.filters["sort"] == "price"
+    assert list(sess.snapshot) == [4, 3, 2]                     # solo SUVs, las más baratas primero
+    assert "SUV" in reply and "más baratos primero" in reply
+
+    assert intent._apply_remove_filters({"body": "suv", "sort": "price"}, "quita carrocería, quita precio") == {}
+    assert tools._filtered_df_for_search({"body": "sedan"})["id"].tolist() == [1]
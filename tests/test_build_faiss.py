@@ -0,0 +1,159 @@
+# tests/test_build_faiss.py
+import os
+import json
+
+import numpy as np
+
+import app.nlp.retriever as r
+from app.nlp.index_store import VERSION_FILE, STORE_FILE, EmbeddingStore, current_dir
+from scripts.build_faiss import build_index, chunk_text
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.seen = []
+
+    def __call__(self, texts):
+        self.seen.extend(texts)
+        rng = [np.random.default_rng(abs(hash(t)) % (2**32)).standard_normal(8) for t in texts]
+        v = np.asarray(rng, dtype="float32")
+        return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+DOC = "\n\n".join(f"Sección {i}: " + ("texto de la base de conocimiento " * 30) + str(i) for i in range(5))
+
+
+def test_rebuild_only_embeds_changed_chunks(tmp_path):
+    enc = CountingEncoder()
+    chunks = chunk_text(DOC)
+    first = build_index(chunks, str(tmp_path), encode=enc, key="test:model")
+    assert first["embedded"] == len(set(chunks)) and first["reused"] == len(chunks) - first["embedded"]
+
+    enc.seen.clear()
+    again = build_index(chunks, str(tmp_path), encode=enc, key="test:model")
+    assert again["embedded"] == 0 and enc.seen == []
+    assert again["version"] == first["version"]
+
+    edited = chunks[:-1] + [chunks[-1] + " (editado)"]
+    third = build_index(edited, str(tmp_path), encode=enc, key="test:model")
+    assert third["embedded"] == 1 and enc.seen == [edited[-1]]
+    assert third["version"] != first["version"]
+
+
+def test_model_change_invalidates_store(tmp_path):
+    enc = CountingEncoder()
+    chunks = chunk_text(DOC)
+    build_index(chunks, str(tmp_path), encode=enc, key="a")
+    store = EmbeddingStore.load(os.path.join(tmp_path, STORE_FILE), "b")
+    assert store.vecs == {}
+
+
+def test_retriever_uses_version_stamp(tmp_path, monkeypatch):
+    enc = CountingEncoder()
+    chunks = chunk_text(DOC)
+    stats = build_index(chunks, str(tmp_path), encode=enc, key="test:model")
+    with open(os.path.join(current_dir(str(tmp_path)), VERSION_FILE), encoding="utf-8") as f:
+        assert json.load(f)["version"] == stats["version"]
+
+    monkeypatch.setattr(r, "INDEX_DIR", str(tmp_path))
+    monkeypatch.setitem(r._INDEX_STATE, "version", None)
+    assert r._index_version() == stats["version"]
+    index, meta = r._load_index()
+    assert index.ntotal == len(meta) == len(chunks)
+    assert not [p for p in os.listdir(tmp_path) if p.startswith(".tmp-")]
+
+
+# ---------- Ingesta multi-documento ----------
+def _write_pdf(path, pages):
+    """PDF mínimo con una línea de texto por página (Helvetica)."""
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+            "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objs.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                    f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objs)} 0 R >>")
+        kids.append(f"{len(objs)} 0 R")
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out, offsets = b"%PDF-1.4\n", []
+    for i, body in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(out)
+
+
+def test_ingest_markdown_and_pdf_with_metadata(tmp_path):
+    from app.nlp.ingest import discover
+    from scripts.build_faiss import ingest
+
+    kb = tmp_path / "kb"
+    (kb / "faq").mkdir(parents=True)
+    (kb / "faq" / "garantia.md").write_text("  " + DOC, encoding="utf-8")
+    (kb / "notas.txt").write_text("Horario de atención de 9 a 18 horas.", encoding="utf-8")
+    (kb / "ignorado.docx").write_bytes(b"x")
+    _write_pdf(kb / "stock.pdf", ["Nissan Versa 2020 precio 265999", "Suzuki Swift 2023 precio 298999"])
+
+    paths = discover(str(kb))
+    assert [os.path.relpath(p, kb) for p in paths] == [
+        "notas.txt", "stock.pdf", os.path.join("faq", "garantia.md")]
+
+    out_dir = tmp_path / "index"
+    stats = ingest(paths, index_dir=str(out_dir), base_dir=str(kb), encode=CountingEncoder(),
+                   key="test:model", workers=2, batch=4)
+    assert stats["documents"] == 3
+    assert stats["pages"] == 4                          # md + txt + 2 páginas de PDF
+    assert stats["chunks"] == len(chunk_text(DOC)) + 3
+    assert stats["pages_per_s"] > 0 and stats["chunks_per_s"] > 0
+
+    with open(os.path.join(current_dir(str(out_dir)), "kb_meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    pdf = [m for m in meta if m["source"] == "stock.pdf"]
+    assert [m["page"] for m in pdf] == [1, 2]
+    assert "Suzuki Swift" in pdf[1]["text"]
+    md = [m for m in meta if m["source"] == "faq/garantia.md"]
+    assert md[0]["offset"] == 2                         # offset respecto al texto original
+    text = (kb / "faq" / "garantia.md").read_text(encoding="utf-8")
+    assert all(text[m["offset"]:m["offset"] + len(m["text"])] == m["text"] for m in md)
+    assert [m["id"] for m in meta] == list(range(len(meta)))
+
+
+def test_publish_swaps_one_pointer_and_prunes_old_builds(tmp_path, monkeypatch):
+    enc = CountingEncoder()
+    chunks = chunk_text(DOC)
+    monkeypatch.setattr(r, "INDEX_DIR", str(tmp_path))
+    monkeypatch.setitem(r._INDEX_STATE, "version", None)
+    first = build_index(chunks, str(tmp_path), encode=enc, key="a")
+    first_dir = current_dir(str(tmp_path))
+    assert r._load_index()[0].ntotal == len(chunks)
+
+    second = build_index(chunks[:-1], str(tmp_path), encode=enc, key="a")
+    assert current_dir(str(tmp_path)) != first_dir and os.path.isdir(first_dir)   # el anterior se conserva
+    assert r._index_version() == second["version"] != first["version"]
+    assert len(r._load_index()[1]) == len(chunks) - 1
+
+    build_index(chunks, str(tmp_path), encode=enc, key="b")
+    assert not os.path.exists(first_dir)                                           # KB_KEEP_BUILDS=2
+    assert len(os.listdir(tmp_path / "builds")) == 2
+    assert sorted(p for p in os.listdir(tmp_path) if not p.startswith("kb_")) == ["CURRENT", "builds"]
+
+
+def test_index_and_meta_mismatch_is_never_served(tmp_path, monkeypatch):
+    build_index(chunk_text(DOC), str(tmp_path), encode=CountingEncoder(), key="a")
+    meta_path = os.path.join(current_dir(str(tmp_path)), "kb_meta.json")
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta[:-1], f)
+
+    monkeypatch.setattr(r, "INDEX_DIR", str(tmp_path))
+    monkeypatch.setitem(r._INDEX_STATE, "version", None)
+    monkeypatch.setitem(r._INDEX_STATE, "index", None)
+    monkeypatch.setitem(r._INDEX_STATE, "meta", [])
+    monkeypatch.setitem(r._INDEX_STATE, "rejected", None)
+    assert r._load_index() == (None, [])                                           # ni en la primera carga
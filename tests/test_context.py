@@ -0,0 +1,79 @@
+# tests/test_context.py
+import app.nlp.retriever as r
+from app.nlp.context import assemble_context, count_tokens, count_message_tokens
+
+TEXT = ("La garantía de Kavak cubre motor y transmisión durante 3 meses. " * 4 +
+        "Puedes devolver el auto en 7 días. " * 6 +
+        "El financiamiento se aprueba en 24 horas con enganche desde 10%. " * 4)
+
+
+def _chunks(text, size=200, overlap=60):
+    out, start = [], 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        out.append(text[start:end])
+        if end == len(text):
+            break
+        start = end - overlap
+    return [{"id": i, "text": c} for i, c in enumerate(out)]
+
+
+def test_adjacent_chunks_merge_without_repeated_overlap():
+    hits = _chunks(TEXT)[:3]
+    ctx = assemble_context(hits, budget_tokens=10_000)
+    assert ctx["text"] == TEXT[:len(ctx["text"])]       # texto original, sin repeticiones
+    assert ctx["overlap_chars"] == 120
+    assert ctx["dropped"] == 0
+
+
+def test_orders_by_score_and_packs_budget():
+    hits = _chunks(TEXT)
+    a, b = hits[0], hits[4]
+    budget = count_tokens(b["text"]) + 5
+    ctx = assemble_context([a, b], budget_tokens=budget, scores=[0.3, 0.9])
+    assert ctx["used"] == [b]                           # el de mayor score entra primero
+    assert ctx["dropped"] == 1
+    assert ctx["tokens"] <= budget
+
+
+def test_best_chunk_is_truncated_when_over_budget():
+    hits = _chunks(TEXT)[:1]
+    ctx = assemble_context(hits, budget_tokens=10)
+    assert 0 < len(ctx["text"]) < len(hits[0]["text"])
+    assert ctx["dropped"] == 0
+
+
+def test_non_adjacent_spans_keep_score_order():
+    hits = _chunks(TEXT)
+    ctx = assemble_context([hits[3], hits[0], hits[1]], budget_tokens=10_000)
+    first, second = ctx["text"].split("\n\n")
+    assert first == hits[3]["text"]
+    assert second.startswith(hits[0]["text"]) and len(second) == 200 + 200 - 60
+
+
+def test_build_prompt_reports_tokens():
+    before = r.prompt_metrics()["requests"]
+    messages, tokens = r._build_prompt("¿garantía?", _chunks(TEXT)[:2])
+    assert tokens == count_message_tokens(messages)
+    m = r.prompt_metrics()
+    assert m["requests"] == before + 1
+    assert m["last_prompt_tokens"] == tokens
+
+
+def test_consecutive_ids_from_different_sources_are_not_merged():
+    a = {"id": 7, "text": "Fin del documento A.", "source": "a.md", "page": 1}
+    b = {"id": 8, "text": "Inicio del documento B.", "source": "b.pdf", "page": 1}
+    ctx = assemble_context([a, b], budget_tokens=10_000)
+    assert ctx["text"] == "Fin del documento A.\n\nInicio del documento B."
+
+
+def test_build_prompt_orders_context_by_retrieval_scores():
+    hits = _chunks(TEXT)
+    a, b = hits[0], hits[3]
+    messages, _ = r._build_prompt("¿garantía?", [a, b], scores=[0.41, 0.87])
+    ctx = messages[1]["content"].split("Contexto:\n", 1)[1]
+    assert ctx.index(b["text"]) < ctx.index(a["text"])
+
+    ids, scores = r._fuse([5, 2], [0.9, 0.8], [2, 7], k=3)
+    assert ids == [2, 5, 7] and scores == sorted(scores, reverse=True)
+    assert r._fuse([5, 2], [0.9, 0.8], [], k=3) == ([5, 2], [0.9, 0.8])
@@ -0,0 +1,94 @@
+# tests/test_deadline.py
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+import app.nlp.retriever as r
+from app.nlp import llm
+from app.nlp.extractive import split_sentences, rank_sentences
+
+META = [
+    {"id": 0, "text": "La garantía de Kavak cubre 3 meses o 3,000 km. Aplica en motor y transmisión."},
+    {"id": 1, "text": "Tienes 7 días para devolver el auto si no te convence."},
+]
+SENTS = {
+    "La garantía de Kavak cubre 3 meses o 3,000 km.": [1, 0, 0, 0],
+    "Aplica en motor y transmisión.":                 [0.6, 0.8, 0, 0],
+    "Tienes 7 días para devolver el auto si no te convence.": [0, 0, 1, 0],
+}
+
+
+def _run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def _fake_embed(texts):
+    return np.asarray([SENTS.get(t, [1, 0, 0, 0]) for t in texts], dtype="float32")
+
+
+@pytest.fixture
+def kb(fake_kb, monkeypatch):
+    fake_kb(np.eye(4, dtype="float32")[:2], META, embed=_fake_embed)
+    monkeypatch.setattr(r, "KB_EXTRACTIVE_SENTENCES", 1)
+
+
+def test_split_and_rank_sentences():
+    sents = split_sentences(META + META[:1])           # chunks solapados → sin duplicados
+    assert len(sents) == 3
+    top = rank_sentences(np.asarray([1, 0, 0, 0], dtype="float32"), sents, _fake_embed(sents), 2)
+    assert top[0].startswith("La garantía")
+    assert top[1].startswith("Aplica en motor")
+
+
+def test_slow_llm_falls_back_to_extractive_within_deadline(kb, mock_openai):
+    mock_openai.delay = 2.0
+    t0 = time.perf_counter()
+    out = _run(r.akb_answer("¿Cuál es la garantía?", k=1, deadline_s=0.8))
+    elapsed = time.perf_counter() - t0
+
+    assert elapsed < 1.5
+    assert out["fallback"] == "deadline"
+    assert "La garantía de Kavak cubre 3 meses" in out["answer"]
+    assert "agente de Kavak" in out["answer"]
+
+
+def test_no_budget_left_skips_llm(kb, mock_openai):
+    out = _run(r.akb_answer("¿Cuál es la garantía?", k=1, deadline_s=0.1))
+    assert out["fallback"] == "deadline"
+    assert mock_openai.requests == 0
+
+
+def test_breaker_opens_after_repeated_failures(kb, mock_openai, monkeypatch):
+    mock_openai.status = 500
+    monkeypatch.setattr(llm, "LLM_MAX_RETRIES", 0)
+    monkeypatch.setattr(llm.BREAKER, "threshold", 2)
+
+    reasons = [_run(r.akb_answer("¿Cuál es la garantía?", k=1))["fallback"] for _ in range(4)]
+    assert reasons == ["error", "error", "breaker", "breaker"]
+    assert mock_openai.requests == 2                    # con el breaker abierto no se llama
+
+
+def test_breaker_half_open_probe_closes_on_success():
+    now = [0.0]
+    br = llm.CircuitBreaker(failures=2, cooldown=10, clock=lambda: now[0])
+    br.record_failure(); br.record_failure()
+    assert br.state == "open" and not br.allow()
+
+    now[0] = 11.0
+    assert br.state == "half-open"
+    assert br.allow()                                   # una sola prueba
+    assert not br.allow()
+    br.record_success()
+    assert br.state == "closed" and br.allow()
+
+
+def test_breaker_half_open_probe_failure_reopens():
+    now = [0.0]
+    br = llm.CircuitBreaker(failures=1, cooldown=5, clock=lambda: now[0])
+    br.record_failure()
+    now[0] = 6.0
+    assert br.allow()
+    br.record_failure()
+    assert br.state == "open"
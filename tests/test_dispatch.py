@@ -0,0 +1,42 @@
+# tests/test_dispatch.py
+import pytest
+
+from app.nlp.dispatch import IntentTable
+from app.nlp.intent import INTENTS, _detect_intent
+
+
+def test_priority_and_slots_in_one_match():
+    table = IntentTable()
+    table.add("cotiza", r"cotiza\s+(?P<car>\d+)", optional=[r"a\s*(?P<term>\d{2})\s*meses"])
+    table.add("finance", r"mensualidad", optional=[r"(?P<price>\$\d+)"])
+    table.add("greet", r"hola", anchored=True)
+
+    m = table.scan("hola, cotiza 3 a 48 meses en mensualidades")   # greet no está al inicio → no aplica
+    assert (m.name, m.slots) == ("cotiza", {"car": "3", "term": "48"})
+    assert table.scan("$300 en mensualidades").slots == {"price": "$300"}   # slot antes del disparador
+    assert table.scan("hola").name == "greet"
+    assert table.scan("nada") is None
+
+
+def test_dispatch_calls_registered_handler():
+    table = IntentTable()
+    table.add("ver", r"\bver\s+(?P<n>\d+)")
+    table.handler("ver")(lambda ctx, m: (ctx, int(m.get("n"))))
+    table.default(lambda ctx, m: "menu")
+    assert table.dispatch("ver 3 mas", "s") == ("s", 3)
+    assert table.dispatch("otra cosa", "s") == "menu"
+
+
+@pytest.mark.parametrize("text, name", [
+    ("Hola", "greet"), ("menú", "greet"), ("sí", "yes"), ("no gracias", "help"),
+    ("contacto Ana ana@mail.com", "contact"), ("cotiza 2 con 50k a 48 meses", "cotiza"),
+    ("detalles 3", "detalles"), ("ver más 2", "paginate"), ("¿qué puedes hacer?", "help"),
+    ("mensualidades de $350,000 con 50k", "finance"), ("¿Cuál es la garantía?", "kb"),
+    ("busco un versa 2020", "search"), ("asdf", "help"),
+])
+def test_route_table(text, name):
+    assert _detect_intent(text) == name
+
+
+def test_every_intent_has_a_handler():
+    assert set(INTENTS.names()) <= set(INTENTS._handlers)
@@ -0,0 +1,62 @@
+# tests/test_embeddings.py
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("sentence_transformers")
+
+from app.nlp import embeddings as emb
+
+QUERIES = [
+    "¿Cuál es la garantía?",
+    "¿Cómo funciona la devolución de 7 días?",
+    "Quiero financiar un auto de 300,000 con 50,000 de enganche",
+    "¿Cómo es la entrega?",
+]
+
+
+@pytest.fixture(scope="module")
+def torch_backend():
+    try:
+        return emb.TorchBackend(emb.EMBED_MODEL)
+    except Exception as e:  # sin red / sin modelo en caché
+        pytest.skip(f"modelo {emb.EMBED_MODEL} no disponible: {e}")
+
+
+@pytest.fixture(scope="module")
+def onnx_dir(tmp_path_factory, torch_backend):
+    out = tmp_path_factory.mktemp("onnx")
+    return emb.export_onnx(emb.EMBED_MODEL, str(out), quantize=True)
+
+
+@pytest.mark.parametrize("quantized", [False, True])
+def test_onnx_parity_with_torch(torch_backend, onnx_dir, quantized):
+    ref = torch_backend.encode(QUERIES)
+    vecs = emb.OnnxBackend(onnx_dir, quantized=quantized).encode(QUERIES)
+
+    assert vecs.shape == ref.shape and vecs.dtype == np.float32
+    # Vectores normalizados → el producto punto es el coseno
+    cos = np.sum(ref * vecs, axis=1)
+    assert cos.min() >= 0.99, cos
+
+
+def test_torch_int8_parity_with_torch(torch_backend):
+    ref = torch_backend.encode(QUERIES)
+    vecs = emb.TorchBackend(emb.EMBED_MODEL, quantize=True).encode(QUERIES)
+
+    assert vecs.shape == ref.shape and vecs.dtype == np.float32
+    cos = np.sum(ref * vecs, axis=1)
+    assert cos.min() >= 0.99, cos
+
+
+def test_backends_must_implement_encode():
+    class Empty(emb.EmbeddingBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        Empty()
+
+
+def test_make_backend_rejects_unknown_kind():
+    with pytest.raises(ValueError):
+        emb.make_backend("gpu-magic")
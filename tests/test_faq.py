@@ -0,0 +1,57 @@
+# tests/test_faq.py
+import numpy as np
+import pytest
+
+import app.nlp.retriever as r
+from app.nlp.faq import FaqTable, precompute_faq
+
+META = [
+    {"id": 0, "text": "La política de devolución es de 7 días naturales."},
+    {"id": 1, "text": "La garantía de Kavak cubre 3 meses o 3,000 km."},
+    {"id": 2, "text": "Puedes agendar una prueba de manejo en cualquier sucursal."},
+]
+VECS = np.eye(3, dtype="float32")
+
+
+def _answer(q):
+    if "manejo" in q:
+        return {"answer": "Lo siento, no puedo responder.", "sources": [], "fallback": "error"}
+    return {"answer": f"R: {q}", "sources": [META[1]]}
+
+
+@pytest.fixture
+def faq_dir(tmp_path, fake_kb, monkeypatch):
+    res = precompute_faq(["¿Qué cubre la garantía?", "¿Puedo hacer prueba de manejo?"],
+                         str(tmp_path), "v1", _answer, lambda qs: VECS[[1, 2]][:len(qs)])
+    assert res == {"stored": 1, "skipped": ["¿Puedo hacer prueba de manejo?"]}
+
+    fake_kb(VECS, META, "v1")
+    monkeypatch.setattr(r, "INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(r, "_FAQ", FaqTable(threshold=0.9))
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    return tmp_path
+
+
+def test_exact_question_served_without_embedding(faq_dir, monkeypatch):
+    def boom(texts):
+        raise AssertionError("no debería calcular embedding")
+    monkeypatch.setattr(r, "_embed", boom)
+
+    out = r.kb_answer("que cubre la GARANTIA")
+    assert out["answer"] == "R: ¿Qué cubre la garantía?"
+    assert out["sources"] == [META[1]]
+    assert r.faq_metrics()["hits"] == 1
+
+
+def test_paraphrase_served_by_nearest_neighbour(faq_dir, monkeypatch):
+    monkeypatch.setattr(r, "_embed", lambda texts: np.array([[0.05, 0.99, 0.0]], dtype="float32"))
+    out = r.kb_answer("¿hasta cuántos km me cubren?")
+    assert out.get("faq") == "¿Qué cubre la garantía?"
+
+
+def test_table_from_older_index_version_is_not_served(faq_dir, monkeypatch):
+    monkeypatch.setattr(r, "_index_version", lambda: "v2")
+    monkeypatch.setattr(r, "_embed", lambda texts: VECS[1:2])
+    out = r.kb_answer("¿Qué cubre la garantía?")
+    assert "faq" not in out
+    assert r.faq_metrics()["hits"] == 0
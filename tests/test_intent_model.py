@@ -0,0 +1,96 @@
+# tests/test_intent_model.py
+import json
+import zlib
+import asyncio
+import threading
+
+import numpy as np
+
+import app.nlp.intent as intent
+from app.nlp.intent_model import IntentClassifier, build_classifier, load_phrases
+
+ROWS = [
+    ("me pueden llamar", "contact"), ("quiero hablar con un asesor", "contact"),
+    ("tienen garantia", "kb"), ("cuanto dura la garantia", "kb"),
+    ("quiero pagar a plazos", "finance"), ("cuanto pagaria al mes", "finance"),
+]
+
+
+def _encode(texts):
+    """Bolsa de palabras con hash: determinista y sin modelo."""
+    out = np.zeros((len(texts), 64), dtype="float32")
+    for i, t in enumerate(texts):
+        for w in t.split():
+            out[i, zlib.crc32(w.encode()) % 64] += 1.0
+    return out / np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None)
+
+
+def test_nearest_centroid_with_confidence_gate_and_cache():
+    calls = []
+    clf = IntentClassifier.train(ROWS, _encode, min_conf=0.4, min_margin=0.05)
+    clf.encode = lambda texts: calls.append(texts) or _encode(texts)
+    assert clf.classify("¿Me pueden llamar mañana?") == "contact"
+    assert clf.classify("la garantia") == "kb"
+    assert clf.classify("xyz") is None                         # sin similitud: decide la regex
+    clf.predict("¿ME PUEDEN  llamar manana?")
+    assert len(calls) == 3                                     # misma forma normalizada → caché
+
+
+def test_build_reuses_saved_centroids_until_phrases_change(tmp_path):
+    phrases, model = tmp_path / "phrases.jsonl", tmp_path / "model.json"
+    phrases.write_text("\n".join(json.dumps({"text": t, "intent": y}) for t, y in ROWS), encoding="utf-8")
+    first = build_classifier(str(phrases), str(model), encode=_encode)
+    assert model.exists() and first.labels == ["contact", "finance", "kb"]
+    saved = json.loads(model.read_text(encoding="utf-8"))
+    assert build_classifier(str(phrases), str(model), encode=_encode).labels == saved["labels"]
+
+    with phrases.open("a", encoding="utf-8") as f:
+        f.write("\n" + json.dumps({"text": "hola", "intent": "greet"}))
+    assert "greet" in build_classifier(str(phrases), str(model), encode=_encode).labels
+    assert len(load_phrases(str(phrases))) == 7
+
+
+def test_classifier_only_overrides_loose_rules(monkeypatch):
+    monkeypatch.setattr(intent, "USE_LLM_INTENT", True)
+    monkeypatch.setattr(intent, "classify_intent", lambda text: "finance")
+    assert intent._detect_intent("me lo dejan en pagos chiquitos") == "finance"
+    assert intent._detect_intent("cotiza 1 con 50k") == "cotiza"          # comando con slots: regex
+    m = intent._scan(intent.ParsedMessage("mensualidades de 350000 con 50k"))
+    assert m.name == "finance" and m.get("down") == "50k"
+
+    monkeypatch.setattr(intent, "classify_intent", lambda text: None)     # poca confianza
+    assert intent._detect_intent("cual es la politica de garantia") == "kb"
+
+    monkeypatch.setattr(intent, "USE_LLM_INTENT", False)
+    monkeypatch.setattr(intent, "classify_intent", lambda text: "contact")
+    assert intent._detect_intent("me lo dejan en pagos chiquitos") == "help"
+
+
+def test_route_message_classifies_off_the_loop_before_the_lock(monkeypatch):
+    seen = []
+
+    def classify(text):
+        seen.append((threading.get_ident(), intent.SESSIONS.peek("whatsapp", "u1")))
+        return "kb"
+
+    async def kb(q):
+        return "kb: " + q
+
+    monkeypatch.setattr(intent, "USE_LLM_INTENT", True)
+    monkeypatch.setattr(intent, "classify_intent", classify)
+    monkeypatch.setattr(intent, "akb_tool", kb)
+    reply = asyncio.get_event_loop().run_until_complete(
+        intent.route_message("whatsapp", "y si el auto sale malo", user_id="u1"))
+    assert reply == "kb: y si el auto sale malo"
+    assert seen == [(seen[0][0], None)] and seen[0][0] != threading.get_ident()
+
+
+def test_lifespan_builds_the_classifier(monkeypatch):
+    from fastapi.testclient import TestClient
+    import app.main as main
+
+    built = []
+    monkeypatch.setattr(main, "USE_LLM_INTENT", True)
+    monkeypatch.setattr(main, "get_classifier", lambda: built.append(threading.get_ident()))
+    with TestClient(main.app):
+        assert len(built) == 1
@@ -0,0 +1,81 @@
+# tests/test_lexical.py
+import os
+
+import numpy as np
+import pytest
+
+import app.nlp.retriever as r
+from app.nlp.index_store import current_dir
+from app.nlp.lexical import LEXICAL_FILE, BM25Index, is_decisive, rrf_fuse, tokenize
+from scripts.build_faiss import build_index
+
+FILLER = [f"Sección {i}: información general del proceso de compra número {i}." for i in range(30)]
+META = [{"id": i, "text": t} for i, t in enumerate(FILLER + [
+    "La política de devolución es de 7 días naturales.",
+    "La garantía de Kavak cubre 3 meses o 3,000 km.",
+])]
+
+
+def test_tokenize_strips_accents_and_stopwords():
+    assert tokenize("¿Cuál es la Política de Devolución?") == ["politica", "devolucion"]
+
+
+def test_bm25_ranks_and_reports_coverage():
+    lex = BM25Index.build([m["text"] for m in META])
+    ids, scores, coverage = lex.search("política de devolución", k=3)
+    assert ids[0] == 30 and coverage[0] == 1.0
+    assert is_decisive(scores, coverage)
+    # "compra" aparece en todos los chunks de relleno: nada decisivo
+    ids, scores, coverage = lex.search("compra", k=3)
+    assert not is_decisive(scores, coverage)
+
+
+def test_bm25_json_roundtrip():
+    lex = BM25Index.build([m["text"] for m in META])
+    again = BM25Index.from_json(lex.to_json())
+    assert lex.search("garantía km", 2)[:2] == again.search("garantía km", 2)[:2]
+
+
+def test_rrf_fuse_rewards_agreement():
+    assert rrf_fuse([[1, 2, 3], [3, 4]], k=3) == [3, 1, 2]
+
+
+@pytest.fixture
+def kb(fake_kb, monkeypatch):
+    v = np.eye(len(META), dtype="float32")
+    fake_kb(v, META)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    return v
+
+
+def test_decisive_keyword_query_skips_embedding(kb, monkeypatch):
+    def boom(texts):
+        raise AssertionError("no debería calcular embedding")
+    monkeypatch.setattr(r, "_embed", boom)
+    before = r.retrieval_metrics()["fast_path"]
+
+    out = r.kb_answer("política de devolución 7 días", k=2)
+    assert out["sources"][0] is META[30]
+    assert r.retrieval_metrics()["fast_path"] == before + 1
+
+
+def test_ambiguous_query_fuses_lexical_and_vector(kb, monkeypatch):
+    monkeypatch.setattr(r, "_embed", lambda texts: kb[31:32])       # vector → garantía
+    monkeypatch.setattr(r, "load_min_score", lambda *_: 0.5)
+    out = r.kb_answer("devolución o garantía", k=2)
+    assert {m["id"] for m in out["sources"]} == {30, 31}
+
+
+def test_build_writes_bm25_file(tmp_path, monkeypatch):
+    texts = [m["text"] for m in META]
+    vecs = np.eye(len(texts), dtype="float32")
+    lookup = dict(zip(texts, vecs))
+    build_index(texts, str(tmp_path), encode=lambda ts: np.stack([lookup[t] for t in ts]), key="t")
+    assert os.path.exists(os.path.join(current_dir(str(tmp_path)), LEXICAL_FILE))
+
+    monkeypatch.setattr(r, "INDEX_DIR", str(tmp_path))
+    monkeypatch.setitem(r._INDEX_STATE, "version", None)
+    _, meta = r._load_index()
+    lex = r._lexical_index(meta)
+    assert lex.n_docs == len(texts)
+    assert lex.search("garantía", 1)[0] == [31]
@@ -0,0 +1,66 @@
+# tests/test_lexicon.py
+import asyncio
+import os
+
+import app.nlp.intent as intent
+import app.nlp.tools as tools
+from app.nlp.lexicon import Lexicon
+
+HEADER = "id,brand,model,version,year,km,price,location\n"
+
+
+def _say(text):
+    return asyncio.get_event_loop().run_until_complete(intent.route_message("whatsapp", text, user_id="u1"))
+
+
+def test_spots_catalog_entities_and_aliases():
+    lex = Lexicon.build(["nissan", "mazda"], {"versa": {"nissan"}, "mazda 3": {"mazda"}, "x-trail": {"nissan"}},
+                        ["advance"])
+    found = [(m.kind, m.value) for m in lex.spot("busco un nizzan versa advance o una x trail")]
+    assert found == [("brand", "nissan"), ("model", "versa"), ("version", "advance"), ("model", "x-trail")]
+    assert [m.value for m in lex.spot("mazda 3 2020")] == ["mazda 3"]       # la frase más larga gana
+    assert lex.spot("conversar") == []                                       # solo palabra completa
+    assert lex.brand_of("versa") == "nissan"
+
+
+def test_lexicon_follows_catalog_reload(tmp_path, monkeypatch):
+    path = tmp_path / "catalog.csv"
+    path.write_text(HEADER + "1,Nissan,Versa,Sense,2020,1000,250000,Online\n", encoding="utf-8")
+    monkeypatch.setattr(tools, "CATALOG_PATH", str(path))
+    assert not [m for m in tools.catalog_lexicon().spot("un byd dolphin") if m.kind == "model"]
+
+    path.write_text(HEADER + "2,BYD,Dolphin,Mini,2024,10,450000,Online\n", encoding="utf-8")
+    os.utime(path, ns=(1, 1))
+    assert [(m.kind, m.value) for m in tools.catalog_lexicon().spot("un byd dolphin")] == \
+        [("brand", "byd"), ("model", "dolphin")]
+
+
+
+def test_short_versions_do_not_turn_chatter_into_a_search(tmp_path, monkeypatch):
+    path = tmp_path / "catalog.csv"
+    path.write_text(HEADER + "1,Hyundai,Elantra,SE,2020,10,250000,CDMX\n"
+                    "2,Toyota,Corolla,LE,2021,10,300000,CDMX\n3,Nissan,Versa,Sense,2020,10,260000,CDMX\n",
+                    encoding="utf-8")
+    monkeypatch.setattr(tools, "CATALOG_PATH", str(path))
+    lex = tools.catalog_lexicon()
+    assert lex.spot("se puede apartar un auto") == []
+    assert lex.spot("quiero un auto que le quepan 7 personas") == []
+    assert lex.spot("un sense por favor") == []                       # versión sin marca ni modelo
+    assert [(m.kind, m.value) for m in lex.spot("un elantra se 2020")] == [("model", "elantra"), ("version", "se")]
+    assert [m.kind for m in lex.spot("un elantra que se vea bien")] == ["model"]
+
+    assert intent._detect_intent("se puede apartar un auto?") == "help"
+    assert _say("se puede apartar un auto?") == intent.WELCOME_MSG
+    df = tools._filtered_df_for_search({"raw_text": "quiero un auto que le quepan 7 personas"})
+    assert sorted(df["id"].tolist()) == [1, 2, 3]
+
+
+def test_known_brand_missing_from_catalog_finds_nothing(tmp_path, monkeypatch):
+    path = tmp_path / "catalog.csv"
+    path.write_text(HEADER + "1,Nissan,March,Sense,2020,10,200000,CDMX\n2,Nissan,Versa,Sense,2021,10,260000,CDMX\n",
+                    encoding="utf-8")
+    monkeypatch.setattr(tools, "CATALOG_PATH", str(path))
+    out = _say("busco un ford")
+    assert "Ford   |   0 resultados" in out and "No encontré autos" in out and "Nissan" not in out
+    assert tools._filtered_df_for_search({"brand": "ford", "raw_text": "un ford march"}).empty
+    assert len(tools._filtered_df_for_search({"brand": "nissan", "raw_text": "un nissan march"})) == 1
@@ -0,0 +1,113 @@
+# tests/test_llm.py
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+import app.nlp.retriever as r
+from app.nlp import llm
+
+MSGS = [{"role": "user", "content": "Pregunta del usuario: ¿garantía?"}]
+
+
+def _run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def test_achat_against_mock_server(mock_openai):
+    out = _run(llm.achat(MSGS, model="mock"))
+    assert out == "Respuesta simulada: ¿garantía?"
+
+
+def test_concurrent_calls_do_not_block_event_loop(mock_openai, monkeypatch):
+    mock_openai.delay = 0.3
+    monkeypatch.setattr(llm, "LLM_MAX_CONCURRENCY", 10)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.02)
+
+    async def run():
+        t0 = time.perf_counter()
+        await asyncio.gather(ticker(), *(llm.achat(MSGS, model="mock") for _ in range(10)))
+        return time.perf_counter() - t0
+
+    elapsed = _run(run())
+    assert mock_openai.requests == 10
+    assert elapsed < 1.5             # 10 × 0.3 s en serie serían 3 s
+    assert len(ticks) == 5           # el loop siguió atendiendo otras tareas
+
+
+def test_concurrency_limit_is_respected(mock_openai, monkeypatch):
+    mock_openai.delay = 0.1
+    monkeypatch.setattr(llm, "LLM_MAX_CONCURRENCY", 2)
+
+    async def run():
+        await asyncio.gather(*(llm.achat(MSGS, model="mock") for _ in range(6)))
+
+    _run(run())
+    assert mock_openai.max_in_flight <= 2
+
+
+def test_per_call_timeout(mock_openai, monkeypatch):
+    mock_openai.delay = 1.0
+    monkeypatch.setattr(llm, "LLM_MAX_RETRIES", 0)
+    with pytest.raises(Exception):
+        _run(llm.achat(MSGS, model="mock", timeout=0.2))
+
+
+def test_akb_answer_uses_async_client(mock_openai, fake_kb):
+    v = np.eye(4, dtype="float32")
+    meta = [{"id": 0, "text": "Garantía de 3 meses"}, {"id": 1, "text": "Devolución 7 días"}]
+    fake_kb(v[:2], meta, embed=lambda texts: v[:1])
+
+    out = _run(r.akb_answer("¿Cuál es la garantía?", k=1))
+    assert out["answer"].startswith("Respuesta simulada: ¿Cuál es la garantía?")
+    assert out["sources"] == meta[:1]
+
+
+def test_timeouts_are_classified_by_exception_type(monkeypatch):
+    import httpx
+    import openai
+    monkeypatch.setattr(llm, "_STATS", dict(llm._STATS, errors=0, timeouts=0))
+    llm._record_error(RuntimeError("upstream said: request timed out"))      # solo el texto: no cuenta
+    llm._record_error(openai.APITimeoutError(request=httpx.Request("POST", "http://mock")))
+    llm._record_error(httpx.ReadTimeout("lento"))
+    assert (llm._STATS["errors"], llm._STATS["timeouts"]) == (3, 2)
+
+
+def test_stats_are_consistent_across_threads(monkeypatch):
+    import threading
+    monkeypatch.setattr(llm, "_STATS", dict(llm._STATS, calls=0, in_flight=0, max_in_flight=0))
+
+    def work():
+        for _ in range(2000):
+            llm._record_start()
+            llm._record_end()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert llm.metrics()["calls"] == 16_000 and llm.metrics()["in_flight"] == 0
+
+
+def test_clients_are_closed_when_the_config_changes(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-uno")
+    old = llm.get_client()
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-dos")
+    assert llm.get_client() is not old and old.is_closed()
+
+    async def run():
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-uno")
+        first = llm.get_async_client()
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-dos")
+        assert llm.get_async_client() is not first
+        await asyncio.gather(*llm._CLOSING)
+        return first
+
+    assert _run(run()).is_closed()
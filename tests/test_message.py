@@ -0,0 +1,36 @@
+# tests/test_message.py
+import asyncio
+
+import app.nlp.intent as intent
+from app.nlp.message import ParsedMessage, as_message
+
+
+def test_parsed_fields():
+    m = ParsedMessage("Busco un Nissan Versa 2020 entre 250 mil y $300,000")
+    assert m.norm.startswith("busco un nissan versa 2020")
+    assert "nissan" in m.tokens and "versa" in m.tokens
+    assert m.years == (2020,)
+    assert m.has_range and (m.price_min, m.price_max) == (250_000.0, 300_000.0)
+
+    b = ParsedMessage("jetta hasta 280k")
+    assert not b.has_range and b.has_bound and (b.price_min, b.price_max) == (None, 280_000.0)
+    assert as_message(b) is b
+
+
+def test_route_message_normalizes_once(monkeypatch):
+    calls = []
+    real = intent.ParsedMessage
+
+    def counting(text):
+        calls.append(text)
+        return real(text)
+    monkeypatch.setattr(intent, "ParsedMessage", counting)
+
+    seen = []
+    monkeypatch.setattr(intent, "snapshot_search", lambda f, msg=None: (seen.append(msg) or ([], "v")))
+    monkeypatch.setattr(intent, "catalog_version", lambda: "v")
+    monkeypatch.setattr(intent, "cars_by_ids", lambda ids: [])
+    monkeypatch.setattr(intent, "render_results", lambda f, cars, total, offset: "ok")
+    asyncio.get_event_loop().run_until_complete(
+        intent.route_message("whatsapp", "quiero un kia rio 2019", user_id="u"))
+    assert len(calls) == 1 and seen and seen[0].raw == "quiero un kia rio 2019"
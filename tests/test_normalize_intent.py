@@ -70,3 +70,10 @@ def test_case_insensitive_and_spacing():
     # Debe detectar 'carroceria' y 'precio' sin importar mayúsculas ni espacios
     assert "carroceria" in result and _is_true_or_token(result["carroceria"])
     assert "precio" in result and _is_true_or_token(result["precio"])
+
+def test_all_groups_in_one_scan_with_phrases_and_accents():
+    result = normalize_intent("Un sedán último modelo con poco uso, buen kilometraje y a crédito")
+    assert result == {"carroceria": "sedan", "anio": "ultimo modelo", "km": "con poco uso",
+                      "forma_pago": "credito"}
+    assert normalize_intent("bajo kilometraje")["km"] == "kilometraje"
+    assert normalize_intent("modelos seminuevos") == {"anio": "modelos"}   # palabra completa
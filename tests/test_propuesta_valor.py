@@ -29,19 +29,14 @@ def test_propuesta_valor_shortcut_returns_constant(user_query, monkeypatch):
     def _fail_embed(*args, **kwargs):
         raise AssertionError("_embed NO debe ser llamado para el atajo de propuesta de valor")
 
-    class _FailOpenAI:
-        def __init__(self, *a, **k):
-            pass
-        class chat:
-            class completions:
-                @staticmethod
-                def create(*a, **k):
-                    raise AssertionError("OpenAI.chat.completions.create NO debe ser llamado para el atajo de propuesta de valor")
+    def _fail_llm(*args, **kwargs):
+        raise AssertionError("El LLM (llm.chat / llm.achat) NO debe ser llamado para el atajo de propuesta de valor")
 
     # Parcheamos funciones/cliente que NO deben ser llamados
     monkeypatch.setattr(r, "_load_index", _fail_index, raising=True)
     monkeypatch.setattr(r, "_embed", _fail_embed, raising=True)
-    monkeypatch.setattr(r, "OpenAI", _FailOpenAI, raising=True)
+    monkeypatch.setattr(r.llm, "chat", _fail_llm, raising=True)
+    monkeypatch.setattr(r.llm, "achat", _fail_llm, raising=True)
 
     monkeypatch.setenv("OPENAI_API_KEY", "dummy")
 
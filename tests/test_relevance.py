@@ -0,0 +1,54 @@
+# tests/test_relevance.py
+import json
+
+import numpy as np
+import pytest
+
+import app.nlp.retriever as r
+from app.nlp import relevance
+from app.nlp.relevance import calibrate_min_score, load_min_score
+
+
+def test_calibration_keeps_recall_and_rejects_offtopic():
+    res = calibrate_min_score([0.62, 0.55, 0.71, 0.48], [0.12, 0.30, 0.21], min_recall=0.75)
+    assert res["min_score"] == pytest.approx(0.55)
+    assert res["recall"] == 0.75
+    assert res["offtopic_rejected"] == 1.0
+
+
+def test_calibration_needs_relevant_queries():
+    with pytest.raises(ValueError):
+        calibrate_min_score([], [0.1])
+
+
+def test_min_score_read_from_threshold_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(relevance, "KB_MIN_SCORE_ENV", "")
+    assert load_min_score(str(tmp_path)) == 0.0
+    (tmp_path / relevance.THRESHOLD_FILE).write_text(json.dumps({"min_score": 0.42}))
+    assert load_min_score(str(tmp_path)) == 0.42
+
+
+def test_stale_threshold_file_is_ignored(tmp_path, monkeypatch):
+    monkeypatch.setattr(relevance, "KB_MIN_SCORE_ENV", "")
+    relevance.save_calibration(str(tmp_path), {"min_score": 0.42},
+                               {"index_version": "v1", "model": "torch:mini"})
+    assert load_min_score(str(tmp_path), "v1", "torch:mini") == 0.42
+    assert load_min_score(str(tmp_path), "v2", "torch:mini") == 0.0        # KB reconstruida
+    assert load_min_score(str(tmp_path), "v1", "onnx-int8:mini") == 0.0    # otro encoder
+
+
+def test_offtopic_question_skips_llm(fake_kb, monkeypatch):
+    v = np.eye(4, dtype="float32")
+    meta = [{"id": 0, "text": "Garantía de 3 meses"}, {"id": 1, "text": "Devolución 7 días"}]
+
+    def _no_llm(*a, **k):
+        raise AssertionError("No debe llamarse al LLM para preguntas fuera de tema")
+
+    fake_kb(v[:2], meta, embed=lambda texts: v[3:4])    # ortogonal a todo → score 0
+    monkeypatch.setattr(r, "load_min_score", lambda *_: 0.3)
+    monkeypatch.setattr(r.llm, "chat", _no_llm)
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+
+    out = r.kb_answer("¿Dónde están las sucursales de Ford?")
+    assert out["sources"] == []
+    assert "agente de Kavak" in out["answer"]
@@ -0,0 +1,68 @@
+# tests/test_retrieval_cache.py
+import numpy as np
+import pytest
+
+import app.nlp.retriever as r
+from app.nlp.cache import RetrievalCache
+
+TEXTS = ["La garantía es de 3 meses", "Devolución en 7 días", "Entrega a domicilio"]
+
+
+def test_lru_eviction_and_hit_rate():
+    c = RetrievalCache(maxsize=2)
+    v = np.zeros(3, dtype="float32")
+    c.put("a", "v1", v, [0], [0.9])
+    c.put("b", "v1", v, [1], [0.8])
+    assert c.get("a", "v1").ids == [0]      # "a" pasa a ser el más reciente
+    c.put("c", "v1", v, [2], [0.7])        # expulsa "b"
+    assert c.get("b", "v1") is None
+    assert c.get("c", "v1").ids == [2]
+    s = c.stats()
+    assert s["size"] == 2 and s["hits"] == 2 and s["misses"] == 1
+    assert s["hit_rate"] == pytest.approx(2 / 3, abs=1e-3)
+
+
+def test_rebuilt_index_invalidates_entry():
+    c = RetrievalCache()
+    c.put("garantia", "v1", np.zeros(3, dtype="float32"), [0, 1], [0.9, 0.8])
+    assert c.get("garantia", "v2") is None
+    assert len(c) == 0 and c.stats()["invalidations"] == 1
+
+
+def test_put_requires_scores_for_every_id():
+    c, v = RetrievalCache(), np.zeros(3, dtype="float32")
+    with pytest.raises(TypeError):
+        c.put("a", "v1", v, [0, 1])             # sin scores el umbral no podría reaplicarse
+    with pytest.raises(ValueError):
+        c.put("a", "v1", v, [0, 1], [0.9])
+
+
+@pytest.fixture
+def embed_calls(fake_kb, monkeypatch):
+    rng = np.random.default_rng(0)
+    vecs = rng.normal(size=(len(TEXTS), 8)).astype("float32")
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    calls = []
+
+    def fake_embed(texts):
+        calls.append(list(texts))
+        return vecs[:1].copy()
+
+    fake_kb(vecs, [{"id": i, "text": t} for i, t in enumerate(TEXTS)], "v1", fake_embed)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    r._RCACHE.clear()
+    yield calls
+    r._RCACHE.clear()
+
+
+def test_repeated_question_skips_embedding_and_search(embed_calls, monkeypatch):
+    a1 = r.kb_answer("¿Garantía?", k=2)
+    a2 = r.kb_answer("  garantia ", k=2)
+    assert len(embed_calls) == 1
+    assert a1["sources"] == a2["sources"]
+    assert r._RCACHE.stats()["hits"] == 1
+
+    # Índice reconstruido → nueva versión → se vuelve a embeber
+    monkeypatch.setattr(r, "_index_version", lambda: "v2")
+    r.kb_answer("garantía", k=2)
+    assert len(embed_calls) == 2
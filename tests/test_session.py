@@ -0,0 +1,100 @@
+# tests/test_session.py
+import asyncio
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import app.nlp.intent as intent
+from app.nlp.session import SessionStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def test_idle_sessions_expire():
+    clock = FakeClock()
+    store = SessionStore(ttl=60, clock=clock)
+    store.get("whatsapp", "a").filters = {"brand": "nissan"}
+    clock.t = 30
+    store.get("whatsapp", "b")
+    clock.t = 70                      # "a" lleva 70 s inactiva, "b" 40 s
+    assert store.get("whatsapp", "a").filters == {}
+    assert store.peek("whatsapp", "b") is not None
+    assert store.stats()["expired"] == 1
+
+
+def test_lru_and_memory_cap():
+    store = SessionStore(maxsize=2)
+    store.get("w", "a"); store.get("w", "b")
+    store.get("w", "a")               # "a" pasa a ser la más reciente
+    store.get("w", "c")
+    assert store.peek("w", "b") is None and store.peek("w", "a") is not None
+
+    small = SessionStore(max_bytes=2_000)
+    with small.locked("w", "a") as s:
+        s.page = {i: str(i) for i in range(10)}
+    with small.locked("w", "b") as s:
+        s.page = {i: str(i) for i in range(20)}
+    assert small.peek("w", "a") is None          # se expulsó la más vieja para caber
+    assert small.stats()["bytes"] <= 2_000
+
+
+# ---------------- Conversaciones intercaladas ----------------
+BRANDS = ["nissan", "toyota", "ford", "kia", "honda", "mazda"]
+CARS = {b: [{"id": 1000 * (i + 1) + j, "brand": b} for j in range(12)] for i, b in enumerate(BRANDS)}
+
+
+@pytest.fixture
+def fake_catalog(monkeypatch):
+    by_id = {c["id"]: c for cars in CARS.values() for c in cars}
+    monkeypatch.setattr(intent, "snapshot_search",
+                        lambda f, msg=None: (array("I", [c["id"] for c in CARS[f["brand"]]]), "v1"))
+    monkeypatch.setattr(intent, "cars_by_ids", lambda ids: [by_id[int(i)] for i in ids])
+    monkeypatch.setattr(intent, "catalog_version", lambda: "v1")
+    monkeypatch.setattr(intent, "render_results",
+                        lambda f, cars, total, offset: f"{cars[0]['brand']} {offset}+{len(cars)}")
+    monkeypatch.setattr(intent, "cotiza_car", lambda car_id, **kw: f"Cotización #{car_id}")
+
+
+def _conversation(brand: str):
+    # (mensaje, texto esperado en la respuesta)
+    first = CARS[brand][0]["id"]
+    return [
+        (f"quiero un {brand}", f"{brand} 0+5"),
+        ("ver 3 más", f"{brand} 5+3"),
+        ("cotiza 7 con 50k", f"Cotización #{first + 6}"),
+        ("si", "Requisitos"),
+        ("cotiza 1 con 40k", f"Cotización #{first}"),
+    ]
+
+
+def test_interleaved_conversations_keep_separate_state(fake_catalog):
+    users = [(f"whatsapp:+52155{i:05d}", BRANDS[i % len(BRANDS)]) for i in range(24)]
+    failures = []
+
+    def converse(user, brand):
+        for msg, want in _conversation(brand):
+            reply = asyncio.run(intent.route_message("whatsapp", msg, user_id=user))
+            if want not in reply:
+                failures.append((user, msg, want, reply))
+
+    # Un hilo por usuario: los mensajes de distintos usuarios se intercalan según el scheduler
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        list(ex.map(lambda ub: converse(*ub), users))
+
+    assert not failures, failures[:3]
+    assert len(intent.SESSIONS) == len(users)
+
+
+def test_same_channel_different_users_do_not_share_pages(fake_catalog):
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(intent.route_message("whatsapp", "quiero un nissan", user_id="a"))
+    loop.run_until_complete(intent.route_message("whatsapp", "quiero un kia", user_id="b"))
+    out = loop.run_until_complete(intent.route_message("whatsapp", "cotiza 1 con 50k", user_id="a"))
+    assert f"#{CARS['nissan'][0]['id']}" in out
@@ -0,0 +1,146 @@
+# tests/test_session_backends.py
+import asyncio
+import time
+import threading
+from array import array
+
+import pytest
+
+import app.nlp.intent as intent
+import app.nlp.session_backends as sb
+from app.nlp.session import Session
+from app.nlp.session_backends import (
+    RedisSessionStore, SQLiteSessionStore, dumps_session, loads_session, make_session_store,
+)
+from scripts.mock_redis import start_mock_redis
+
+CARS = [{"id": 500 + i, "brand": "nissan"} for i in range(12)]
+
+
+def _session() -> Session:
+    s = Session()
+    s.filters = {"brand": "nissan", "price_max": 300_000.0, "raw_text": ""}
+    s.offset, s.limit = 5, 3
+    s.page = {1: "500", 2: "501", 8: "507"}
+    s.ctx = {"kind": "quote", "car_id": "507", "down_payment": 50_000, "term": 36}
+    s.snapshot, s.catalog_version = array("I", [500, 501, 4_000_000_000]), "abc123"
+    return s
+
+
+@pytest.mark.parametrize("packer", ["msgpack", "json"])
+def test_serialization_roundtrip(packer, monkeypatch):
+    if packer == "json":
+        monkeypatch.setattr(sb, "msgpack", None)
+    blob = dumps_session(_session())
+    back = loads_session(blob)
+    assert (back.filters, back.offset, back.limit, back.page, back.ctx) == \
+           (_session().filters, 5, 3, {1: "500", 2: "501", 8: "507"}, _session().ctx)
+    assert list(back.snapshot) == [500, 501, 4_000_000_000] and back.catalog_version == "abc123"
+    assert loads_session(b"\x00basura").page == {}
+
+
+@pytest.fixture
+def redis_url():
+    server, url = start_mock_redis()
+    yield server, url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def two_workers(request, tmp_path, redis_url):
+    """Dos stores independientes sobre el mismo backend, como dos workers de uvicorn."""
+    if request.param == "sqlite":
+        path = str(tmp_path / "sessions.db")
+        return SQLiteSessionStore(path), SQLiteSessionStore(path)
+    _, url = redis_url
+    return RedisSessionStore(url), RedisSessionStore(url)
+
+
+@pytest.fixture
+def fake_catalog(monkeypatch):
+    by_id = {c["id"]: c for c in CARS}
+    monkeypatch.setattr(intent, "snapshot_search", lambda f, msg=None: (array("I", [c["id"] for c in CARS]), "v1"))
+    monkeypatch.setattr(intent, "cars_by_ids", lambda ids: [by_id[int(i)] for i in ids])
+    monkeypatch.setattr(intent, "catalog_version", lambda: "v1")
+    monkeypatch.setattr(intent, "render_results", lambda f, cars, total, offset: f"página {offset}+{len(cars)}")
+    monkeypatch.setattr(intent, "cotiza_car", lambda car_id, **kw: f"Cotización #{car_id}")
+
+
+def test_conversation_moves_between_workers(two_workers, fake_catalog, monkeypatch):
+    w1, w2 = two_workers
+    loop = asyncio.get_event_loop()
+
+    def say(worker, text):
+        monkeypatch.setattr(intent, "SESSIONS", worker)
+        return loop.run_until_complete(intent.route_message("whatsapp", text, user_id="+5215550001"))
+
+    assert say(w1, "quiero un nissan") == "página 0+5"
+    assert say(w2, "ver 3 más") == "página 5+3"
+    assert "Cotización #507" in say(w1, "cotiza 8 con 50k")
+    assert "Requisitos" in say(w2, "si")
+    assert len(w1) == len(w2) == 1
+
+
+def test_redis_read_only_message_is_one_command(redis_url, fake_catalog, monkeypatch):
+    server, url = redis_url
+    store = RedisSessionStore(url)
+    monkeypatch.setattr(intent, "SESSIONS", store)
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(intent.route_message("whatsapp", "quiero un nissan", user_id="u"))
+
+    before = server.commands
+    loop.run_until_complete(intent.route_message("whatsapp", "no", user_id="u"))   # no cambia la sesión
+    assert server.commands - before == 1                                            # solo GETEX
+    assert store.stats()["unchanged"] == 1
+
+
+def test_sqlite_sessions_expire(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "s.db"), ttl=0.05)
+    with store.locked("whatsapp", "u") as s:
+        s.filters = {"brand": "kia"}
+    time.sleep(0.1)
+    with store.locked("whatsapp", "u") as s:
+        assert s.filters == {}
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        make_session_store("memcached")
+
+
+def test_async_path_does_io_off_the_loop(tmp_path, fake_catalog, monkeypatch):
+    store = SQLiteSessionStore(str(tmp_path / "s.db"))
+    io_threads = []
+    for name in ("_load", "_store"):
+        real = getattr(store, name)
+        monkeypatch.setattr(store, name, lambda *a, _real=real: io_threads.append(threading.get_ident()) or _real(*a))
+    monkeypatch.setattr(intent, "SESSIONS", store)
+    asyncio.get_event_loop().run_until_complete(intent.route_message("whatsapp", "quiero un nissan", user_id="u"))
+    assert len(io_threads) == 2 and threading.get_ident() not in io_threads
+    with store.locked("whatsapp", "u") as s:
+        assert s.filters["brand"] == "nissan"
+
+
+def test_redis_counts_with_scan_batches(redis_url):
+    server, url = redis_url
+    store = RedisSessionStore(url)
+    for i in range(1203):
+        store.client.execute("SET", f"{store.prefix}sess:whatsapp:{i}", b"x")
+    store.client.execute("SET", "otra:app", b"x")
+    sent = []
+    real = store.client.execute
+    store.client.execute = lambda *args: sent.append(args[0]) or real(*args)
+    assert len(store) == 1203
+    assert "KEYS" not in sent and sent.count("SCAN") == 3
+    store.clear()
+    assert len(store) == 0 and server.data == {b"otra:app": (b"x", None)}
+
+
+def test_blob_store_requires_backend_hooks():
+    class Partial(sb.BlobSessionStore):
+        def _load(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
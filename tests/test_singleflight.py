@@ -0,0 +1,84 @@
+# tests/test_singleflight.py
+import asyncio
+
+import numpy as np
+
+import app.nlp.retriever as r
+from app.nlp.singleflight import SingleFlight
+
+
+def _run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def test_identical_requests_share_one_computation():
+    sf = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "3 meses"
+
+    async def run():
+        return await asyncio.gather(*(sf.do("garantia", compute) for _ in range(10)))
+
+    assert _run(run()) == ["3 meses"] * 10
+    assert len(calls) == 1
+    m = sf.metrics()
+    assert m["leaders"] == 1 and m["coalesced"] == 9 and m["in_flight"] == 0
+
+
+def test_error_reaches_every_waiter_and_key_is_released():
+    sf = SingleFlight()
+    attempts = []
+
+    async def boom():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("LLM caído")
+
+    async def run():
+        return await asyncio.gather(*(sf.do("k", boom) for _ in range(3)), return_exceptions=True)
+
+    res = _run(run())
+    assert all(isinstance(e, RuntimeError) for e in res)
+    assert sf.metrics()["errors"] == 1
+
+    async def ok():
+        return "ok"
+
+    assert _run(sf.do("k", ok)) == "ok"      # reintenta, no se queda el error pegado
+    assert len(attempts) == 1
+
+
+def test_caller_timeout_does_not_cancel_shared_call():
+    sf = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.1)
+        return "listo"
+
+    async def run():
+        impatient = sf.do("k", slow, timeout=0.01)
+        patient = sf.do("k", slow)
+        return await asyncio.gather(impatient, patient, return_exceptions=True)
+
+    first, second = _run(run())
+    assert isinstance(first, asyncio.TimeoutError)
+    assert second == "listo"
+
+
+def test_concurrent_identical_kb_questions_make_one_llm_call(mock_openai, fake_kb):
+    mock_openai.delay = 0.1
+    v = np.eye(4, dtype="float32")
+    meta = [{"id": 0, "text": "Garantía de 3 meses"}, {"id": 1, "text": "Devolución 7 días"}]
+    fake_kb(v[:2], meta, embed=lambda texts: np.repeat(v[:1], len(texts), axis=0))
+
+    async def run():
+        qs = ["¿Cuál es la garantía?"] * 8 + ["cual es la garantia"] * 4
+        return await asyncio.gather(*(r.akb_answer(q, k=1) for q in qs))
+
+    answers = _run(run())
+    assert mock_openai.requests == 1
+    assert len({a["answer"] for a in answers}) == 1
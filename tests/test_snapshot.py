@@ -0,0 +1,85 @@
+# tests/test_snapshot.py
+import asyncio
+import os
+
+import pytest
+
+import app.nlp.intent as intent
+import app.nlp.tools as tools
+
+HEADER = "id,brand,model,version,year,km,price,location\n"
+ROWS = [f"{900 + i},Nissan,Versa,Sense,2020,{10_000 * (i + 1)},{250_000 + i},Online\n" for i in range(9)]
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    path = tmp_path / "catalog.csv"
+    path.write_text(HEADER + "".join(ROWS), encoding="utf-8")
+    monkeypatch.setattr(tools, "CATALOG_PATH", str(path))
+    return path
+
+
+def _say(text):
+    return asyncio.get_event_loop().run_until_complete(intent.route_message("whatsapp", text, user_id="u1"))
+
+
+def test_pages_and_cards_resolve_from_snapshot(catalog, monkeypatch):
+    first = _say("quiero un nissan versa")
+    assert "1) Nissan Versa Sense 2020" in first and "ID 900" in first
+    sess = intent.SESSIONS.peek("whatsapp", "u1")
+    assert sess.snapshot.typecode == "I" and list(sess.snapshot) == list(range(900, 909))
+    assert sess.catalog_version == tools.catalog_version()
+
+    # A partir de aquí nada debe volver a filtrar el catálogo
+    def boom(filters):
+        raise AssertionError("re-consultó el catálogo")
+    monkeypatch.setattr(tools, "_filtered_df_for_search", boom)
+
+    page2 = _say("ver 3 más")
+    assert "6) Nissan Versa" in page2 and "ID 905" in page2 and "quedan 1" in page2
+    assert "*Cotización #906*" in _say("cotiza 7 con 50k")
+    assert "#907" in _say("detalles 8")
+
+
+def test_catalog_change_keeps_numbering(catalog):
+    _say("quiero un nissan versa")
+    # Llega un auto nuevo (más barato en km, iría primero) y se vende el 902
+    new_rows = ["999,Nissan,Versa,Sense,2020,1,240000,Online\n"] + [r for r in ROWS if not r.startswith("902")]
+    catalog.write_text(HEADER + "".join(new_rows), encoding="utf-8")
+    os.utime(catalog, ns=(1, 1))          # mtime distinto aunque el FS tenga poca resolución
+
+    assert "*Cotización #901*" in _say("cotiza 2 con 50k")      # la numeración no se corre
+    assert "ya no está disponible" in _say("detalles 3")
+    page2 = _say("ver más")
+    assert "6) Nissan Versa" in page2 and "inventario se actualizó" in page2
+
+
+def test_alphanumeric_ids_resolve_from_the_page_map(tmp_path, monkeypatch):
+    path = tmp_path / "catalog.csv"
+    path.write_text(HEADER + "A1,Nissan,Versa,Sense,2020,10,250000,Online\n"
+                    "B2,Nissan,Sentra,Advance,2021,20,300000,Online\n"
+                    "C3,Nissan,Kicks,Exclusive,2022,30,350000,Online\n", encoding="utf-8")
+    monkeypatch.setattr(tools, "CATALOG_PATH", str(path))
+    assert "ID A1" in _say("quiero un nissan")
+    sess = intent.SESSIONS.peek("whatsapp", "u1")
+    assert sess.snapshot is None and sess.car_at(1) == "A1"
+
+    assert "Versa" in _say("detalles 1") and "ya no está disponible" not in _say("detalles 3")
+    assert tools.cars_by_ids(["B2", "Z9"]) == [
+        {"id": "B2", "brand": "Nissan", "model": "Sentra", "version": "Advance", "year": 2021, "km": 20,
+         "price": 300000, "location": "Online"},
+        {"id": "Z9", "missing": True},
+    ]
+
+
+def test_page_map_keeps_only_the_visible_page(tmp_path, monkeypatch):
+    path = tmp_path / "catalog.csv"
+    path.write_text(HEADER + "".join(f"N{i},Nissan,Versa,Sense,2020,{i + 1},250000,Online\n" for i in range(12)),
+                    encoding="utf-8")
+    monkeypatch.setattr(tools, "CATALOG_PATH", str(path))
+    _say("quiero un nissan")
+    _say("ver 3 más")
+    _say("ver 3 más")
+    sess = intent.SESSIONS.peek("whatsapp", "u1")
+    assert sess.snapshot is None and sess.page == {9: "N8", 10: "N9", 11: "N10"}
+    assert "#N9 Nissan Versa" in _say("detalles 10")
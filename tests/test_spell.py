@@ -0,0 +1,31 @@
+# tests/test_spell.py
+import app.nlp.tools as tools
+from app.nlp.spell import CatalogSpeller, SymSpell
+
+
+def test_symspell_lookup_within_distance():
+    index = SymSpell(["nissan", "sentra", "versa", "volkswagen"], counts={"versa": 5})
+    assert index.lookup("sentar", 2)[0] == ("sentra", 1)          # transposición = 1 (OSA)
+    assert index.lookup("volswagen", 2)[0] == ("volkswagen", 1)
+    assert index.lookup("versa") == [("versa", 0)]
+    assert index.lookup("xyz", 2) == []
+
+
+def test_speller_aliases_override_and_thresholds():
+    sp = CatalogSpeller(["nissan", "mercedes benz", "kia"], ["versa", "sentra", "clase c", "polo"])
+    assert sp.brand("busco un nizzan") == "nissan"                   # alias
+    assert sp.brand("un mercedes bens 2019") == "mercedes benz"     # bigrama con typo
+    assert sp.model("quiero un sentar") == "sentra"                 # alias y distancia 1
+    assert sp.model("un verssa advance") == "versa"
+    assert sp.model("maneja poco") is None                          # 4 letras: solo exacto
+    assert sp.model("un versa", allowed={"sentra"}) is None
+
+
+def test_guess_uses_catalog_index(monkeypatch, tmp_path):
+    path = tmp_path / "catalog.csv"
+    path.write_text("id,brand,model,year,km,price\n1,Volkswagen,Jetta,2020,10,1\n", encoding="utf-8")
+    monkeypatch.setattr(tools, "CATALOG_PATH", str(path))
+    tools._load_catalog()
+    assert tools._guess_brand("busco un volkswagn", ["volkswagen"]) == "volkswagen"
+    assert tools._guess_model("un jeta 2020", ["jetta"]) is None      # 4 letras: no se corrige
+    assert tools._guess_model("un jettta 2020", ["jetta"]) == "jetta"
@@ -0,0 +1,39 @@
+# tests/test_static_answers.py
+import pytest
+
+from app.nlp.intent import route_message
+from app.nlp.retriever import kb_answer
+from app.nlp.static_answers import STATIC_ANSWERS, StaticAnswerRegistry, match_static
+from app.texts import PROPUESTA_VALOR_KAVAK
+
+
+@pytest.mark.parametrize("text", [
+    "¿Por qué Kavak?",
+    "cual es la PROPUESTA   DE VALOR",
+    "¿Qué ofrece Kavak?",
+    "por qué confiar en Kavak",
+])
+def test_value_proposition_triggers(text):
+    entry = match_static(text)
+    assert entry is not None and entry.answer == PROPUESTA_VALOR_KAVAK
+
+
+def test_no_match_for_regular_messages():
+    assert match_static("busca sentra 2021") is None
+    assert match_static("") is None
+
+
+def test_route_message_and_kb_answer_share_registry():
+    import asyncio
+    reply = asyncio.get_event_loop().run_until_complete(route_message("t", "¿Qué ofrece Kavak?"))
+    assert reply == PROPUESTA_VALOR_KAVAK
+    assert kb_answer("¿Qué ofrece Kavak?")["answer"] == PROPUESTA_VALOR_KAVAK
+
+
+def test_registry_prefers_longest_trigger_and_recompiles():
+    reg = StaticAnswerRegistry()
+    reg.register("horario", ["horario"], "9 a 18 h")
+    assert reg.match("¿Cuál es su horario?").name == "horario"
+    reg.register("horario_sabado", ["horario del sabado"], "9 a 14 h")
+    assert reg.match("horario del sábado").name == "horario_sabado"
+    assert "propuesta_valor" in STATIC_ANSWERS.names()
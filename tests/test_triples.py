@@ -0,0 +1,51 @@
+# tests/test_triples.py
+import app.nlp.tools as tools
+from app.nlp.triples import TripleMatcher
+
+ROWS = [
+    ("nissan", "versa", "sense"), ("nissan", "versa", "advance"), ("nissan", "sentra", ""),
+    ("audi", "a1", ""), ("toyota", "corolla", "le"), ("mazda", "mazda 3", "i sport"),
+]
+
+
+def _matcher() -> TripleMatcher:
+    return TripleMatcher(*zip(*ROWS))
+
+
+def test_typos_resolve_to_one_consistent_triple():
+    m = _matcher()
+    assert m.match("busco nisan versa sense 2020") == ("nissan", "versa", "sense")
+    assert m.match("quiero un sentar") == (None, "sentra", None)
+    assert m.match("mazda 3 i sport") == ("mazda", "mazda 3", "i sport")
+    assert m.match("toyota versa") == (None, "versa", None)          # conflicto: manda el modelo
+    assert m.match("camioneta barata con poco uso") == (None, None, None)
+
+
+def test_weak_match_needs_support_from_another_component():
+    m = _matcher()
+    assert m.match("busco un aui a1") == ("audi", "a1", None)
+    assert m.match("busco un aui") == (None, None, None)
+    assert m.match("un corola") == (None, "corolla", None)
+    assert m.match("un corola le") == (None, "corolla", "le")
+    assert m.match("un corola que le quepan 5") == (None, "corolla", None)   # "le" tras stopword
+    assert m.match("un sense") == (None, None, None)                     # versión sola no bloquea
+
+
+def test_explicit_filters_replace_text_inference():
+    m = _matcher()
+    assert m.match("un sentra", brand="nisan", model="versa") == ("nissan", "versa", None)
+    assert m.match("", version="advance") == (None, None, "advance")
+
+
+def test_search_locks_come_from_the_catalog_matcher(monkeypatch, tmp_path):
+    path = tmp_path / "catalog.csv"
+    path.write_text("id,brand,model,version,year,km,price\n"
+                    "1,Nissan,Versa,Sense,2020,10,1\n2,Nissan,Sentra,,2020,10,1\n"
+                    "3,Volkswagen,Jetta,Trendline,2020,10,1\n", encoding="utf-8")
+    monkeypatch.setattr(tools, "CATALOG_PATH", str(path))
+    tools._load_catalog()
+    for stage in ("triples", "cascade"):
+        monkeypatch.setattr(tools, "CATALOG_MATCH", stage)
+        df = tools._filtered_df_for_search({"raw_text": "busco un nisan vesra"})
+        assert df["id"].tolist() == [1]
+        assert tools._filtered_df_for_search({"brand": "volkswagen"})["id"].tolist() == [3]
@@ -31,7 +31,7 @@ def test_search_chips_and_results(post_wa):
 
 
 def test_quote_by_card_then_yes_details(post_wa):
-    # 1) Una búsqueda para llenar LAST_PAGE
+    # 1) Una búsqueda para llenar la página de la sesión
     _ = post_wa("Nissan Versa 2020 menos de 300k")
     # 2) Cotiza por número de tarjeta
     r2 = post_wa("cotiza 1 con 99k a 36 meses")